@@ -4,124 +4,532 @@
 MCTS AI player for Othello.
 """
 
-import random
+import sys
+import time
+import argparse
 import numpy as np
-from six.moves import input
-from othello_shared import get_possible_moves, play_move, compute_utility
-
-
-class Node:
-    def __init__(self, state, player, parent, children, v=0, N=0):
-        self.state = state
-        self.player = player
-        self.parent = parent
-        self.children = children
-        self.value = v
-        self.N = N
-
-    def get_child(self, state):
-        for c in self.children:
-            if (state == c.state).all():
-                return c
+from threading import Thread, Event
+from othello_shared import play_move
+from othello_bitboard import batch_playout, iter_bits, bit_square, board_to_bitboards
+from mcts_tt import TranspositionTable
+from mcts_tree import Node, NO_NODE, NO_MOVE
+from mcts_policy import uct, POLICIES, equivalence_beta, RAVE_SCHEDULES
+from mcts_rollout import UNIFORM, ROLLOUTS
+from mcts_stats import PHASES, tree_stats, StatsWriter
+from othello_book import EndgameTable
+from othello_endgame import EndgameSolver
+from mcts_value import ValueModel
+from othello_protocol import ManagerConnection, MOVE_TIMEOUT
+
+# Seconds kept in reserve below the game manager's timeout in anytime mode
+SAFETY_MARGIN = 1.0
+
+# Share of a move's time the root may spend in an exact solve before it is
+# abandoned for the search
+SOLVE_SHARE = 0.5
+
+
+def reuse_root(node, state, player):
+    # Find the child of node (the successor of our last move) that matches the
+    # board we were sent, and copy its subtree into a fresh store so that it
+    # can serve as the new root; the rest of the old tree is freed.
+    # If the opponent had to pass, node itself is the new root. A child for a
+    # move symmetric to the one that was played is copied as its image.
+    # Returns None if there is no such child.
+    if node is None:
         return None
+    if node.player == player and (node.state == state).all():
+        return Node.view(node.store.subtree(node.index), 0)
+    child, t = node.store.find_child(node.index, *board_to_bitboards(state))
+    if child == NO_NODE or node.store.player[child] != player:
+        return None
+    return Node.view(node.store.subtree(child, t), 0)
 
 
-def select(node, alpha):
-    while not get_possible_moves(node.state, node.player) == []:
-        possible_moves = get_possible_moves(node.state, node.player)
-        if len(possible_moves) != len(node.children):
-            # Node has unexplored children
-            return node
-        # Select child with highest UCT score
-        uct_values = [child.value / child.N + alpha * np.sqrt(np.log(node.N) / child.N) for child in node.children]
-        node = node.children[np.argmax(uct_values)]
-    return node
-
-def expand(node):
-    untried_moves = [move for move in get_possible_moves(node.state, node.player) if all(not np.array_equal(play_move(node.state, node.player, move[0], move[1]), child.state) for child in node.children)]
-    if untried_moves:
-        move = random.choice(untried_moves)
-        new_state = play_move(node.state, node.player, move[0], move[1])
-        new_node = Node(new_state, 3 - node.player, node, [], 0, 0)  # Switch players
-        node.children.append(new_node)
-        return new_node
-    return node  # If no moves are left, return the node itself
-
-def simulate(node):
-    current_state, current_player = node.state, node.player
-    while True:
-        moves = get_possible_moves(current_state, current_player)
-        if not moves:
-            break
-        move = random.choice(moves)
-        current_state = play_move(current_state, current_player, move[0], move[1])
-        current_player = 3 - current_player
-    return compute_utility(current_state)
+# Value assumed for each rollout still in flight through a node
+VIRTUAL_LOSS = 1
 
-def backprop(node, utility):
-    while node is not None:
-        node.N += 1  # Increment the number of visits to the node
 
-        # Adjust utility based on the player
-        # For the light player (2), use the utility directly
-        # For the dark player (1), use the negative utility
-        player_utility = utility if node.player == 2 else -utility
+# The four MCTS steps work on the TreeStore behind the node (see mcts_tree)
+def select(node, alpha, virtual_loss=VIRTUAL_LOSS, policy=uct):
+    return Node.view(node.store, node.store.select(node.index, alpha, virtual_loss, policy))
 
-        # Update the node's value with the new average
-        node.value = ((node.value * (node.N - 1)) + player_utility) / node.N
+def expand(node, tt=None):
+    return Node.view(node.store, node.store.expand(node.index, tt))
 
-        # Move to the parent node to continue the backpropagation
-        node = node.parent
+def simulate(node, with_moves=False):
+    # With with_moves, also return the masks of the squares dark and light
+    # played, for the AMAF statistics of backprop
+    return node.store.simulate(node.index, with_moves=with_moves)
 
+def simulate_batch(nodes, with_moves=False):
+    # Play out a random game from every node in lockstep on bitboards
+    # Returns a NumPy array with one utility per node, and with with_moves
+    # two more with the masks of the squares dark and light played
+    dark = [node.store.dark[node.index] for node in nodes]
+    light = [node.store.light[node.index] for node in nodes]
+    players = [node.store.player[node.index] for node in nodes]
+    store = nodes[0].store
+    return batch_playout(dark, light, players, store.n, store.rollout.batch_choose, with_moves=with_moves)
 
+def add_virtual_loss(node):
+    node.store.add_virtual_loss(node.index, 1)
 
+def revert_virtual_loss(node):
+    node.store.add_virtual_loss(node.index, -1)
 
+def backprop(node, utility, dark_moves=0, light_moves=0):
+    node.store.backprop(node.index, utility, dark_moves, light_moves)
 
-def mcts(state, player, rollouts=100, alpha=5):
-    # MCTS main loop: Execute four steps rollouts number of times
-    # Then return successor with highest number of rollouts
-    root = Node(state, player, None, [], 0, 1)
-    for i in range(rollouts):
-        leaf = select(root, alpha)
-        new = expand(leaf)
-        utility = simulate(new)
-        backprop(new, utility)
 
+# Iterations between checks of the clock and the early-stop condition
+CHECK_INTERVAL = 16
+
+def search(root, rollouts, alpha, batch_size=1, deadline=None, early_stop=True, tt=None, policy=uct,
+           exact=(), profile=None):
+    # Execute the four MCTS steps from root until rollouts iterations are done
+    # or the deadline (a time.perf_counter() value) has passed; either limit
+    # may be None. With early_stop, also stop once no child can overtake the
+    # most visited one in the iterations that are left.
+    # With batch_size > 1, leaves are collected and simulated together
+    # New nodes share statistics through the transposition table tt, if given
+    # policy scores children during selection (see mcts_policy)
+    # Leaves that a source in exact (endgame tables and solvers) covers get
+    # its exact value instead of a playout
+    # With a dict profile, the seconds spent in each phase are added to its
+    # entries for mcts_stats.PHASES; without one, nothing is timed
+    # With RAVE on in the store, the squares played in every rollout are
+    # passed on to backprop for the AMAF statistics
+    # Returns a dict describing the search
+    if rollouts is None and deadline is None:
+        raise ValueError("search() needs a rollout count or a deadline")
+    start = time.perf_counter()
+    store, k = root.store, root.index
+    num_moves = store.moves(k)
+    rave = store.rave > 0
+    played = (0, 0)
+    done = 0
+    next_check = CHECK_INTERVAL
+    stopped_early = False
+    while rollouts is None or done < rollouts:
+        if done >= next_check:
+            next_check = done + CHECK_INTERVAL
+            now = time.perf_counter()
+            if deadline is not None and now >= deadline:
+                break
+            left = rollouts - done if rollouts is not None else float("inf")
+            if deadline is not None:
+                left = min(left, done / (now - start) * (deadline - now))
+            if early_stop and visit_lead(store, k, num_moves) > left:
+                stopped_early = True
+                break
+        if batch_size == 1:
+            if profile is None:
+                leaf = store.select(k, alpha, VIRTUAL_LOSS, policy)
+                new = store.expand(leaf, tt)
+                if rave:
+                    utility, *played = store.simulate(new, exact, True)
+                else:
+                    utility = store.simulate(new, exact)
+                store.backprop(new, utility, *played)
+            else:
+                t0 = time.perf_counter()
+                leaf = store.select(k, alpha, VIRTUAL_LOSS, policy)
+                t1 = time.perf_counter()
+                new = store.expand(leaf, tt)
+                t2 = time.perf_counter()
+                if rave:
+                    utility, *played = store.simulate(new, exact, True)
+                else:
+                    utility = store.simulate(new, exact)
+                t3 = time.perf_counter()
+                store.backprop(new, utility, *played)
+                profile["select"] += t1 - t0
+                profile["expand"] += t2 - t1
+                profile["simulate"] += t3 - t2
+                profile["backprop"] += time.perf_counter() - t3
+            done += 1
+            continue
+        leaves = []
+        for _ in range(batch_size if rollouts is None else min(batch_size, rollouts - done)):
+            if profile is None:
+                new = store.expand(store.select(k, alpha, VIRTUAL_LOSS, policy), tt)
+            else:
+                t0 = time.perf_counter()
+                leaf = store.select(k, alpha, VIRTUAL_LOSS, policy)
+                t1 = time.perf_counter()
+                new = store.expand(leaf, tt)
+                profile["select"] += t1 - t0
+                profile["expand"] += time.perf_counter() - t1
+            store.add_virtual_loss(new, 1)
+            leaves.append(new)
+        t0 = time.perf_counter()
+        if rave:
+            utilities, dark_moves, light_moves = store.simulate_batch(leaves, exact, True)
+            played = zip(dark_moves.tolist(), light_moves.tolist())
+        else:
+            utilities = store.simulate_batch(leaves, exact)
+            played = [(0, 0)] * len(leaves)
+        t1 = time.perf_counter()
+        for new, utility, moves in zip(leaves, utilities, played):
+            store.add_virtual_loss(new, -1)
+            store.backprop(new, float(utility), *moves)
+        if profile is not None:
+            profile["simulate"] += t1 - t0
+            profile["backprop"] += time.perf_counter() - t1
+        done += len(leaves)
+    elapsed = time.perf_counter() - start
+    return {"iterations": done, "seconds": elapsed,
+            "rollouts_per_second": done / elapsed if elapsed else 0.0,
+            "stopped_early": stopped_early}
+
+def visit_lead(store, k, num_moves):
+    # Visits by which the most visited child of k leads the runner-up; moves
+    # that have no child yet count as zero visits
+    visits = sorted(store.visits[store.children(k)].tolist(), reverse=True)
+    if len(visits) < num_moves:
+        visits.append(0)
+    if len(visits) < 2:
+        return float("inf") if visits else 0
+    return visits[0] - visits[1]
+
+def child_visits(root):
+    # Map each legal move at root, in get_possible_moves order, to the visit
+    # count of its successor
+    store, k = root.store, root.index
+    visits = {bit_square(m, store.n): 0 for m in iter_bits(store.legal(k))}
+    for c in store.children(k).tolist():
+        if store.move[c] != NO_MOVE:
+            visits[bit_square(int(store.move[c]), store.n)] = int(store.visits[c])
+    return visits
+
+def best_move(visits):
+    # Return the move with the most visits, the first one on ties
     move = None
     plays = 0
-    for m in get_possible_moves(state, player):
-        s = play_move(state, player, m[0], m[1])
-        if root.get_child(s).N > plays:
-            plays = root.get_child(s).N
+    for m, n in visits.items():
+        if n > plays:
+            plays = n
             move = m
-
     return move
 
+def mcts(state, player, rollouts=100, alpha=5, batch_size=1, time_limit=None, info=None, root=None,
+         tt=None, policy=uct, seed=None, book=None, solver=None, symmetry=True, rollout=UNIFORM,
+         profile=False, evaluator=None, rave=0, rave_schedule=equivalence_beta, solve_limit=None):
+    # MCTS main loop: Execute four steps rollouts number of times
+    # Then return successor with highest number of rollouts
+    # With time_limit (seconds), search until then instead; pass rollouts=None
+    # to drop the iteration cap. If info is a dict, it receives search stats.
+    # A root node for state may be passed in to continue an earlier search,
+    # and a TranspositionTable to share statistics between transpositions.
+    # policy is the selection policy (see mcts_policy); a seed makes move
+    # ordering and tie-breaking in the tree, and the playouts of single
+    # leaves, reproducible.
+    # With an EndgameTable book (see othello_book) that has the values of all
+    # successors, the best of them is played without searching; otherwise
+    # the table gives exact values to the leaves it covers.
+    # An EndgameSolver (see othello_endgame) likewise solves the root exactly
+    # once it has at most solver.max_empties empty squares, and the leaves
+    # below that. The root solve may take solve_limit seconds, by default
+    # SOLVE_SHARE of time_limit (unbounded without either); a solve that runs
+    # out of time is abandoned and the position searched instead.
+    # With symmetry, moves that lead to symmetric images of one position are
+    # searched as one, and the transposition table shares statistics between
+    # symmetric positions (see mcts_tree).
+    # rollout is the rollout policy that plays out leaves (see mcts_rollout).
+    # An evaluator such as a ValueModel (see mcts_value) scores leaves
+    # instead; with batch_size > 1 it scores each batch in one call.
+    # With rave > 0, selection blends every child's mean value with its
+    # all-moves-as-first value, weighted by rave_schedule with rave as its
+    # equivalence parameter (see mcts_policy and mcts_tree).
+    # With profile, info also receives the seconds spent in each phase, the
+    # nodes allocated, the mean rollout length and the tree's statistics
+    # (see mcts_stats).
+    deadline = time.perf_counter() + time_limit if time_limit is not None else None
+    if root is None:
+        root = Node(state, player, None, [], 0, 1)
+    if seed is not None:
+        root.store.reseed(seed)
+    root.store.symmetry = symmetry
+    root.store.rollout = rollout
+    root.store.evaluator = evaluator
+    root.store.rave = rave
+    root.store.rave_schedule = rave_schedule
+    inherited = int(root.store.visits[root.store.children(root.index)].sum())
+    exact = tuple(source for source in (book, solver) if source is not None)
+    if solve_limit is None and time_limit is not None:
+        solve_limit = SOLVE_SHARE * time_limit
+    solve_deadline = time.perf_counter() + solve_limit if solve_limit is not None else None
+    for source in exact:
+        start = time.perf_counter()
+        move = source.best_move(*root.store.bitboards(root.index), player, solve_deadline)
+        if move is not None:
+            if info is not None:
+                info.update(iterations=0, seconds=time.perf_counter() - start, rollouts_per_second=0.0,
+                            stopped_early=True, inherited_visits=inherited,
+                            book=source is book, solved=source is solver)
+            return bit_square(move, root.store.n)
+    store = root.store
+    size, playouts, plies = len(store), store.playouts, store.playout_plies
+    phases = dict.fromkeys(PHASES, 0.0) if profile else None
+    stats = search(root, rollouts, alpha, batch_size, deadline, tt=tt, policy=policy, exact=exact,
+                   profile=phases)
+    if info is not None:
+        info.update(stats)
+        info["book"] = info["solved"] = False
+        info["inherited_visits"] = inherited
+        if tt is not None:
+            info["tt"] = tt.stats()
+        if profile:
+            for phase, seconds in phases.items():
+                info[phase + "_seconds"] = seconds
+            playouts = store.playouts - playouts
+            info["nodes_allocated"] = len(store) - size
+            info["mean_rollout_length"] = (store.playout_plies - plies) / playouts if playouts else 0.0
+            info.update(tree_stats(root))
+    return best_move(child_visits(root))
+
+
+# Iterations searched below one reply before the Ponderer moves on to the next
+PONDER_CHUNK = 4
+
+
+class Ponderer(object):
+    """
+    Keeps searching from the position after our move while the opponent
+    thinks, so that the subtree of their reply already has visits when the
+    next board arrives.  Every reply gets its own searches in turn, most
+    visited first: a search from the position itself would spend nearly all
+    its time below the reply it rates best, which the opponent may well not
+    play.  The searches run in a background thread in chunks of
+    PONDER_CHUNK iterations; stop() waits for the current chunk, after which
+    the tree belongs to the caller again.  Reading the next board blocks
+    without holding the GIL, so the thread gets the CPU meanwhile.
+    """
+
+    def __init__(self, alpha=5):
+        self.alpha = alpha
+        self.thread = None
+        self.stopping = Event()
+        self.node = None
+        self.before = {}
+        self.rollouts = 0
+        # Totals over the game: pondered moves, hits, and the visits gained
+        self.moves = 0
+        self.hits = 0
+        self.gained = 0
+
+    def start(self, node, tt=None, policy=uct, exact=()):
+        # Search from node until stop(); node must not be touched meanwhile
+        if node is None or not node.store.moves(node.index):
+            return
+        self.node = node
+        store = node.store
+        self.before = {c: int(store.visits[c]) for c in store.children(node.index).tolist()}
+        self.rollouts = 0
+        self.stopping.clear()
+        self.thread = Thread(target=self.run, args=(tt, policy, exact), daemon=True)
+        self.thread.start()
+
+    def run(self, tt, policy, exact):
+        store, k = self.node.store, self.node.index
+        if store.player[k] == store.player[store.parent[k]]:
+            targets = [k]  # The opponent has to pass, so we search our own move
+        else:
+            while store.num_children[k] < store.moves(k):
+                store.expand(k, tt)
+            children = store.children(k)
+            targets = children[np.argsort(-store.visits[children], kind="stable")].tolist()
+        while True:
+            for target in targets:
+                if self.stopping.is_set():
+                    return
+                stats = search(Node.view(store, target), PONDER_CHUNK, self.alpha, early_stop=False, tt=tt,
+                               policy=policy, exact=exact)
+                self.rollouts += stats["iterations"]
+
+    def stop(self, state=None, player=None):
+        # Stop pondering. Given the board that arrived and our color, return
+        # a dict with the rollouts pondered and the visits they added to the
+        # subtree that the search continues from (0 on a miss); else None
+        if self.thread is None:
+            return None
+        self.stopping.set()
+        self.thread.join()
+        self.thread = None
+        if state is None:
+            return None
+        store, k = self.node.store, self.node.index
+        if store.player[k] == player:
+            gained = self.rollouts  # The opponent had to pass
+        else:
+            child, _ = store.find_child(k, *board_to_bitboards(state))
+            gained = int(store.visits[child]) - self.before.get(child, 0) if child != NO_NODE else 0
+        self.moves += 1
+        self.hits += gained > 0
+        self.gained += gained
+        return {"ponder_rollouts": self.rollouts, "ponder_gained": gained}
+
+    def stats(self):
+        return {"moves": self.moves, "hit_rate": self.hits / self.moves if self.moves else 0.0,
+                "gained_per_move": self.gained / self.moves if self.moves else 0.0}
+
 
 ####################################################
-def run_ai():
+def run_ai(workers=1, mode="root", time_limit=None, tt_size=0, policy="uct", book_path=None,
+           solve_empties=0, symmetry=True, rollout="uniform", stats_path=None, ponder=False,
+           value_path=None, batch_size=1, rave=0, rave_schedule="equivalence"):
     """
     This function establishes communication with the game manager.
     It first introduces itself and receives its color.
     Then it repeatedly receives the current score and current board state
     until the game is over.
+    With workers > 1 the search runs on a process pool (see mcts_parallel).
+    With a time_limit, each move is searched for that many seconds.
+    With tt_size > 0, a transposition table of that many entries is shared
+    by all searches of the game.
+    policy names the selection policy of single-process search (see
+    mcts_policy.POLICIES).
+    book_path names an endgame table (see othello_book) to play from and to
+    score leaves with in single-process search.
+    With solve_empties > 0, positions with at most that many empty squares
+    are solved exactly in single-process search (see othello_endgame); a
+    solve that would not finish in SOLVE_SHARE of the time for the move is
+    abandoned for the search, so it never runs into the manager's timeout.
+    symmetry makes single-process search treat symmetric positions as one.
+    rollout names its rollout policy (see mcts_rollout.ROLLOUTS).
+    value_path names a value model (see mcts_value) to score its leaves
+    with instead, batch_size leaves at a time.
+    With rave > 0, its selection also uses all-moves-as-first statistics,
+    with the weight schedule named by rave_schedule (see
+    mcts_policy.RAVE_SCHEDULES).
+    The search tree is kept between turns, and statistics for every search
+    are reported on stderr.  With stats_path (a file, or "-" for stderr),
+    single-process searches are profiled and a JSON record of each is
+    written there (see mcts_stats).
+    With ponder, single-process search goes on during the opponent's turn
+    (see Ponderer), and its hit rate is reported at the end of each game.
+    Once a game is over the manager may start another one in the same
+    process with "NEW GAME <color>".
     """
-    print("MCTS AI")        # First line is the name of this AI
-    color = int(input())    # 1 for dark (first), 2 for light (second)
+    # First line is the name of this AI, with the protocols it speaks
+    conn = ManagerConnection("MCTS AI", sys.stdin.buffer, sys.stdout.buffer)
+    color = conn.handshake()    # 1 for dark (first), 2 for light (second)
+
+    searcher = None
+    if workers > 1:
+        from mcts_parallel import ParallelMCTS
+        searcher = ParallelMCTS(workers, mode)
+    rollouts = None if time_limit is not None else 100
+    node = None  # Successor of our last move, kept so its subtree can be reused
+    tt = TranspositionTable(tt_size) if tt_size > 0 else None
+    book = EndgameTable(book_path) if book_path is not None else None
+    solver = None
+    # Without a time limit, root solves still have to end before the
+    # manager's timeout
+    move_seconds = time_limit if time_limit is not None else MOVE_TIMEOUT - SAFETY_MARGIN
+    solve_limit = SOLVE_SHARE * move_seconds
+    evaluator = ValueModel.load(value_path) if value_path is not None else None
+    stats = StatsWriter(stats_path) if stats_path is not None else None
+    ponderer = Ponderer() if ponder and searcher is None else None
+    game = 1
 
     while True:
-        # Read in the current game status, for example:
-        # "SCORE 2 2" or "FINAL 33 31" if the game is over.
-        next_input = input()
-        status, dark_score_s, light_score_s = next_input.strip().split()
+        # Read in the current game status and board; the status is
+        # "SCORE" or "FINAL" if the game is over.
+        status, dark_score, light_score, board = conn.read_turn()
+        pondered = None
+        if ponderer is not None:
+            pondered = ponderer.stop(board if status != "FINAL" else None, color)
 
         if status == "FINAL":
-            print()
+            if ponderer is not None:
+                sys.stderr.write("MCTS: pondering hit {hit_rate:.0%} of {moves} moves, {gained_per_move:.0f} "
+                                 "extra rollouts per move\n".format(**ponderer.stats()))
+                ponderer = Ponderer()
+            color = conn.next_game()
+            if color is None:
+                if stats is not None:
+                    stats.close()
+                return
+            game += 1
+            node = None
+            tt = TranspositionTable(tt_size) if tt_size > 0 else None
+            solver = None
         else:
-            board = np.array(eval(input()))
-            movei, movej = mcts(board, color)
-            print("{} {}".format(movei, movej))
+            if searcher is not None:
+                movei, movej = searcher.mcts(board, color)
+            else:
+                root = reuse_root(node, board, color) or Node(board, color, None, [], 0, 1)
+                if solver is None and solve_empties > 0:
+                    solver = EndgameSolver(root.store.n, solve_empties)
+                info = {}
+                movei, movej = mcts(board, color, rollouts, batch_size=batch_size, time_limit=time_limit,
+                                    info=info, root=root, tt=tt, policy=POLICIES[policy], book=book,
+                                    solver=solver, symmetry=symmetry, rollout=ROLLOUTS[rollout],
+                                    profile=stats is not None, evaluator=evaluator, rave=rave,
+                                    rave_schedule=RAVE_SCHEDULES[rave_schedule], solve_limit=solve_limit)
+                if info["book"]:
+                    sys.stderr.write("MCTS: move from the endgame table\n")
+                elif info["solved"]:
+                    sys.stderr.write("MCTS: solved in {:.2f}s, {nodes} solver nodes this game at "
+                                     "{nodes_per_second:.0f} nodes/s\n".format(info["seconds"], **solver.stats()))
+                else:
+                    sys.stderr.write("MCTS: inherited {inherited_visits} visits, {iterations} iterations in "
+                                     "{seconds:.2f}s, {rollouts_per_second:.0f} rollouts/s{0}\n".format(
+                                         ", stopped early" if info["stopped_early"] else "", **info))
+                if tt is not None:
+                    sys.stderr.write("MCTS: transposition table {entries} entries, {hit_rate:.1%} hits, "
+                                     "{memory_bytes} bytes\n".format(**info["tt"]))
+                if pondered is not None:
+                    sys.stderr.write("MCTS: pondered {ponder_rollouts} rollouts, {ponder_gained} of them on this "
+                                     "move; hit {hit_rate:.0%} of {moves} moves so far\n".format(
+                                         **dict(pondered, **ponderer.stats())))
+                    info.update(pondered)
+                if stats is not None:
+                    stats.write(dict(info, game=game, color=color, empties=int((board == 0).sum()),
+                                     move=[movei, movej]))
+                node = root.get_child(play_move(board, color, movei, movej))
+            conn.send_move(movei, movej)
+            if ponderer is not None:
+                ponderer.start(node, tt, POLICIES[policy], tuple(s for s in (book, solver) if s is not None))
 
 
 if __name__ == "__main__":
-    run_ai()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="MCTS AI player for Othello")
+    parser.add_argument("--workers", default=1, type=int, help="Search processes (default 1)")
+    parser.add_argument("--parallel", default="root", choices=["root", "leaf"],
+                        help="Parallel search mode when --workers > 1")
+    parser.add_argument("--time", type=float, help="Search each move for this many seconds")
+    parser.add_argument("--anytime", action="store_true",
+                        help="Search each move until just before the game manager's timeout")
+    parser.add_argument("--tt", default=0, type=int, metavar="ENTRIES",
+                        help="Share statistics between transpositions in a table of this size")
+    parser.add_argument("--policy", default="uct", choices=sorted(POLICIES),
+                        help="Selection policy (default uct)")
+    parser.add_argument("--book", metavar="TABLE", help="Endgame table built by othello_book.py")
+    parser.add_argument("--solve", default=0, type=int, metavar="EMPTIES",
+                        help="Solve positions with at most this many empty squares exactly")
+    parser.add_argument("--no-symmetry", dest="symmetry", action="store_false",
+                        help="Search symmetric positions separately")
+    parser.add_argument("--rollout", default="uniform", choices=sorted(ROLLOUTS),
+                        help="Rollout policy (default uniform)")
+    parser.add_argument("--stats", metavar="FILE",
+                        help="Profile every search and append a JSON record of it to FILE (- for stderr)")
+    parser.add_argument("--ponder", action="store_true", help="Keep searching during the opponent's turn")
+    parser.add_argument("--value", metavar="MODEL",
+                        help="Score leaves with a value model trained by mcts_value.py instead of playouts")
+    parser.add_argument("--batch", default=1, type=int, metavar="N",
+                        help="Leaves simulated or evaluated together (default 1)")
+    parser.add_argument("--rave", default=0, type=float, metavar="K",
+                        help="Blend in all-moves-as-first values with equivalence parameter K (default off)")
+    parser.add_argument("--rave-schedule", default="equivalence", choices=sorted(RAVE_SCHEDULES),
+                        help="Weight schedule of the all-moves-as-first values (default equivalence)")
+    args = parser.parse_args()
+    if args.anytime:
+        args.time = MOVE_TIMEOUT - SAFETY_MARGIN
+    if args.time is not None and args.workers > 1:
+        parser.error("--time and --anytime only apply to single-process search")
+    run_ai(args.workers, args.parallel, args.time, args.tt, args.policy, args.book, args.solve,
+           args.symmetry, args.rollout, args.stats, args.ponder, args.value, args.batch,
+           args.rave, args.rave_schedule)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*
+"""
+Parallel MCTS for Othello on top of mcts_ai, using a multiprocessing pool.
+
+Root parallelism searches independent trees in every worker and merges the
+visit counts of the root's children.  Leaf parallelism keeps one tree in the
+parent process and sends batches of rollouts to the workers, with virtual
+loss spreading each batch over the tree.
+"""
+
+import random
+import multiprocessing
+import numpy as np
+from mcts_ai import (Node, select, expand, simulate_batch, backprop, search,
+                     add_virtual_loss, revert_virtual_loss, child_visits,
+                     best_move, VIRTUAL_LOSS)
+
+MODES = ("root", "leaf")
+
+
+def _seed(seed):
+    random.seed(seed)
+    np.random.seed(seed % 2**32)
+
+
+def _root_search(args):
+    state, player, rollouts, alpha, seed = args
+    _seed(seed)
+    root = Node(state, player, None, [], 0, 1)
+    # The visit counts are merged, so every worker uses its full share
+    search(root, rollouts, alpha, early_stop=False)
+    return child_visits(root)
+
+
+def _rollouts(args):
+    positions, seed = args
+    _seed(seed)
+    return simulate_batch([Node(state, player, None, []) for state, player in positions])
+
+
+class ParallelMCTS(object):
+    """
+    A pool of worker processes that runs mcts() searches in the given mode.
+    Use as a context manager, or call close() when done.
+    """
+
+    def __init__(self, workers=None, mode="root", virtual_loss=VIRTUAL_LOSS):
+        if mode not in MODES:
+            raise ValueError("Unknown parallel mode: {}".format(mode))
+        self.workers = workers or multiprocessing.cpu_count()
+        self.mode = mode
+        self.virtual_loss = virtual_loss
+        self.pool = multiprocessing.Pool(self.workers)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+
+    def mcts(self, state, player, rollouts=100, alpha=5):
+        """
+        Search for rollouts iterations in total, shared among the workers,
+        and return the move with the most visits.
+        """
+        if self.mode == "root":
+            return best_move(self.root_visits(state, player, rollouts, alpha))
+        root = Node(state, player, None, [], 0, 1)
+        self.leaf_search(root, rollouts, alpha)
+        return best_move(child_visits(root))
+
+    def root_visits(self, state, player, rollouts, alpha):
+        share, extra = divmod(rollouts, self.workers)
+        jobs = [(state, player, share + (w < extra), alpha, random.getrandbits(32))
+                for w in range(self.workers)]
+        visits = {}
+        for result in self.pool.map(_root_search, jobs):
+            for move, n in result.items():
+                visits[move] = visits.get(move, 0) + n
+        return visits
+
+    def leaf_search(self, root, rollouts, alpha, per_worker=8):
+        done = 0
+        while done < rollouts:
+            leaves = []
+            for _ in range(min(self.workers * per_worker, rollouts - done)):
+                new = expand(select(root, alpha, self.virtual_loss))
+                add_virtual_loss(new)
+                leaves.append(new)
+            # Only boards travel to the workers, never the tree itself
+            chunks = [leaves[w::self.workers] for w in range(self.workers)]
+            chunks = [c for c in chunks if c]
+            jobs = [([(new.state, new.player) for new in chunk], random.getrandbits(32)) for chunk in chunks]
+            for chunk, utilities in zip(chunks, self.pool.map(_rollouts, jobs)):
+                for new, utility in zip(chunk, utilities):
+                    revert_virtual_loss(new)
+                    backprop(new, int(utility))
+            done += len(leaves)
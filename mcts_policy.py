@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*
+"""
+Selection policies for MCTS.
+
+A policy scores all children of a fully expanded node at once.  It is called
+as policy(store, k, ids, alpha, virtual_loss), where ids is the array of
+child indices of node k in the TreeStore, and returns one score per child;
+TreeStore.select() descends into the best one.  Every policy treats rollouts
+still in flight as lost visits, like UCT does (see TreeStore.select).
+
+    uct         the mean value divided by n plus alpha * sqrt(ln N / n), the
+                rule of the original select()
+    ucb1_tuned  UCT with the exploration term shrunk for children whose
+                results vary little (Auer et al., 2002)
+    puct        the mean value plus alpha * P * sqrt(N) / (1 + n), with the
+                prior P of the move from a prior function (as in AlphaZero)
+
+With RAVE on (see TreeStore.rave), child_stats() moves the mean value that
+all of these score with toward the child's all-moves-as-first value, by a
+weight beta from a schedule, which is called as schedule(n, amaf_n, k) with
+the visit counts n and AMAF counts amaf_n of the children and the
+equivalence parameter k:
+
+    equivalence  sqrt(k / (3n + k)), half weight at n = k visits
+                 (Gelly and Silver, 2007)
+    mse          amaf_n / (n + amaf_n + n * amaf_n / k), which trusts the
+                 AMAF value by how often it was sampled, as in the minimum
+                 MSE schedule (Silver, 2009) with its 4b^2 as 1 / k
+"""
+
+import math
+from functools import partial
+import numpy as np
+
+
+def child_stats(store, k, ids, virtual_loss):
+    """
+    Return the mean values of children ids counting pending rollouts as
+    losses, blended with their AMAF values if RAVE is on, their visit counts
+    including pending rollouts, and the same count for their parent k.
+    """
+    visits = store.visits[ids]
+    pending = store.pending[ids]
+    n = visits + pending
+    q = (store.mean_values(ids) * visits - virtual_loss * pending) / n
+    if store.rave:
+        q = rave_values(store, k, ids, q, n)
+    return q, n, int(store.visits[k] + store.pending[k])
+
+
+def uct(store, k, ids, alpha, virtual_loss):
+    # The original select() divided the mean value, which backprop keeps,
+    # by the visit count once more; that is kept so that search plays as
+    # it always has
+    q, n, total = child_stats(store, k, ids, virtual_loss)
+    return q / n + alpha * np.sqrt(math.log(total) / n)
+
+
+def ucb1_tuned(store, k, ids, alpha, virtual_loss):
+    # UCB1-tuned bounds the exploration term by the variance of a child's
+    # results, for rewards in [0, 1]. Utilities lie in [-n*n, n*n], so the
+    # variance is rescaled to that range; a child with the largest possible
+    # variance is explored as much as under UCT.
+    q, n, total = child_stats(store, k, ids, virtual_loss)
+    log_total = math.log(total)
+    mean_square = store.value_sq[ids]
+    variance = np.maximum(mean_square - store.value[ids] ** 2, 0.0) / (4.0 * store.n ** 4)
+    bound = variance + np.sqrt(2.0 * log_total / n)
+    return q + alpha * np.sqrt(log_total / n * np.minimum(1.0, 4.0 * bound))
+
+
+def positional_prior(n, moves):
+    """
+    Prior weights for the moves (bit indices) on an n x n board: corners are
+    worth the most, edges next, and the squares next to a corner the least.
+    """
+    column, row = np.divmod(moves, n)
+    edge_column = (column == 0) | (column == n - 1)
+    edge_row = (row == 0) | (row == n - 1)
+    near_column = (column == 1) | (column == n - 2)
+    near_row = (row == 1) | (row == n - 2)
+    weights = np.ones(len(moves))
+    weights[edge_column | edge_row] = 2.0
+    weights[edge_column & edge_row] = 8.0
+    weights[(near_column | edge_column) & (near_row | edge_row) & ~(edge_column & edge_row)] = 0.5
+    return weights
+
+
+def uniform_prior(n, moves):
+    return np.ones(len(moves))
+
+
+def puct(store, k, ids, alpha, virtual_loss, prior=positional_prior):
+    # The children are all expanded when select() scores them, so
+    # normalizing over them normalizes over every legal move
+    q, n, total = child_stats(store, k, ids, virtual_loss)
+    weights = prior(store.n, store.move[ids].astype(np.int64))
+    return q + alpha * (weights / weights.sum()) * math.sqrt(total) / (1 + n)
+
+
+def rave_values(store, k, ids, q, n):
+    """
+    Return the mean values q of children ids of k, with visit counts n,
+    blended with the AMAF values of their moves at k by store.rave_schedule.
+    Children whose move has no AMAF statistics yet keep their values.
+    """
+    row = store.amaf_row[k]
+    if row < 0:
+        return q
+    moves = store.move[ids].astype(np.int64)
+    amaf_n = np.where(moves >= 0, store.amaf_visits[row, moves], 0)
+    if not amaf_n.any():
+        return q
+    with np.errstate(divide="ignore", invalid="ignore"):
+        beta = np.where(amaf_n > 0, store.rave_schedule(n, amaf_n, store.rave), 0.0)
+    return q + beta * (store.amaf_value[row, moves] - q)
+
+
+def equivalence_beta(n, amaf_n, k):
+    return np.sqrt(k / (3.0 * n + k))
+
+
+def mse_beta(n, amaf_n, k):
+    return amaf_n / (n + amaf_n + n * amaf_n / k)
+
+
+POLICIES = {
+    "uct": uct,
+    "ucb1-tuned": ucb1_tuned,
+    "puct": puct,
+    "puct-uniform": partial(puct, prior=uniform_prior),
+}
+
+RAVE_SCHEDULES = {
+    "equivalence": equivalence_beta,
+    "mse": mse_beta,
+}
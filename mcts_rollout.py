@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*
+"""
+Rollout policies for MCTS.
+
+A rollout policy picks the moves of the games that simulate() plays out from
+new leaves.  Playouts that prefer plausible moves give less noisy values
+than uniformly random ones, so a search needs fewer of them.  A policy
+chooses one move from a mask of legal moves with choose(own, opp, moves, n,
+rng), and one move per game of a batch with batch_choose(own, opp, moves,
+n) (see othello_bitboard.batch_playout).
+
+    uniform     every legal move equally likely (the original playouts)
+    corner      a corner whenever one is legal, else uniform
+    positional  moves weighted by the square weights of
+                mcts_policy.positional_prior
+    mobility    moves weighted against the number of empty squares around
+                them, so quiet moves, which give the opponent few new
+                moves, are preferred
+
+Weighted policies sample by cumulative weight, in one pass over the legal
+moves like the uniform choice; weight tables are built once per board size.
+"""
+
+from bisect import bisect_right
+from functools import lru_cache
+import numpy as np
+from othello_bitboard import (geometry, batch_geometry, iter_bits, popcount, batch_to_bits,
+                              batch_random_moves, LINE_DIRECTIONS)
+from mcts_policy import positional_prior
+
+
+class Tables(object):
+    """
+    Square weights and masks for one board dimension.
+    """
+
+    def __init__(self, n):
+        squares = n * n
+        self.corners = 0
+        for k in (0, n - 1, squares - n, squares - 1):
+            self.corners |= 1 << k
+        self.positional = positional_prior(n, np.arange(squares)).tolist()
+        self.batch_positional = np.array(self.positional)
+        # neighbours[k] is the mask of the squares around square k
+        self.neighbours = []
+        adjacency = np.zeros((squares, squares))
+        for k in range(squares):
+            i, j = divmod(k, n)
+            mask = 0
+            for di, dj in LINE_DIRECTIONS:
+                if 0 <= i + di < n and 0 <= j + dj < n:
+                    mask |= 1 << ((i + di) * n + j + dj)
+                    adjacency[(i + di) * n + j + dj, k] = 1
+            self.neighbours.append(mask)
+        self.adjacency = adjacency
+        # Weight of a move by the number of empty squares around it
+        self.quiet = [2.0 ** (8 - empty) for empty in range(9)]
+        self.batch_quiet = np.array(self.quiet)
+
+
+@lru_cache(maxsize=None)
+def tables(n):
+    return Tables(n)
+
+
+def sample(squares, weights, rng):
+    """
+    Return one of squares, picked with probability proportional to its
+    weight.
+    """
+    cumulative = []
+    total = 0.0
+    for w in weights:
+        total += w
+        cumulative.append(total)
+    return squares[bisect_right(cumulative, rng.random() * total)]
+
+
+def batch_sample(bits, weights):
+    """
+    Pick one set bit of every row of bits with probability proportional to
+    weights (one row of weights per row of bits, or one shared row), as
+    a one-bit mask; rows with no set bits get a zero move.  Each bit gets
+    the key u ** (1 / w) for a uniform u, and the largest key wins
+    (Efraimidis and Spirakis, 2006).
+    """
+    keys = np.random.random(bits.shape) ** (1.0 / weights) * bits
+    picked = np.left_shift(np.uint64(1), np.argmax(keys, axis=1).astype(np.uint64))
+    return np.where(bits.any(axis=1), picked, np.uint64(0))
+
+
+class UniformRollout(object):
+
+    def choose(self, own, opp, moves, n, rng):
+        return rng.choice(list(iter_bits(moves)))
+
+    def batch_choose(self, own, opp, moves, n):
+        return batch_random_moves(moves, n)
+
+
+class CornerRollout(UniformRollout):
+
+    def choose(self, own, opp, moves, n, rng):
+        corners = moves & tables(n).corners
+        return rng.choice(list(iter_bits(corners or moves)))
+
+    def batch_choose(self, own, opp, moves, n):
+        corners = moves & np.uint64(tables(n).corners)
+        return batch_random_moves(np.where(corners != 0, corners, moves), n)
+
+
+class PositionalRollout(UniformRollout):
+
+    def choose(self, own, opp, moves, n, rng):
+        squares = list(iter_bits(moves))
+        weights = tables(n).positional
+        return sample(squares, [weights[k] for k in squares], rng)
+
+    def batch_choose(self, own, opp, moves, n):
+        return batch_sample(batch_to_bits(moves, n), tables(n).batch_positional)
+
+
+class MobilityRollout(UniformRollout):
+
+    def choose(self, own, opp, moves, n, rng):
+        t = tables(n)
+        empty = geometry(n).full & ~(own | opp)
+        squares = list(iter_bits(moves))
+        return sample(squares, [t.quiet[popcount(t.neighbours[k] & empty)] for k in squares], rng)
+
+    def batch_choose(self, own, opp, moves, n):
+        t = tables(n)
+        empty = batch_to_bits(np.uint64(batch_geometry(n).full) & ~(own | opp), n)
+        around = (empty @ t.adjacency).astype(np.int64)
+        return batch_sample(batch_to_bits(moves, n), t.batch_quiet[around])
+
+
+UNIFORM = UniformRollout()
+
+ROLLOUTS = {
+    "uniform": UNIFORM,
+    "corner": CornerRollout(),
+    "positional": PositionalRollout(),
+    "mobility": MobilityRollout(),
+}
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*
+"""
+Search statistics for MCTS.
+
+With profile=True, mcts() times the four phases of every iteration and adds
+them to its info dict along with the statistics of the tree below; without
+it the search runs the untimed loop.  StatsWriter writes such records as
+JSON lines to a file or to stderr, never to stdout, which carries the game
+protocol.
+"""
+
+import json
+import sys
+import numpy as np
+from othello_bitboard import bit_square
+from mcts_tree import NO_NODE, NO_MOVE
+
+PHASES = ("select", "expand", "simulate", "backprop")
+
+
+def tree_depth(store):
+    """
+    Return the depth of the deepest node of store below its root.
+    """
+    parent = store.parent[:len(store)]
+    depth = np.zeros(len(store), dtype=np.int64)
+    has_parent = parent != NO_NODE
+    while True:
+        # Every pass settles at least one more level of the tree
+        new = np.where(has_parent, depth[np.maximum(parent, 0)] + 1, 0)
+        if (new == depth).all():
+            return int(depth.max()) if len(depth) else 0
+        depth = new
+
+
+def tree_stats(root):
+    """
+    Return the size and depth of the tree of root and the visits of each of
+    its children as [column, row, visits], most visited first.
+    """
+    store, k = root.store, root.index
+    visits = []
+    for c in store.children(k).tolist():
+        if store.move[c] != NO_MOVE:
+            visits.append(list(bit_square(int(store.move[c]), store.n)) + [int(store.visits[c])])
+    visits.sort(key=lambda v: -v[2])
+    return {"nodes": len(store), "tree_depth": tree_depth(store), "root_visits": visits}
+
+
+class StatsWriter(object):
+    """
+    Writes records as JSON lines to path, or to stderr for "-".
+    """
+
+    def __init__(self, path):
+        self.file = open(path, "a") if path != "-" else sys.stderr
+
+    def write(self, record):
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+
+    def close(self):
+        if self.file is not sys.stderr:
+            self.file.close()
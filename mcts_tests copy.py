@@ -61,8 +61,10 @@ def main():
     node5 = Node(grandchild2, 1, node3, [], 0, 0)
     node3.children.append(node5)
 
+    # Light has to pass on the way to some final positions; a rollout plays
+    # on until neither side can move
     res = simulate(node5)
-    if res == -6 or res == -10:
+    if res in (-8, -10, -14):
         print("simulate() test passed")
     else:
         print("simulate() test failed")
@@ -0,0 +1,693 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*
+"""
+Array-backed storage for MCTS trees.
+
+Each node is a row in a set of preallocated NumPy columns (visits, value,
+parent, first child, move, ...) with its board packed into two bitboards, so
+a large tree is a handful of flat arrays rather than one Python object and
+one board copy per node.  Bitboards are uint64 up to 8x8; larger boards keep
+them as Python ints in object columns and play out their leaves one at a
+time, as the batched playouts need uint64 masks.  The children of a node occupy a contiguous block
+of child_ids, which lets select() score all of them in one vectorized step.
+The legal moves of a node are generated once, on its first expansion, and
+kept in shuffled order in the same block; the next untried move is always
+the one after the last child, so expansion needs no search.
+
+With symmetry on, a node whose position is symmetric keeps only one move
+of every set of moves that lead to images of the same position, and
+transposition table entries are keyed by canonical positions, so symmetric
+positions share their statistics (see othello_bitboard.canonical).
+
+With an evaluator (see mcts_value), new leaves are scored by it in place
+of playouts, finished games by their final scores.
+
+With rave on, every node that has children also keeps all-moves-as-first
+(AMAF) statistics: for each square, the number of simulations through the
+node in which the player to move there played that square later on, in the
+tree or in the playout, and their average value.  Squares are played at
+most once per game, so these are rows of n * n counts and values in two
+tables, allocated to nodes as they get children.  Selection blends them
+into the mean values the policy scores with (see mcts_policy.rave_values).
+
+Node is a lightweight view of one row with the attributes of the original
+object-graph Node, so code and tests written against that keep working.
+"""
+
+import random
+import numpy as np
+from othello_bitboard import (board_to_bitboards, bitboards_to_board, legal_moves,
+                              apply_move, iter_bits, popcount, batch_playout, batch_legal_moves,
+                              batch_popcount,
+                              zobrist_hash, canonical_hash, unique_moves, symmetries,
+                              transform, transform_bit, geometry, INVERSE)
+from mcts_policy import uct, equivalence_beta
+from mcts_rollout import UNIFORM
+
+NO_NODE = -1
+NO_MOVE = -1
+
+# Per-node columns, all indexed by node
+COLUMNS = ("visits", "value", "value_sq", "pending", "parent", "player", "move", "dark", "light",
+           "first_child", "num_children", "child_capacity", "num_moves", "amaf_row")
+
+
+def new_stone(parent_dark, parent_light, dark, light):
+    """
+    Return the bit index of the one stone that is on the child board but not
+    on the parent board, or NO_MOVE if the boards do not differ that way.
+    """
+    diff = (dark | light) & ~(parent_dark | parent_light)
+    if diff and not diff & (diff - 1):
+        return diff.bit_length() - 1
+    return NO_MOVE
+
+
+class TreeStore(object):
+    """
+    Structure-of-arrays storage for the nodes of one search tree.
+    """
+
+    def __init__(self, dimension, capacity=1024, seed=None, symmetry=False, rollout=UNIFORM, evaluator=None,
+                 rave=0, rave_schedule=equivalence_beta):
+        self.n = dimension
+        self.batched = geometry(dimension).batched
+        squares = dimension * dimension
+        masks = np.uint64 if self.batched else object
+        move_dtype = np.int8 if squares <= 128 else np.int16
+        # child_of keys are node << key_shift | move
+        self.key_shift = max(7, (squares - 1).bit_length())
+        self.symmetry = symmetry
+        self.rollout = rollout  # Picks the moves of playouts (see mcts_rollout)
+        self.evaluator = evaluator  # Scores leaves instead of playouts if set
+        self.evaluations = 0
+        self.rave = rave  # RAVE equivalence parameter, 0 to keep no AMAF statistics
+        self.rave_schedule = rave_schedule  # Weight of AMAF values (see mcts_policy)
+        self.playouts = 0  # Random playouts run so far, and their total length
+        self.playout_plies = 0
+        self.size = 0
+        self.visits = np.zeros(capacity, dtype=np.int64)
+        self.value = np.zeros(capacity, dtype=np.float64)
+        self.value_sq = np.zeros(capacity, dtype=np.float64)  # Average squared utility
+        self.pending = np.zeros(capacity, dtype=np.int32)  # Rollouts in flight
+        self.parent = np.full(capacity, NO_NODE, dtype=np.int32)
+        self.player = np.zeros(capacity, dtype=np.int8)  # Player to move
+        self.move = np.full(capacity, NO_MOVE, dtype=move_dtype)  # Bit index of the move into the node
+        self.dark = np.zeros(capacity, dtype=masks)
+        self.light = np.zeros(capacity, dtype=masks)
+        # The children of node k are
+        # child_ids[first_child[k]:first_child[k] + num_children[k]], in a
+        # block with room for child_capacity[k] of them. Once the num_moves[k]
+        # legal moves of k are known (it is -1 before), child_moves holds
+        # them in the same block: the moves of the children first, then the
+        # untried moves in random order.
+        self.first_child = np.zeros(capacity, dtype=np.int32)
+        self.num_children = np.zeros(capacity, dtype=np.int32)
+        self.child_capacity = np.zeros(capacity, dtype=np.int32)
+        self.num_moves = np.full(capacity, -1, dtype=np.int8)
+        self.child_ids = np.zeros(capacity, dtype=np.int32)
+        self.child_moves = np.full(capacity, NO_MOVE, dtype=move_dtype)
+        self.child_ids_size = 0
+        # AMAF statistics of node k are row amaf_row[k] (-1 for none yet)
+        # of these tables, indexed by square
+        self.amaf_row = np.full(capacity, -1, dtype=np.int32)
+        self.amaf_visits = np.zeros((0, squares), dtype=np.int32)
+        self.amaf_value = np.zeros((0, squares), dtype=np.float32)
+        self.amaf_rows = 0
+        self.square_bits = np.array([1 << k for k in range(squares)], dtype=masks)
+        self.child_of = {}  # node << key_shift | move -> child
+        self.entries = {}  # node -> shared transposition table entry
+        self.reseed(seed)
+
+    def reseed(self, seed):
+        """
+        Make move ordering, tie-breaking in select() and the moves of
+        single-leaf playouts reproducible from seed; with None they use the
+        global random module.
+        """
+        self.rng = random.Random(seed) if seed is not None else random
+
+    def __len__(self):
+        return self.size
+
+    def memory_bytes(self):
+        return (sum(getattr(self, name).nbytes for name in COLUMNS) + self.child_ids.nbytes
+                + self.child_moves.nbytes + self.amaf_visits.nbytes + self.amaf_value.nbytes)
+
+    def _grow_nodes(self):
+        capacity = 2 * len(self.visits)
+        for name in COLUMNS:
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def _grow_block(self, k, capacity):
+        # Move the child block of k to the end of child_ids with room for
+        # capacity children. The old block is left unused.
+        start = self.child_ids_size
+        if start + capacity > len(self.child_ids):
+            size = max(2 * len(self.child_ids), start + capacity)
+            for name in ("child_ids", "child_moves"):
+                old = getattr(self, name)
+                new = np.empty(size, dtype=old.dtype)
+                new[:start] = old[:start]
+                setattr(self, name, new)
+        count = self.child_capacity[k]
+        first = self.first_child[k]
+        self.child_ids[start:start + count] = self.child_ids[first:first + count]
+        self.child_moves[start:start + count] = self.child_moves[first:first + count]
+        self.first_child[k] = start
+        self.child_capacity[k] = capacity
+        self.child_ids_size = start + capacity
+
+    def _add_amaf_row(self, k):
+        if self.amaf_rows == len(self.amaf_visits):
+            rows = max(64, 2 * self.amaf_rows)
+            for name in ("amaf_visits", "amaf_value"):
+                old = getattr(self, name)
+                new = np.zeros((rows, old.shape[1]), dtype=old.dtype)
+                new[:len(old)] = old
+                setattr(self, name, new)
+        self.amaf_row[k] = row = self.amaf_rows
+        self.amaf_rows += 1
+        return row
+
+    def add(self, dark, light, player, parent=NO_NODE, value=0.0, visits=0, move=NO_MOVE):
+        """
+        Add a node and return its index.  The node is not yet one of its
+        parent's children; see attach().
+        """
+        if self.size == len(self.visits):
+            self._grow_nodes()
+        k = self.size
+        self.size += 1
+        self.visits[k] = visits
+        self.value[k] = value
+        self.value_sq[k] = value * value
+        self.pending[k] = 0
+        self.parent[k] = parent
+        self.player[k] = player
+        self.move[k] = move
+        self.dark[k] = dark
+        self.light[k] = light
+        self.first_child[k] = 0
+        self.num_children[k] = 0
+        self.child_capacity[k] = 0
+        self.num_moves[k] = -1
+        self.amaf_row[k] = -1
+        return k
+
+    def moves(self, k):
+        """
+        Return the number of legal moves of k, generating them on first use.
+        """
+        num_moves = self.num_moves[k]
+        if num_moves >= 0:
+            return num_moves
+        moves = self.legal(k)
+        if self.symmetry:
+            moves = unique_moves(int(self.dark[k]), int(self.light[k]), moves, self.n)
+        first = self.first_child[k]
+        count = self.num_children[k]
+        for move in self.child_moves[first:first + count].tolist():
+            if move != NO_MOVE:
+                moves &= ~(1 << move)
+        untried = list(iter_bits(moves))
+        self.rng.shuffle(untried)
+        if count + len(untried) > self.child_capacity[k]:
+            self._grow_block(k, count + len(untried))
+            first = self.first_child[k]
+        self.child_moves[first + count:first + count + len(untried)] = untried
+        self.num_moves[k] = num_moves = count + len(untried)
+        return num_moves
+
+    def attach(self, parent, child):
+        parent = int(parent)
+        count = self.num_children[parent]
+        first = self.first_child[parent]
+        move = int(self.move[child])
+        slot = first + count
+        if self.num_moves[parent] >= 0:
+            # Take the child's move out of the untried moves
+            untried = self.child_moves[slot:first + self.num_moves[parent]].tolist()
+            if move in untried:
+                pos = slot + untried.index(move)
+                self.child_moves[pos] = self.child_moves[slot]
+            else:
+                self.num_moves[parent] += 1
+                if self.num_moves[parent] > self.child_capacity[parent]:
+                    self._grow_block(parent, self.num_moves[parent])
+                    first = self.first_child[parent]
+                    slot = first + count
+                self.child_moves[first + self.num_moves[parent] - 1] = self.child_moves[slot]
+        elif count == self.child_capacity[parent]:
+            self._grow_block(parent, max(4, 2 * count))
+            slot = self.first_child[parent] + count
+        self.child_ids[slot] = child
+        self.child_moves[slot] = move
+        self.num_children[parent] = count + 1
+        self.parent[child] = parent
+        if move != NO_MOVE:
+            self.child_of[parent << self.key_shift | move] = child
+
+    def set_children(self, parent, children):
+        for child in self.children(parent):
+            self.child_of.pop(parent << self.key_shift | int(self.move[child]), None)
+        self.num_children[parent] = 0
+        self.num_moves[parent] = -1
+        for child in children:
+            self.attach(parent, child)
+
+    def children(self, k):
+        first = self.first_child[k]
+        return self.child_ids[first:first + self.num_children[k]]
+
+    def bitboards(self, k):
+        return int(self.dark[k]), int(self.light[k])
+
+    def own_opp(self, k):
+        dark, light = self.bitboards(k)
+        return (dark, light) if self.player[k] == 1 else (light, dark)
+
+    def board(self, k):
+        return bitboards_to_board(int(self.dark[k]), int(self.light[k]), self.n)
+
+    def legal(self, k):
+        own, opp = self.own_opp(k)
+        return legal_moves(own, opp, self.n)
+
+    def path(self, k):
+        """
+        Return the indices from k up to the root.
+        """
+        path = []
+        while k != NO_NODE:
+            path.append(k)
+            k = int(self.parent[k])
+        return path
+
+    def get_child(self, k, dark, light):
+        move = new_stone(int(self.dark[k]), int(self.light[k]), dark, light)
+        child = self.child_of.get(k << self.key_shift | move) if move != NO_MOVE else None
+        if child is not None and self.bitboards(child) == (dark, light):
+            return child
+        return NO_NODE
+
+    def find_child(self, k, dark, light):
+        """
+        Return (child, t) for the child of k whose position symmetry t takes
+        to (dark, light), with t = 0 for the child with that very position,
+        or (NO_NODE, 0).  With symmetry on, the child searched for a move
+        may stand in for the moves equivalent to it.
+        """
+        child = self.get_child(k, dark, light)
+        if child != NO_NODE or not self.symmetry:
+            return child, 0
+        move = new_stone(int(self.dark[k]), int(self.light[k]), dark, light)
+        if move == NO_MOVE:
+            return NO_NODE, 0
+        for t in symmetries(int(self.dark[k]), int(self.light[k]), self.n):
+            child = self.child_of.get(k << self.key_shift | transform_bit(move, t, self.n))
+            u = INVERSE[t]
+            if (child is not None and transform(int(self.dark[child]), u, self.n) == dark
+                    and transform(int(self.light[child]), u, self.n) == light):
+                return child, u
+        return NO_NODE, 0
+
+    def mean_values(self, ids):
+        # Average values of the nodes ids, preferring the transposition
+        # table's average when it has seen more visits of a position
+        q = self.value[ids]
+        if self.entries:
+            for pos, c in enumerate(ids.tolist()):
+                entry = self.entries.get(c)
+                if entry is not None and entry[0] > self.visits[c]:
+                    q[pos] = entry[1]
+        return q
+
+    def select(self, k, alpha, virtual_loss, policy=uct):
+        while True:
+            num_moves = self.moves(k)
+            if not num_moves or num_moves != self.num_children[k]:
+                # Terminal, or k has unexplored children
+                return k
+            # Score all children with the policy (see mcts_policy) at once.
+            # Rollouts still in flight count as visits that were lost, so
+            # that leaves collected for one batch spread over the tree.
+            ids = self.children(k)
+            scores = policy(self, k, ids, alpha, virtual_loss)
+            best = np.flatnonzero(scores == scores.max())
+            k = int(ids[best[0] if len(best) == 1 else self.rng.choice(best)])
+
+    def expand(self, k, tt=None):
+        count = self.num_children[k]
+        if count >= self.moves(k):
+            return k  # If no moves are left, return the node itself
+        # The next untried move is the one after the last child
+        slot = self.first_child[k] + count
+        move = int(self.child_moves[slot])
+        own, opp = apply_move(*self.own_opp(k), 1 << move, self.n)
+        mover = int(self.player[k])
+        dark, light = (own, opp) if mover == 1 else (opp, own)
+        # The opponent moves next unless they have to pass
+        player = 3 - mover
+        if not legal_moves(opp, own, self.n) and legal_moves(own, opp, self.n):
+            player = mover
+        child = self.add(dark, light, player, k, move=move)
+        if tt is not None:
+            # Keyed by the player who would move without passes, so that a
+            # position reached through a pass, whose value is from the
+            # other side's point of view, gets its own entry
+            if self.symmetry:
+                key = canonical_hash(dark, light, 3 - mover, self.n)
+            else:
+                key = zobrist_hash(dark, light, 3 - mover)
+            self.entries[child] = tt.entry(key)
+        self.child_ids[slot] = child
+        self.num_children[k] = count + 1
+        self.child_of[k << self.key_shift | move] = child
+        return child
+
+    def exact_value(self, k, exact):
+        # The first exact value of k that a source in exact (an endgame table
+        # or solver, see othello_book and othello_endgame) has, or None
+        for source in exact:
+            value = source.probe(int(self.dark[k]), int(self.light[k]), int(self.player[k]))
+            if value is not None:
+                return value
+        return None
+
+    def simulate(self, k, exact=(), with_moves=False):
+        # An exact value of the position replaces the random playout
+        # With with_moves, return (value, dark_moves, light_moves) with the
+        # masks of the squares each player played in the playout, if any
+        if exact:
+            value = self.exact_value(k, exact)
+            if value is not None:
+                return (value, 0, 0) if with_moves else value
+        if self.evaluator is not None:
+            value = float(self.evaluate_batch(np.array([k]))[0])
+            return (value, 0, 0) if with_moves else value
+        own, opp = self.own_opp(k)
+        player = int(self.player[k])
+        stones = popcount(own | opp)
+        played = [0, 0, 0]  # Indexed by player
+        while True:
+            moves = legal_moves(own, opp, self.n)
+            if not moves:
+                # Pass, unless the opponent cannot move either
+                if not legal_moves(opp, own, self.n):
+                    break
+                own, opp = opp, own
+                player = 3 - player
+                continue
+            move = self.rollout.choose(own, opp, moves, self.n, self.rng)
+            played[player] |= 1 << move
+            own, opp = apply_move(own, opp, 1 << move, self.n)
+            own, opp = opp, own
+            player = 3 - player
+        self.playouts += 1
+        self.playout_plies += popcount(own | opp) - stones  # Every move adds one stone
+        dark, light = (own, opp) if player == 1 else (opp, own)
+        value = popcount(dark) - popcount(light)
+        return (value, played[1], played[2]) if with_moves else value
+
+    def playout_batch(self, ids, with_moves=False):
+        if not self.batched:
+            results = [self.simulate(k, with_moves=with_moves) for k in ids.tolist()]
+            if not with_moves:
+                return np.array(results, dtype=np.float64)
+            values, dark_moves, light_moves = zip(*results)
+            return (np.array(values, dtype=np.float64), np.array(dark_moves, dtype=object),
+                    np.array(light_moves, dtype=object))
+        result = batch_playout(self.dark[ids], self.light[ids], self.player[ids], self.n,
+                               self.rollout.batch_choose, with_plies=True, with_moves=with_moves)
+        self.playouts += len(ids)
+        self.playout_plies += int(result[1].sum())
+        return (result[0],) + result[2:] if with_moves else result[0]
+
+    def evaluate_batch(self, ids):
+        # Final scores of finished games, the evaluator's values of the rest
+        dark = self.dark[ids]
+        light = self.light[ids]
+        over = ((batch_legal_moves(dark, light, self.n) == 0)
+                & (batch_legal_moves(light, dark, self.n) == 0))
+        values = (batch_popcount(dark, self.n) - batch_popcount(light, self.n)).astype(np.float64)
+        if not over.all():
+            values[~over] = self.evaluator.evaluate(self, ids[~over])
+            self.evaluations += int((~over).sum())
+        return values
+
+    def simulate_batch(self, ids, exact=(), with_moves=False):
+        # With with_moves, return the values and two arrays with the masks
+        # of the squares dark and light played in each playout
+        ids = np.asarray(ids)
+        values = np.zeros(len(ids), dtype=np.float64)
+        dark_moves = np.zeros(len(ids), dtype=self.dark.dtype)
+        light_moves = np.zeros(len(ids), dtype=self.dark.dtype)
+        missing = [] if exact else np.arange(len(ids))
+        for pos, k in enumerate(ids.tolist() if exact else ()):
+            value = self.exact_value(k, exact)
+            if value is None:
+                missing.append(pos)
+            else:
+                values[pos] = value
+        if len(missing):
+            rest = ids[missing]
+            if self.evaluator is not None:
+                values[missing] = self.evaluate_batch(rest)
+            elif with_moves:
+                values[missing], dark_moves[missing], light_moves[missing] = self.playout_batch(rest, True)
+            else:
+                values[missing] = self.playout_batch(rest)
+        return (values, dark_moves, light_moves) if with_moves else values
+
+    def add_virtual_loss(self, k, amount=1):
+        self.pending[self.path(k)] += amount
+
+    def backprop(self, k, utility, dark_moves=0, light_moves=0):
+        # dark_moves and light_moves are the masks of the squares each
+        # player played in the playout, for the AMAF statistics
+        path = self.path(k)
+        self.visits[path] += 1
+        n = self.visits[path]
+        # Values are from the point of view of the player who moved into the
+        # node, the player to move at its parent: the utility itself for
+        # dark, else its negative. Without passes that is the opponent of
+        # the player to move, which is also what the root assumes.
+        parents = self.parent[path]
+        movers = np.where(parents != NO_NODE, self.player[parents], 3 - self.player[path])
+        player_utility = np.where(movers == 1, utility, -utility)
+        self.value[path] = (self.value[path] * (n - 1) + player_utility) / n
+        self.value_sq[path] += (utility * utility - self.value_sq[path]) / n
+        if self.entries:
+            # Positions are never repeated along a path, so a shared entry
+            # is updated at most once per rollout
+            for c, u in zip(path, player_utility.tolist()):
+                entry = self.entries.get(c)
+                if entry is not None:
+                    entry[0] += 1
+                    entry[1] += (u - entry[1]) / entry[0]
+        if self.rave:
+            self.backprop_amaf(path, utility, int(dark_moves), int(light_moves))
+
+    def backprop_amaf(self, path, utility, dark_moves, light_moves):
+        # Walking up from the leaf, the squares played after a node are those
+        # of the playout and of the moves into the nodes below it
+        played = [0, dark_moves, light_moves]  # Indexed by player
+        for c in path:
+            row = self.amaf_row[c]
+            if row < 0 and self.num_children[c]:
+                row = self._add_amaf_row(c)
+            player = int(self.player[c])
+            if row >= 0 and played[player]:
+                mask = np.uint64(played[player]) if self.batched else played[player]
+                squares = (mask & self.square_bits) != 0
+                visits = self.amaf_visits[row, squares] + 1
+                self.amaf_visits[row, squares] = visits
+                u = utility if player == 1 else -utility
+                self.amaf_value[row, squares] += (u - self.amaf_value[row, squares]) / visits
+            parent = int(self.parent[c])
+            if parent != NO_NODE and self.move[c] != NO_MOVE:
+                played[int(self.player[parent])] |= 1 << int(self.move[c])
+
+    def subtree(self, k, t=0):
+        """
+        Return a new TreeStore holding only the subtree under k, with k as
+        its root at index 0.  Everything else is left behind to be freed.
+        With a symmetry t, every position of the copy is replaced by its
+        image under t.
+        """
+        # Nodes are copied in breadth-first order
+        order = [k]
+        pos = 0
+        while pos < len(order):
+            order.extend(self.children(order[pos]).tolist())
+            pos += 1
+        order = np.array(order)
+        size = len(order)
+        mapping = np.full(self.size, NO_NODE, dtype=np.int32)
+        mapping[order] = np.arange(size)
+
+        store = TreeStore(self.n, max(1024, 2 * size), symmetry=self.symmetry, rollout=self.rollout,
+                          evaluator=self.evaluator, rave=self.rave, rave_schedule=self.rave_schedule)
+        store.rng = self.rng
+        store.size = size
+        for name in ("visits", "value", "value_sq", "pending", "player", "move", "dark", "light",
+                     "num_children", "child_capacity", "num_moves"):
+            getattr(store, name)[:size] = getattr(self, name)[order]
+        store.parent[0] = NO_NODE
+        store.parent[1:size] = mapping[self.parent[order[1:]]]
+        # AMAF rows are renumbered in the same order, leaving out those of
+        # the nodes that are not copied
+        rows = self.amaf_row[order]
+        kept = rows >= 0
+        store.amaf_rows = int(kept.sum())
+        store.amaf_row[np.flatnonzero(kept)] = np.arange(store.amaf_rows)
+        store.amaf_visits = self.amaf_visits[rows[kept]]
+        store.amaf_value = self.amaf_value[rows[kept]]
+        capacities = store.child_capacity[:size]
+        store.first_child[:size] = np.cumsum(capacities) - capacities
+        total = int(capacities.sum())
+        store.child_ids = np.zeros(max(1024, 2 * total), dtype=np.int32)
+        store.child_moves = np.full(len(store.child_ids), NO_MOVE, dtype=self.child_moves.dtype)
+        store.child_ids_size = total
+        for old, first, capacity, count in zip(order.tolist(), store.first_child[:size].tolist(),
+                                               capacities.tolist(), store.num_children[:size].tolist()):
+            old_first = self.first_child[old]
+            store.child_moves[first:first + capacity] = self.child_moves[old_first:old_first + capacity]
+            store.child_ids[first:first + count] = mapping[self.child_ids[old_first:old_first + count]]
+        if t:
+            square_map = geometry(self.n).square_maps[t]
+            for c in range(size):
+                store.dark[c] = transform(int(store.dark[c]), t, self.n)
+                store.light[c] = transform(int(store.light[c]), t, self.n)
+            for moves in (store.move[:size], store.child_moves[:total]):
+                # Unused slots of child blocks may hold anything
+                moved = (moves >= 0) & (moves < len(square_map))
+                moves[moved] = square_map[moves[moved]]
+            for name in ("amaf_visits", "amaf_value"):
+                table = getattr(store, name)
+                table[:, square_map] = table.copy()
+        for c in range(1, size):
+            if store.move[c] != NO_MOVE:
+                store.child_of[int(store.parent[c]) << store.key_shift | int(store.move[c])] = c
+        store.entries = {int(mapping[c]): e for c, e in self.entries.items() if mapping[c] != NO_NODE}
+        return store
+
+
+class Node(object):
+    """
+    A view of one node of a TreeStore.  Creating a Node without a parent
+    starts a new store; with a parent it adds a row to the parent's store,
+    which becomes one of the parent's children once appended to its
+    children list.
+    """
+
+    __slots__ = ("store", "index")
+
+    def __init__(self, state, player, parent, children, v=0, N=0):
+        dark, light = board_to_bitboards(state)
+        if parent is None:
+            self.store = TreeStore(state.shape[0])
+            self.index = self.store.add(dark, light, player, NO_NODE, v, N)
+        else:
+            self.store = parent.store
+            move = new_stone(*(parent.store.bitboards(parent.index) + (dark, light)))
+            self.index = self.store.add(dark, light, player, parent.index, v, N, move)
+        for child in children:
+            self.store.attach(self.index, child.index)
+
+    @classmethod
+    def view(cls, store, index):
+        node = cls.__new__(cls)
+        node.store = store
+        node.index = index
+        return node
+
+    def __eq__(self, other):
+        return isinstance(other, Node) and self.store is other.store and self.index == other.index
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((id(self.store), self.index))
+
+    @property
+    def state(self):
+        return self.store.board(self.index)
+
+    @property
+    def player(self):
+        return int(self.store.player[self.index])
+
+    @property
+    def parent(self):
+        parent = int(self.store.parent[self.index])
+        return Node.view(self.store, parent) if parent != NO_NODE else None
+
+    @parent.setter
+    def parent(self, node):
+        self.store.parent[self.index] = node.index if node is not None else NO_NODE
+
+    @property
+    def children(self):
+        return ChildList(self)
+
+    @children.setter
+    def children(self, nodes):
+        self.store.set_children(self.index, [node.index for node in nodes])
+
+    @property
+    def value(self):
+        return float(self.store.value[self.index])
+
+    @value.setter
+    def value(self, v):
+        self.store.value[self.index] = v
+
+    @property
+    def N(self):
+        return int(self.store.visits[self.index])
+
+    @N.setter
+    def N(self, n):
+        self.store.visits[self.index] = n
+
+    @property
+    def pending(self):
+        return int(self.store.pending[self.index])
+
+    @pending.setter
+    def pending(self, n):
+        self.store.pending[self.index] = n
+
+    @property
+    def entry(self):
+        return self.store.entries.get(self.index)
+
+    @entry.setter
+    def entry(self, entry):
+        self.store.entries[self.index] = entry
+
+    def get_child(self, state):
+        dark, light = board_to_bitboards(state)
+        child = self.store.get_child(self.index, dark, light)
+        return Node.view(self.store, child) if child != NO_NODE else None
+
+
+class ChildList(list):
+    """
+    The children of a Node, as Node views.  Appending a node attaches it in
+    the store as well.
+    """
+
+    def __init__(self, owner):
+        list.__init__(self, (Node.view(owner.store, int(c)) for c in owner.store.children(owner.index)))
+        self.owner = owner
+
+    def append(self, node):
+        self.owner.store.attach(self.owner.index, node.index)
+        list.append(self, node)
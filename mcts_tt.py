@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*
+"""
+Transposition table for MCTS.
+
+Positions reached through different move orders share one entry, keyed by
+the Zobrist hash of the board and the player to move.  An entry is a
+two-element list [N, value] holding the visit count and the average value,
+with the same perspective as Node.value.
+"""
+
+import sys
+from collections import OrderedDict
+from othello_bitboard import board_to_bitboards, zobrist_hash
+
+
+def position_hash(state, player):
+    dark, light = board_to_bitboards(state)
+    return zobrist_hash(dark, light, player)
+
+
+# Approximate size of one entry: the hash, the [N, value] list and its
+# float, plus about 80 bytes of dict slot and OrderedDict link per key.
+ENTRY_BYTES = sys.getsizeof(2**63) + sys.getsizeof([0, 0.0]) + sys.getsizeof(0.0) + 80
+
+
+class TranspositionTable(object):
+    """
+    A bounded map from position hashes to shared [N, value] entries.  When
+    the table is full the least recently used entry is evicted; nodes that
+    still hold an evicted entry keep using it, they just stop sharing it.
+    """
+
+    def __init__(self, capacity=200000):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def entry(self, key):
+        """
+        Return the entry for key, creating an empty one on a miss.
+        """
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry
+        self.misses += 1
+        entry = [0, 0.0]
+        self.entries[key] = entry
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        return entry
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def memory_bytes(self):
+        """
+        Estimated memory held by the table, in bytes.
+        """
+        return sys.getsizeof(self.entries) + len(self.entries) * ENTRY_BYTES
+
+    def stats(self):
+        return {"entries": len(self.entries), "capacity": self.capacity,
+                "hit_rate": self.hit_rate(), "evictions": self.evictions,
+                "memory_bytes": self.memory_bytes()}
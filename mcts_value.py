@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*
+"""
+Learned leaf values for MCTS.
+
+A ValueModel is a small NumPy network, linear or with one tanh hidden layer,
+that predicts the final dark - light disk difference of a position, as a
+fraction of the board, from its features: the squares of either colour, the
+player to move and the mobility of both players.  It is trained offline on
+the positions of self-play games between tournament agents (see
+othello_tournament), labelled with the final scores of their games, and
+saved to an .npz file.
+
+A model is a leaf evaluator: evaluate(store, ids) scores a batch of leaves
+of a TreeStore with one forward pass, in place of random playouts.  With
+batch_size > 1, search() queues leaves under virtual loss and evaluates them
+together.
+
+    python mcts_value.py -b 8 --games 2000 -o value8.npz
+    python mcts_value.py -b 8 --games 200 --agent mcts:rollouts=20 --hidden 0 -o linear8.npz
+    python othello_tournament.py mcts:value=value8.npz,batch_size=16 randy -b 8
+"""
+
+import argparse
+import random
+import sys
+import time
+import numpy as np
+from othello_bitboard import (board_to_bitboards, batch_to_bits, batch_popcount, batch_legal_moves,
+                              SYMMETRIES, transform)
+from othello_shared import compute_utility
+
+
+def feature_count(n):
+    return 2 * n * n + 3
+
+
+def features(dark, light, player, n):
+    """
+    Return the feature rows of the positions (dark, light, player), given
+    as arrays.
+    """
+    dark = np.asarray(dark, dtype=np.uint64)
+    light = np.asarray(light, dtype=np.uint64)
+    side = np.where(np.asarray(player) == 1, 1.0, -1.0)
+    mobility_dark = batch_popcount(batch_legal_moves(dark, light, n), n) / n
+    mobility_light = batch_popcount(batch_legal_moves(light, dark, n), n) / n
+    return np.hstack([batch_to_bits(dark, n), batch_to_bits(light, n), side[:, None],
+                      mobility_dark[:, None], mobility_light[:, None]]).astype(np.float32)
+
+
+class ValueModel(object):
+    """
+    A value network for n x n boards with hidden tanh units, or a linear
+    model with hidden = 0.  Outputs lie in [-1, 1].
+    """
+
+    def __init__(self, n, hidden=32, seed=0):
+        rng = np.random.RandomState(seed)
+        inputs = feature_count(n)
+        self.n = n
+        self.layers = []
+        for fan_in, fan_out in ((inputs, hidden), (hidden, 1)) if hidden else ((inputs, 1),):
+            self.layers.append([(rng.randn(fan_in, fan_out) / np.sqrt(fan_in)).astype(np.float32),
+                                np.zeros(fan_out, dtype=np.float32)])
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        model = cls.__new__(cls)
+        model.n = int(data["n"])
+        model.layers = [[data["w{}".format(i)], data["b{}".format(i)]] for i in range(int(data["layers"]))]
+        return model
+
+    def save(self, path):
+        arrays = {"n": self.n, "layers": len(self.layers)}
+        for i, (w, b) in enumerate(self.layers):
+            arrays["w{}".format(i)] = w
+            arrays["b{}".format(i)] = b
+        with open(path, "wb") as f:
+            np.savez(f, **arrays)
+
+    def forward(self, x):
+        # Return the activations of every layer, input first
+        activations = [x]
+        for w, b in self.layers:
+            activations.append(np.tanh(activations[-1] @ w + b))
+        return activations
+
+    def predict(self, x):
+        return self.forward(x)[-1][:, 0]
+
+    def evaluate(self, store, ids):
+        """
+        Return the predicted dark - light utilities of the nodes ids of a
+        TreeStore.
+        """
+        x = features(store.dark[ids], store.light[ids], store.player[ids], self.n)
+        return self.predict(x) * (self.n * self.n)
+
+    def fit(self, x, y, epochs=20, batch=256, rate=0.003, seed=0, log=None):
+        """
+        Train on feature rows x and targets y in [-1, 1] by minimizing the
+        squared error with Adam.
+        """
+        rng = np.random.RandomState(seed)
+        params = [p for layer in self.layers for p in layer]
+        moments = [[np.zeros_like(p), np.zeros_like(p)] for p in params]
+        beta1, beta2, step = 0.9, 0.999, 0
+        for epoch in range(epochs):
+            order = rng.permutation(len(x))
+            for start in range(0, len(x), batch):
+                rows = order[start:start + batch]
+                activations = self.forward(x[rows])
+                # Gradient of the mean squared error, back through each tanh
+                delta = 2.0 * (activations[-1][:, 0] - y[rows])[:, None] / len(rows)
+                grads = []
+                for i in reversed(range(len(self.layers))):
+                    delta = delta * (1.0 - activations[i + 1] ** 2)
+                    grads[:0] = [activations[i].T @ delta, delta.sum(axis=0)]
+                    delta = delta @ self.layers[i][0].T
+                step += 1
+                for p, g, m in zip(params, grads, moments):
+                    m[0] = beta1 * m[0] + (1 - beta1) * g
+                    m[1] = beta2 * m[1] + (1 - beta2) * g * g
+                    p -= (rate * (m[0] / (1 - beta1 ** step))
+                          / (np.sqrt(m[1] / (1 - beta2 ** step)) + 1e-8)).astype(p.dtype)
+            if log is not None:
+                log("epoch {}: mean squared error {:.4f}".format(
+                    epoch + 1, float(np.mean((self.predict(x) - y) ** 2))))
+
+
+def self_play(dark, light, n, games, seed=0, log=None):
+    """
+    Play games games between the agent specs dark and light (see
+    othello_tournament.make_agent) and return the (dark, light, player)
+    arrays of every position played through, with the final dark - light
+    disk difference of its game.
+    """
+    # Imported here: othello_tournament imports mcts_ai, which imports us,
+    # and the AI should not load the game manager just to start
+    from othello_tournament import make_agent
+    from othello_game import OthelloGameManager
+    players = [None, make_agent(dark), make_agent(light)]
+    rng = random.Random(seed)
+    positions = []
+    values = []
+    for g in range(games):
+        random.seed(rng.getrandbits(32))
+        game = OthelloGameManager(n)
+        start = len(positions)
+        while game.get_possible_moves():
+            player = game.current_player
+            positions.append(board_to_bitboards(game.board) + (player,))
+            game.play(*players[player](game.board, player))
+        values.extend([compute_utility(game.board)] * (len(positions) - start))
+        if log is not None and (g + 1) % 100 == 0:
+            log("{} games, {} positions".format(g + 1, len(positions)))
+    dark_masks, light_masks, player = zip(*positions)
+    return (np.array(dark_masks, dtype=np.uint64), np.array(light_masks, dtype=np.uint64),
+            np.array(player), np.array(values))
+
+
+def augment(dark, light, n, seed=0):
+    """
+    Replace every position by its image under a random symmetry, so that the
+    model sees all orientations of the opening.
+    """
+    rng = np.random.RandomState(seed)
+    dark = dark.copy()
+    light = light.copy()
+    for pos, t in enumerate(rng.randint(SYMMETRIES, size=len(dark)).tolist()):
+        dark[pos] = transform(int(dark[pos]), t, n)
+        light[pos] = transform(int(light[pos]), t, n)
+    return dark, light
+
+
+def train(n, games, agent="randy", hidden=32, epochs=20, seed=0, log=None):
+    """
+    Generate self-play games of agent against itself and return a model
+    trained on them.
+    """
+    dark, light, player, values = self_play(agent, agent, n, games, seed, log)
+    dark, light = augment(dark, light, n, seed)
+    x = features(dark, light, player, n)
+    y = (values / (n * n)).astype(np.float32)
+    model = ValueModel(n, hidden, seed)
+    model.fit(x, y, epochs, seed=seed, log=log)
+    return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train an Othello value model from self-play")
+    parser.add_argument("-b", default=8, type=int, help="Board size (default 8x8)")
+    parser.add_argument("--games", default=2000, type=int, help="Self-play games (default 2000)")
+    parser.add_argument("--agent", default="randy",
+                        help="Agent spec playing both sides (default randy, whose games label positions "
+                             "with the value random playouts estimate)")
+    parser.add_argument("--hidden", default=32, type=int, help="Hidden units, 0 for a linear model (default 32)")
+    parser.add_argument("--epochs", default=20, type=int, help="Training epochs (default 20)")
+    parser.add_argument("--seed", default=0, type=int, help="Random seed")
+    parser.add_argument("-o", "--output", required=True, help="Model file to write (.npz)")
+    args = parser.parse_args()
+
+    log = lambda msg: print(msg, file=sys.stderr)
+    start = time.perf_counter()
+    model = train(args.b, args.games, args.agent, args.hidden, args.epochs, args.seed, log)
+    model.save(args.output)
+    print("Trained on {} games in {:.1f}s".format(args.games, time.perf_counter() - start), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
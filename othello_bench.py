@@ -0,0 +1,703 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*
+"""
+Benchmarks for the Othello engine and the MCTS player.
+
+Run "python othello_bench.py NAME ..." to run some benchmarks, or leave out
+the names to run all of them.  Every benchmark returns a list of records
+(dicts) which are printed one per line.
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+import numpy as np
+from othello_game import OthelloGameManager, AiPlayerInterface, play_games
+from othello_pool import AiWorkerPool
+from othello_shared import get_possible_moves, play_move, GameState
+import mcts_ai
+from mcts_parallel import ParallelMCTS, MODES
+from mcts_tt import TranspositionTable
+from mcts_policy import POLICIES, RAVE_SCHEDULES
+from mcts_rollout import ROLLOUTS
+from mcts_stats import PHASES
+from mcts_tree import TreeStore
+from mcts_value import ValueModel, train
+from othello_tournament import schedule, run_tournament, summarize
+from othello_bitboard import (board_to_bitboards, legal_moves, apply_move, iter_bits, popcount, canonical,
+                              unique_moves)
+from othello_endgame import EndgameSolver
+import othello_book
+
+BENCHMARKS = {}
+
+
+def benchmark(func):
+    BENCHMARKS[func.__name__] = func
+    return func
+
+
+def midgame_board(dimension, plies, seed=0):
+    """
+    Return (board, player) after up to plies random moves from the opening.
+    """
+    rng = random.Random(seed)
+    board = OthelloGameManager(dimension).board
+    player = 1
+    for _ in range(plies):
+        moves = get_possible_moves(board, player)
+        if not moves:
+            break
+        i, j = rng.choice(moves)
+        board = play_move(board, player, i, j)
+        player = 3 - player
+    return board, player
+
+
+@benchmark
+def parallel_scaling(args):
+    """
+    Rollouts per second of root and leaf parallel search from 1 to
+    args.workers processes.
+    """
+    board, player = midgame_board(args.board, args.board * args.board // 4)
+    records = []
+    for mode in MODES:
+        for workers in range(1, args.workers + 1):
+            with ParallelMCTS(workers, mode) as searcher:
+                start = time.perf_counter()
+                searcher.mcts(board, player, args.rollouts)
+                elapsed = time.perf_counter() - start
+            records.append({"mode": mode, "workers": workers, "rollouts": args.rollouts,
+                            "seconds": round(elapsed, 4),
+                            "rollouts_per_second": round(args.rollouts / elapsed, 1)})
+    return records
+
+
+@benchmark
+def transposition_table(args):
+    """
+    Size, hit rate and memory of a transposition table shared by both sides
+    over one self-play game, for a few table capacities.
+    """
+    records = []
+    for capacity in (1000, 10000, 100000):
+        tt = TranspositionTable(capacity)
+        board, player = midgame_board(args.board, 0)
+        moves = 0
+        start = time.perf_counter()
+        while get_possible_moves(board, player):
+            i, j = mcts_ai.mcts(board, player, args.rollouts, tt=tt)
+            board = play_move(board, player, i, j)
+            player = 3 - player
+            moves += 1
+        record = {"capacity": capacity, "moves": moves, "seconds": round(time.perf_counter() - start, 2)}
+        record.update(tt.stats())
+        record["hit_rate"] = round(record["hit_rate"], 4)
+        records.append(record)
+    return records
+
+
+def _original_expand(node):
+    # expand() as it was before legal moves were cached per node: regenerate
+    # the moves and compare every successor board against every child
+    state, player = node.state, node.player
+    untried = [move for move in get_possible_moves(state, player)
+               if all(not np.array_equal(play_move(state, player, move[0], move[1]), child.state)
+                      for child in node.children)]
+    if untried:
+        move = random.choice(untried)
+        node.children.append(mcts_ai.Node(play_move(state, player, move[0], move[1]), 3 - player, node, [], 0, 0))
+
+
+@benchmark
+def expansion(args):
+    """
+    Expansions per second when fully expanding mid-game positions, with the
+    original expand() and with the cached move lists.
+    """
+    positions = [midgame_board(args.board, plies, seed)
+                 for seed in range(10) for plies in (args.board * 2, args.board * 3)]
+    positions = [(board, player) for board, player in positions if get_possible_moves(board, player)]
+    records = []
+    for name, expand in (("original", _original_expand),
+                         ("cached", lambda node: node.store.expand(node.index))):
+        expansions = 0
+        start = time.perf_counter()
+        for board, player in positions:
+            root = mcts_ai.Node(board, player, None, [], 0, 1)
+            for _ in range(len(get_possible_moves(board, player))):
+                expand(root)
+                expansions += 1
+        elapsed = time.perf_counter() - start
+        records.append({"expand": name, "positions": len(positions), "expansions": expansions,
+                        "seconds": round(elapsed, 4), "expansions_per_second": round(expansions / elapsed, 1)})
+    return records
+
+
+@benchmark
+def game_loop(args):
+    """
+    Plies per second of random games played the way the manager and GUI
+    used to (generate the moves, play, generate them again for the game-over
+    check) and on GameState.
+    """
+    games = 200
+    records = []
+    for name in ("original", "game_state"):
+        rng = random.Random(args.seed)
+        plies = 0
+        start = time.perf_counter()
+        for _ in range(games):
+            if name == "original":
+                board, player = midgame_board(args.board, 0)
+                while get_possible_moves(board, player):
+                    i, j = rng.choice(get_possible_moves(board, player))
+                    board = play_move(board, player, i, j)
+                    player = 3 - player
+                    plies += 1
+            else:
+                state = GameState.from_board(midgame_board(args.board, 0)[0], 1)
+                while not state.is_terminal():
+                    state = state.play(*rng.choice(state.moves()))
+                    plies += 1
+        elapsed = time.perf_counter() - start
+        records.append({"loop": name, "games": games, "plies": plies,
+                        "plies_per_second": round(plies / elapsed, 1)})
+    return records
+
+
+def _original_select(node, alpha):
+    # select() as it was before the tree moved into arrays: one NumPy
+    # scalar sqrt and log per child, on the object view of the tree
+    while not get_possible_moves(node.state, node.player) == []:
+        if len(get_possible_moves(node.state, node.player)) != len(node.children):
+            return node
+        uct_values = [child.value / child.N + alpha * np.sqrt(np.log(node.N) / child.N)
+                      for child in node.children]
+        node = node.children[np.argmax(uct_values)]
+    return node
+
+
+@benchmark
+def selection(args):
+    """
+    Selection steps (levels descended) per second in a tree grown by
+    10 * args.rollouts iterations from a mid-game position, for the original
+    per-child select() and each vectorized policy.
+    """
+    board, player = midgame_board(args.board, args.board * 2)
+    root = mcts_ai.Node(board, player, None, [], 0, 1)
+    mcts_ai.search(root, 10 * args.rollouts, 5, early_stop=False)
+    store = root.store
+    records = []
+    for name in ["original"] + sorted(POLICIES):
+        if name == "original":
+            run = lambda: _original_select(root, 5).index
+        else:
+            run = lambda: store.select(0, 5, mcts_ai.VIRTUAL_LOSS, POLICIES[name])
+        selects = steps = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < 1.0:
+            steps += len(store.path(run())) - 1
+            selects += 1
+        elapsed = time.perf_counter() - start
+        records.append({"select": name, "nodes": len(store), "depth": round(steps / selects, 1),
+                        "selects_per_second": round(selects / elapsed, 1),
+                        "steps_per_second": round(steps / elapsed, 1)})
+    return records
+
+
+# An AI that answers every board at once, to time the protocol alone
+_ECHO_AI = """
+import sys
+sys.path.insert(0, {path!r})
+from othello_protocol import ManagerConnection
+conn = ManagerConnection("Echo", sys.stdin.buffer, sys.stdout.buffer, {protocols!r})
+conn.handshake()
+while conn.read_turn()[0] != "FINAL":
+    conn.send_move(0, 0)
+"""
+
+
+@benchmark
+def protocol_latency(args):
+    """
+    Round-trip time per move between the game manager and an AI that
+    answers instantly, for the text and binary protocols.
+    """
+    records = []
+    path = os.path.dirname(os.path.abspath(__file__))
+    board, _ = midgame_board(args.board, args.board * 2)
+    for protocols in ((), ("binary1",)):
+        with tempfile.NamedTemporaryFile("w", suffix=".py", delete=False) as f:
+            f.write(_ECHO_AI.format(path=path, protocols=protocols))
+        try:
+            game = OthelloGameManager(args.board)
+            game.board = board
+            stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+            try:
+                player = AiPlayerInterface(f.name, 1)
+            finally:
+                sys.stdout.close()
+                sys.stdout = stdout
+            moves = 1000
+            start = time.perf_counter()
+            for _ in range(moves):
+                player.get_move(game)
+            elapsed = time.perf_counter() - start
+            player.kill(game)
+        finally:
+            os.unlink(f.name)
+        records.append({"protocol": player.protocol, "moves": moves,
+                        "microseconds_per_move": round(1e6 * elapsed / moves, 1)})
+    return records
+
+
+@benchmark
+def ai_startup(args):
+    """
+    Per-game startup latency of two Randy processes on a 4x4 board, with a
+    new pair of processes for every game and with a pool of warm workers.
+    """
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "randy_ai.py")
+    games = 10
+    records = []
+    for name in ("spawn", "pool"):
+        pool = AiWorkerPool() if name == "pool" else None
+        startup = []
+        stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+        start = time.perf_counter()
+        try:
+            for _ in range(games):
+                players = []
+                for color in (1, 2):
+                    if pool is not None:
+                        players.append(pool.acquire(path, color))
+                        startup.append(pool.startup_seconds[-1])
+                    else:
+                        players.append(AiPlayerInterface(path, color))
+                        startup.append(players[-1].startup_seconds)
+                play_games([(OthelloGameManager(4), players[0], players[1])], pool)
+        finally:
+            elapsed = time.perf_counter() - start
+            if pool is not None:
+                pool.close()
+            sys.stdout.close()
+            sys.stdout = stdout
+        records.append({"players": name, "games": games,
+                        "startup_ms_per_game": round(1000 * sum(startup) / games, 2),
+                        "seconds_per_game": round(elapsed / games, 3)})
+    return records
+
+
+def _original_draw_board(gui):
+    # draw_board() as it was before the canvas items were kept: a new
+    # square per cell and a new disk per stone on every move
+    for i in range(gui.height):
+        for j in range(gui.width):
+            x = i * gui.cell_size + gui.offset
+            y = j * gui.cell_size + gui.offset
+            gui.canvas.create_rectangle(x, y, x + gui.cell_size, y + gui.cell_size, fill="dark green")
+            if gui.game.board[j, i]:
+                gui.canvas.create_oval(x + 2, y + 2, x + gui.cell_size - 2, y + gui.cell_size - 2,
+                                       fill="black" if gui.game.board[j, i] == 1 else "white")
+
+
+@benchmark
+def gui_frames(args):
+    """
+    Frame time and canvas item count over a long run of random games drawn
+    by the GUI, redrawing the whole board as the GUI used to and redrawing
+    only the changed cells.
+    """
+    import tkinter
+    from othello_game import Player
+    from othello_gui import OthelloGui
+    frames = 1000
+    records = []
+    for name in ("original", "incremental"):
+        rng = random.Random(args.seed)
+        try:
+            gui = OthelloGui(OthelloGameManager(args.board), Player(1), Player(2))
+        except tkinter.TclError as e:
+            return [{"skipped": str(e)}]
+        times = []
+        try:
+            for _ in range(frames):
+                moves = gui.game.get_possible_moves()
+                start = time.perf_counter()
+                if not moves:
+                    gui.game = OthelloGameManager(args.board)
+                    changed = None
+                else:
+                    changed = gui.game.play(*rng.choice(moves))
+                if name == "original":
+                    _original_draw_board(gui)
+                else:
+                    gui.draw_board(changed)
+                gui.root.update()
+                times.append(time.perf_counter() - start)
+            items = len(gui.canvas.find_all())
+        finally:
+            gui.root.destroy()
+        records.append({"draw": name, "board": args.board, "frames": frames,
+                        "first_ms": round(1000 * np.mean(times[:50]), 3),
+                        "last_ms": round(1000 * np.mean(times[-50:]), 3),
+                        "max_ms": round(1000 * max(times), 3), "canvas_items": items})
+    return records
+
+
+def endgame_position(dimension, empties, seed=0):
+    """
+    Return (own, opp) masks for the player to move once a random game from
+    the opening has that many empty squares, or None if it ends first.
+    """
+    rng = random.Random(seed)
+    own, opp = board_to_bitboards(OthelloGameManager(dimension).board)
+    while dimension * dimension - popcount(own | opp) > empties:
+        moves = legal_moves(own, opp, dimension)
+        if not moves:
+            if not legal_moves(opp, own, dimension):
+                return None
+        else:
+            own, opp = apply_move(own, opp, 1 << rng.choice(list(iter_bits(moves))), dimension)
+        own, opp = opp, own
+    if not legal_moves(own, opp, dimension):
+        own, opp = opp, own
+    return own, opp
+
+
+@benchmark
+def endgame(args):
+    """
+    Exact solve time and nodes per second of the alpha-beta endgame solver
+    by number of empty squares, averaged over random endgames, against the
+    plain minimax of othello_book where that finishes quickly.
+    """
+    n = args.board
+    records = []
+    for empties in range(4, min(n * n - 4, 14) + 1, 2):
+        positions = [p for p in (endgame_position(n, empties, seed) for seed in range(8)) if p]
+        solver = EndgameSolver(n, empties)
+        start = time.perf_counter()
+        values = []
+        for own, opp in positions:
+            solver.tt.clear()
+            values.append(solver.solve(own, opp))
+        elapsed = time.perf_counter() - start
+        record = {"empties": empties, "positions": len(positions),
+                  "seconds_per_solve": round(elapsed / len(positions), 5),
+                  "nodes_per_solve": solver.nodes // len(positions),
+                  "nodes_per_second": round(solver.nodes / elapsed)}
+        if empties <= 8:
+            start = time.perf_counter()
+            if [othello_book.solve(own, opp, n, {}) for own, opp in positions] != values:
+                raise AssertionError("solver and minimax disagree at {} empties".format(empties))
+            record["minimax_seconds_per_solve"] = round((time.perf_counter() - start) / len(positions), 5)
+        records.append(record)
+    return records
+
+
+# Canonical positions on a ply after which the symmetry benchmark stops
+SYMMETRY_FRONTIER = 200000
+
+
+@benchmark
+def symmetry(args):
+    """
+    Nodes per ply of the game tree over the first args.plies plies, without
+    symmetry, with symmetric moves pruned the way the MCTS tree does it, and
+    as distinct canonical positions (what a canonical transposition table or
+    book stores); then the speed of an MCTS search from the opening with
+    and without symmetry, and the visits of its best move.
+    Stops early once a ply has more than SYMMETRY_FRONTIER canonical
+    positions.
+    """
+    n = args.board
+    dark, light = board_to_bitboards(OthelloGameManager(n).board)
+    # Canonical position -> (tree nodes, pruned tree nodes) reaching it
+    frontier = {(dark, light, 1): (1, 1)}
+    records = []
+    start = time.perf_counter()
+    for ply in range(1, args.plies + 1):
+        if len(frontier) > SYMMETRY_FRONTIER:
+            break
+        nodes = {}
+        for (dark, light, player), (tree, pruned) in frontier.items():
+            own, opp = (dark, light) if player == 1 else (light, dark)
+            moves = legal_moves(own, opp, n)
+            unique = unique_moves(dark, light, moves, n)
+            for k in iter_bits(moves):
+                new_own, new_opp = apply_move(own, opp, 1 << k, n)
+                next_player = 3 - player
+                if not legal_moves(new_opp, new_own, n) and legal_moves(new_own, new_opp, n):
+                    next_player = player
+                new_dark, new_light = (new_own, new_opp) if player == 1 else (new_opp, new_own)
+                key = canonical(new_dark, new_light, n)[:2] + (next_player,)
+                old_tree, old_pruned = nodes.get(key, (0, 0))
+                nodes[key] = (old_tree + tree, old_pruned + (pruned if unique >> k & 1 else 0))
+        frontier = nodes
+        tree = sum(t for t, _ in nodes.values())
+        pruned = sum(p for _, p in nodes.values())
+        records.append({"ply": ply, "tree_nodes": tree, "pruned_nodes": pruned,
+                        "canonical_positions": len(nodes),
+                        "pruned_ratio": round(pruned / tree, 3),
+                        "canonical_ratio": round(len(nodes) / tree, 3),
+                        "seconds": round(time.perf_counter() - start, 2)})
+    board = OthelloGameManager(n).board
+    for on in (False, True):
+        root = mcts_ai.Node(board, 1, None, [], 0, 1)
+        store = root.store
+        store.symmetry = on
+        store.reseed(args.seed)
+        stats = mcts_ai.search(root, args.rollouts, 5, early_stop=False)
+        records.append({"symmetry": on, "rollouts": args.rollouts,
+                        "rollouts_per_second": round(stats["rollouts_per_second"], 1),
+                        "root_children": len(root.children),
+                        "best_child_visits": max(mcts_ai.child_visits(root).values())})
+    return records
+
+
+@benchmark
+def rollout(args):
+    """
+    Playouts per second of each rollout policy from a midgame position, and
+    the score of MCTS using it against randy, with args.rollouts rollouts
+    per move and with the time per move that uniform playouts need for
+    them, and against MCTS with uniform playouts at that time (strength per
+    CPU-second).  Small rollout counts keep the scores against randy below 1.
+    """
+    board, player = midgame_board(args.board, args.board * args.board // 4)
+    dark, light = board_to_bitboards(board)
+    speeds = {}
+    for name, policy in ROLLOUTS.items():
+        store = TreeStore(args.board, rollout=policy)
+        k = store.add(dark, light, player)
+        start = time.perf_counter()
+        for _ in range(args.rollouts):
+            store.simulate(k)
+        speeds[name] = args.rollouts / (time.perf_counter() - start)
+    budget = round(args.rollouts / speeds["uniform"], 4)
+    uniform = "mcts:rollout=uniform,time={}".format(budget)
+
+    def score(spec, opponent):
+        jobs = schedule([opponent, spec], args.games, args.board, args.seed)
+        return round(summarize(list(run_tournament(jobs)), spec, opponent)["score"], 3)
+
+    records = []
+    for name in ROLLOUTS:
+        timed = "mcts:rollout={},time={}".format(name, budget)
+        records.append({"rollout": name, "playouts_per_second": round(speeds[name], 1),
+                        "seconds_per_move": budget,
+                        "randy_score": score("mcts:rollout={},rollouts={}".format(name, args.rollouts), "randy"),
+                        "randy_timed_score": score(timed, "randy"),
+                        "uniform_timed_score": score(timed, uniform) if name != "uniform" else 0.5})
+    return records
+
+@benchmark
+def profiling(args):
+    """
+    Rollouts per second of single-process search with and without the
+    per-phase profile of mcts_stats, and the share of the time each phase
+    takes.
+    """
+    board, player = midgame_board(args.board, args.board * args.board // 4)
+    records = []
+    for profile in (False, True, False, True):
+        random.seed(args.seed)
+        root = mcts_ai.Node(board, player, None, [], 0, 1)
+        root.store.reseed(args.seed)
+        phases = dict.fromkeys(PHASES, 0.0) if profile else None
+        stats = mcts_ai.search(root, args.rollouts, 5, early_stop=False, profile=phases)
+        record = {"profile": profile, "rollouts": stats["iterations"],
+                  "rollouts_per_second": round(stats["rollouts_per_second"], 1)}
+        if profile:
+            for phase, seconds in phases.items():
+                record[phase + "_share"] = round(seconds / stats["seconds"], 3)
+        records.append(record)
+    return records
+
+
+# Games played per setting by the pondering benchmark
+PONDER_GAMES = 3
+
+
+def _ponder_game(dimension, rollouts, think, ponder, rng):
+    """
+    Play MCTS (dark) against a random player that thinks for think seconds
+    per move, and return the visits MCTS inherited at each of its moves and
+    its Ponderer, if pondering.
+    """
+    game = OthelloGameManager(dimension)
+    ponderer = mcts_ai.Ponderer() if ponder else None
+    node = None
+    inherited = []
+    while not game.is_terminal():
+        board, player = game.board, game.current_player
+        if player == 1:
+            if ponderer is not None:
+                ponderer.stop(board, player)
+            root = mcts_ai.reuse_root(node, board, player) or mcts_ai.Node(board, player, None, [], 0, 1)
+            info = {}
+            i, j = mcts_ai.mcts(board, player, rollouts, info=info, root=root)
+            inherited.append(info["inherited_visits"])
+            node = root.get_child(play_move(board, player, i, j))
+            if ponderer is not None:
+                ponderer.start(node)
+        else:
+            time.sleep(think)  # Releases the GIL, as reading the next board does
+            i, j = rng.choice(game.get_possible_moves())
+        game.play(i, j)
+    if ponderer is not None:
+        ponderer.stop()
+    return inherited, ponderer
+
+
+@benchmark
+def pondering(args):
+    """
+    Pondering hit rate and the visits it adds to the tree MCTS starts each
+    move with, against a random opponent that thinks for a fixed time per
+    move, compared with tree reuse alone.
+    """
+    records = []
+    for think in (0.02, 0.1):
+        for ponder in (False, True):
+            rng = random.Random(args.seed)
+            inherited = []
+            moves = hits = gained = 0
+            for _ in range(PONDER_GAMES):
+                visits, ponderer = _ponder_game(args.board, args.rollouts, think, ponder, rng)
+                inherited.extend(visits)
+                if ponderer is not None:
+                    moves += ponderer.moves
+                    hits += ponderer.hits
+                    gained += ponderer.gained
+            record = {"think_seconds": think, "ponder": ponder, "moves": len(inherited),
+                      "inherited_per_move": round(sum(inherited) / len(inherited), 1)}
+            if ponder:
+                record["hit_rate"] = round(hits / moves, 3)
+                record["gained_per_move"] = round(gained / moves, 1)
+            records.append(record)
+    return records
+
+
+# Self-play games the value_model benchmark trains on
+VALUE_GAMES = 1000
+
+
+@benchmark
+def value_model(args):
+    """
+    Leaves per second of a linear and an MLP value model (see mcts_value),
+    trained on VALUE_GAMES randy games, against playouts, in batches of 16,
+    and the score of MCTS using each of them against randy at args.rollouts
+    rollouts per move and at the time per move playouts need for them, and
+    against MCTS with playouts at that time (strength per CPU-second).
+    """
+    board, player = midgame_board(args.board, args.board * args.board // 4)
+    root = mcts_ai.Node(board, player, None, [], 0, 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        models = {"playout": None}
+        training = {}
+        for name, hidden in (("linear", 0), ("mlp", 32)):
+            models[name] = os.path.join(tmp, name + ".npz")
+            start = time.perf_counter()
+            train(args.board, VALUE_GAMES, hidden=hidden, seed=args.seed).save(models[name])
+            training[name] = round(time.perf_counter() - start, 1)
+        speeds = {}
+        for name in ("playout", "linear", "mlp"):
+            random.seed(args.seed)
+            mcts_ai.mcts(board, player, args.rollouts, batch_size=16, root=root, seed=args.seed,
+                         evaluator=ValueModel.load(models[name]) if models[name] else None)
+            store = root.store
+            ids = np.repeat(np.arange(len(store)), 16)[:16 * (args.rollouts // 16)]
+            start = time.perf_counter()
+            for batch in ids.reshape(-1, 16):
+                store.simulate_batch(batch)
+            speeds[name] = len(ids) / (time.perf_counter() - start)
+        budget = round(args.rollouts / speeds["playout"], 4)
+        playout = "mcts:batch_size=16,time={}".format(budget)
+
+        def score(spec, opponent):
+            jobs = schedule([opponent, spec], args.games, args.board, args.seed)
+            return round(summarize(list(run_tournament(jobs)), spec, opponent)["score"], 3)
+
+        records = []
+        for name in ("playout", "linear", "mlp"):
+            spec = "mcts:batch_size=16" + (",value=" + models[name] if models[name] else "")
+            timed = "{},time={}".format(spec, budget)
+            record = {"leaves": name, "leaves_per_second": round(speeds[name], 1), "seconds_per_move": budget,
+                      "randy_score": score("{},rollouts={}".format(spec, args.rollouts), "randy"),
+                      "randy_timed_score": score(timed, "randy"),
+                      "playout_timed_score": score(timed, playout) if models[name] else 0.5}
+            if name in training:
+                record["training_seconds"] = training[name]
+            records.append(record)
+    return records
+
+
+# (schedule, equivalence parameter) pairs the rave benchmark tries
+RAVE_SETTINGS = (("equivalence", 10), ("equivalence", 50), ("equivalence", 250), ("mse", 10), ("mse", 50))
+
+
+@benchmark
+def rave(args):
+    """
+    Rollouts per second of MCTS with RAVE for each of RAVE_SETTINGS from a
+    midgame position, and its score against plain MCTS at args.rollouts
+    rollouts per move and at the time per move plain MCTS needs for them.
+    """
+    board, player = midgame_board(args.board, args.board * args.board // 4)
+    speeds = {}
+    for name, k in (("equivalence", 0),) + RAVE_SETTINGS:
+        info = {}
+        mcts_ai.mcts(board, player, args.rollouts, info=info, seed=args.seed, rave=k,
+                     rave_schedule=RAVE_SCHEDULES[name])
+        speeds[name, k] = info["rollouts_per_second"]
+    plain_speed = speeds["equivalence", 0]
+    budget = round(args.rollouts / plain_speed, 4)
+    plain = "mcts:rollouts={}".format(args.rollouts)
+    plain_timed = "mcts:time={}".format(budget)
+
+    def score(spec, opponent):
+        jobs = schedule([opponent, spec], args.games, args.board, args.seed)
+        return round(summarize(list(run_tournament(jobs)), spec, opponent)["score"], 3)
+
+    records = []
+    for name, k in RAVE_SETTINGS:
+        spec = "mcts:rave={},rave_schedule={}".format(k, name)
+        records.append({"schedule": name, "k": k, "rollouts_per_second": round(speeds[name, k], 1),
+                        "plain_rollouts_per_second": round(plain_speed, 1), "seconds_per_move": budget,
+                        "score": score("{},rollouts={}".format(spec, args.rollouts), plain),
+                        "timed_score": score("{},time={}".format(spec, budget), plain_timed)})
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Othello benchmarks")
+    parser.add_argument("names", nargs="*", help="Benchmarks to run (default all): {}".format(
+        ", ".join(sorted(BENCHMARKS))))
+    parser.add_argument("-b", "--board", default=8, type=int, help="Board size (default 8x8)")
+    parser.add_argument("--rollouts", default=400, type=int, help="Rollouts per search (default 400)")
+    parser.add_argument("--workers", default=multiprocessing.cpu_count(), type=int,
+                        help="Largest worker count to try (default: all cores)")
+    parser.add_argument("--games", default=20, type=int, help="Games per match (default 20)")
+    parser.add_argument("--plies", default=10, type=int, help="Plies counted by the symmetry benchmark (default 10)")
+    parser.add_argument("--seed", default=0, type=int, help="Random seed")
+    args = parser.parse_args()
+
+    for name in args.names or sorted(BENCHMARKS):
+        random.seed(args.seed)
+        np.random.seed(args.seed)
+        for record in BENCHMARKS[name](args):
+            print("{}: {}".format(name, " ".join("{}={}".format(k, v) for k, v in record.items())))
+
+
+if __name__ == "__main__":
+    main()
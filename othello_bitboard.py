@@ -0,0 +1,485 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*
+"""
+Bitboard move generation for Othello.
+
+A board of dimension n is stored as two integer masks, one per colour.
+Square (i, j) -- column i, row j -- is bit i * n + j, so walking the set bits
+of a mask from low to high visits squares in the same (column, row) order
+that othello_shared has always used.
+
+The scalar functions work on Python ints and take boards of any size.  The
+batched functions keep one mask per game in a NumPy uint64, so they, and
+everything built on them, support boards up to BATCH_MAX_DIMENSION only.
+"""
+
+from functools import lru_cache
+import numpy as np
+
+# (xdir, ydir) in the order othello_shared.find_lines reports lines.
+LINE_DIRECTIONS = ((0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1),
+                   (-1, 0), (-1, 1))
+
+
+# The eight rotations and reflections of the board, numbered 0-7: bit 0 of a
+# symmetry transposes columns and rows, then bit 1 mirrors the columns and
+# bit 2 the rows.  0 is the identity.
+SYMMETRIES = 8
+
+# Largest board dimension whose masks fit in a uint64
+BATCH_MAX_DIMENSION = 8
+
+
+def transform_square(i, j, t, n):
+    """
+    Return where symmetry t takes square (i, j) of an n x n board.
+    """
+    if t & 1:
+        i, j = j, i
+    if t & 2:
+        i = n - 1 - i
+    if t & 4:
+        j = n - 1 - j
+    return i, j
+
+
+# INVERSE[t] is the symmetry that undoes symmetry t
+INVERSE = tuple(next(u for u in range(SYMMETRIES)
+                     if all(transform_square(*transform_square(i, j, t, 3), u, 3) == (i, j)
+                            for i in range(3) for j in range(3)))
+                for t in range(SYMMETRIES))
+
+
+class Geometry(object):
+    """
+    Precomputed masks for one board dimension.
+    """
+
+    def __init__(self, n):
+        if n < 1:
+            raise ValueError("Board dimension must be positive, got {}".format(n))
+        self.n = n
+        self.squares = n * n
+        self.full = (1 << self.squares) - 1
+
+        first_row = 0
+        last_row = 0
+        for i in range(n):
+            first_row |= 1 << (i * n)
+            last_row |= 1 << (i * n + n - 1)
+
+        # One (shift, mask) pair per direction.  A step of ydir = +1 moves
+        # from row n-1 of one column into row 0 of the next, so those bits are
+        # masked out after shifting (and likewise for ydir = -1).
+        self.directions = []
+        for xdir, ydir in LINE_DIRECTIONS:
+            mask = self.full
+            if ydir == 1:
+                mask &= ~first_row
+            elif ydir == -1:
+                mask &= ~last_row
+            self.directions.append((xdir * n + ydir, mask))
+
+        # index[j, i] is the bit index of square (i, j), laid out like a
+        # NumPy board so masks convert with a single vectorized operation.
+        # Boards that fit in a uint64 also get the shifts and weights for
+        # that; larger ones convert through Python ints.
+        self.index = np.arange(n)[None, :] * n + np.arange(n)[:, None]
+        self.batched = n <= BATCH_MAX_DIMENSION
+        if self.batched:
+            self.shifts = self.index.astype(np.uint64)
+            self.weights = np.left_shift(np.uint64(1), self.shifts)
+
+        # square_maps[t, k] is the bit index that symmetry t takes bit k to
+        self.square_maps = np.array([[i * n + j for i, j in (transform_square(*divmod(k, n), t, n)
+                                                             for k in range(self.squares))]
+                                     for t in range(SYMMETRIES)],
+                                    dtype=np.int8 if self.squares <= 128 else np.int32)
+
+        # symmetry_tables[t][byte][value] is where the bits of value, taken
+        # as byte number byte of a mask, land under symmetry t
+        self.symmetry_tables = []
+        for t in range(SYMMETRIES):
+            tables = []
+            for byte in range((self.squares + 7) // 8):
+                table = [0] * 256
+                for value in range(1, 256):
+                    low = value & -value
+                    k = byte * 8 + low.bit_length() - 1
+                    if k < self.squares:
+                        i, j = transform_square(*divmod(k, n), t, n)
+                        table[value] = table[value ^ low] | 1 << (i * n + j)
+                    else:
+                        table[value] = table[value ^ low]
+                tables.append(table)
+            self.symmetry_tables.append(tables)
+
+
+@lru_cache(maxsize=None)
+def geometry(n):
+    return Geometry(n)
+
+
+def batch_geometry(n):
+    """
+    Return the geometry for n, for batched operations, which need masks that
+    fit in a uint64.
+    """
+    geo = geometry(n)
+    if not geo.batched:
+        raise ValueError("Batched bitboards support boards up to {0}x{0}, got {1}x{1}".format(
+            BATCH_MAX_DIMENSION, n))
+    return geo
+
+
+def shift(x, s):
+    return x << s if s > 0 else x >> -s
+
+
+def iter_bits(x):
+    """
+    Yield the indices of the set bits of x, lowest first.
+    """
+    while x:
+        low = x & -x
+        yield low.bit_length() - 1
+        x ^= low
+
+
+def square_bit(i, j, n):
+    return 1 << (i * n + j)
+
+
+def bit_square(k, n):
+    """
+    Return the (column, row) tuple for bit index k.
+    """
+    return divmod(k, n)
+
+
+def popcount(x):
+    return bin(x).count("1")
+
+
+def board_to_bitboards(board):
+    """
+    Convert a NumPy board into a (dark, light) pair of masks.
+    """
+    geo = geometry(board.shape[0])
+    if not geo.batched:
+        dark = sum(1 << k for k in geo.index[board == 1].tolist())
+        light = sum(1 << k for k in geo.index[board == 2].tolist())
+        return dark, light
+    dark = int(geo.weights[board == 1].sum(dtype=np.uint64))
+    light = int(geo.weights[board == 2].sum(dtype=np.uint64))
+    return dark, light
+
+
+def player_bitboards(board, player):
+    """
+    Convert a NumPy board into an (own, opponent) pair of masks for player.
+    """
+    dark, light = board_to_bitboards(board)
+    return (dark, light) if player == 1 else (light, dark)
+
+
+def mask_to_array(mask, n):
+    """
+    Return an n x n boolean array that is True on the squares set in mask.
+    """
+    geo = geometry(n)
+    if not geo.batched:
+        bits = np.array([mask >> k & 1 for k in range(geo.squares)], dtype=bool)
+        return bits[geo.index]
+    return ((np.uint64(mask) >> geo.shifts) & np.uint64(1)).astype(bool)
+
+
+def bitboards_to_board(dark, light, n, dtype=float):
+    """
+    Convert a (dark, light) pair of masks back into a NumPy board.
+    """
+    board = np.zeros((n, n), dtype=dtype)
+    board[mask_to_array(dark, n)] = 1
+    board[mask_to_array(light, n)] = 2
+    return board
+
+
+def legal_moves(own, opp, n):
+    """
+    Return the mask of squares where the player owning own can play.
+    """
+    geo = geometry(n)
+    empty = geo.full & ~(own | opp)
+    moves = 0
+    for s, mask in geo.directions:
+        mask_opp = mask & opp
+        x = shift(own, s) & mask_opp
+        for _ in range(n - 3):
+            x |= shift(x, s) & mask_opp
+        moves |= shift(x, s) & mask & empty
+    return moves
+
+
+def flips(own, opp, move, n):
+    """
+    Return the mask of opponent stones flipped by playing the single-bit
+    mask move.
+    """
+    flipped = 0
+    for s, mask in geometry(n).directions:
+        line = 0
+        x = shift(move, s) & mask
+        while x & opp:
+            line |= x
+            x = shift(x, s) & mask
+        if x & own:
+            flipped |= line
+    return flipped
+
+
+def apply_move(own, opp, move, n):
+    """
+    Play the single-bit mask move and return the new (own, opp) masks.
+    """
+    flipped = flips(own, opp, move, n)
+    return own | flipped | move, opp & ~flipped
+
+
+# Batched operations.  Each argument is a NumPy uint64 array holding one mask
+# per game, so a whole batch of games advances with a handful of array
+# operations per direction.
+
+def batch_shift(x, s):
+    return x << np.uint64(s) if s > 0 else x >> np.uint64(-s)
+
+
+def batch_legal_moves(own, opp, n):
+    geo = batch_geometry(n)
+    empty = np.uint64(geo.full) & ~(own | opp)
+    moves = np.zeros_like(own)
+    for s, mask in geo.directions:
+        mask = np.uint64(mask)
+        mask_opp = mask & opp
+        x = batch_shift(own, s) & mask_opp
+        for _ in range(n - 3):
+            x |= batch_shift(x, s) & mask_opp
+        moves |= batch_shift(x, s) & mask & empty
+    return moves
+
+
+def batch_flips(own, opp, move, n):
+    flipped = np.zeros_like(own)
+    for s, mask in batch_geometry(n).directions:
+        mask = np.uint64(mask)
+        line = np.zeros_like(own)
+        bracket = np.zeros_like(own)
+        x = batch_shift(move, s) & mask
+        for _ in range(n - 1):
+            bracket |= x & own
+            x &= opp
+            line |= x
+            x = batch_shift(x, s) & mask
+        flipped |= np.where(bracket != 0, line, np.uint64(0))
+    return flipped
+
+
+def batch_to_bits(x, n):
+    """
+    Unpack each mask into a row of n * n booleans.
+    """
+    batch_geometry(n)
+    return ((x[:, None] >> np.arange(n * n, dtype=np.uint64)) & np.uint64(1)).astype(bool)
+
+
+def batch_popcount(x, n):
+    return batch_to_bits(x, n).sum(axis=1)
+
+
+def batch_random_moves(moves, n):
+    """
+    Pick one set bit uniformly at random from each nonzero mask.  Rows with no
+    set bits get a zero move.
+    """
+    bits = batch_to_bits(moves, n)
+    choice = np.argmax(np.random.random(bits.shape) * bits, axis=1)
+    picked = np.left_shift(np.uint64(1), choice.astype(np.uint64))
+    return np.where(moves != 0, picked, np.uint64(0))
+
+
+def batch_playout(dark, light, players, n, choose=None, with_plies=False, with_moves=False):
+    """
+    Play random games from every (dark, light, player) position in lockstep
+    until neither player has a legal move, and return the final dark - light
+    disk differences.  A player without a legal move passes.  Moves are
+    uniformly random, or picked by choose(own, opp, moves, n), which returns
+    one move mask per game like batch_random_moves.  With with_plies, also
+    return the number of moves played in each game, and with with_moves the
+    masks of the squares dark and light played in each game, in that order.
+    """
+    dark = np.array(dark, dtype=np.uint64)
+    light = np.array(light, dtype=np.uint64)
+    players = np.array(players)
+    active = np.ones(len(dark), dtype=bool)
+    start = batch_popcount(dark | light, n) if with_plies else None
+    dark_moves = np.zeros(len(dark), dtype=np.uint64)
+    light_moves = np.zeros(len(dark), dtype=np.uint64)
+    while True:
+        is_dark = players == 1
+        own = np.where(is_dark, dark, light)
+        opp = np.where(is_dark, light, dark)
+        moves = batch_legal_moves(own, opp, n)
+        stuck = active & (moves == 0)
+        if stuck.any():
+            # Games where neither side can move are over; in the others the
+            # stuck player passes by playing an empty move below
+            active &= ~(stuck & (batch_legal_moves(opp, own, n) == 0))
+        if not active.any():
+            break
+        moves = np.where(active, moves, np.uint64(0))
+        move = batch_random_moves(moves, n) if choose is None else choose(own, opp, moves, n)
+        if with_moves:
+            dark_moves |= np.where(is_dark, move, np.uint64(0))
+            light_moves |= np.where(is_dark, np.uint64(0), move)
+        flipped = batch_flips(own, opp, move, n)
+        own = own | flipped | move
+        opp = opp & ~flipped
+        dark = np.where(is_dark, own, opp)
+        light = np.where(is_dark, opp, own)
+        players = np.where(active, 3 - players, players)
+    values = batch_popcount(dark, n) - batch_popcount(light, n)
+    result = (values,)
+    if with_plies:
+        # Every move adds one stone
+        result += (batch_popcount(dark | light, n) - start,)
+    if with_moves:
+        result += (dark_moves, light_moves)
+    return result if len(result) > 1 else values
+
+
+def transform(mask, t, n):
+    """
+    Return mask after symmetry t.
+    """
+    tables = geometry(n).symmetry_tables[t]
+    result = 0
+    byte = 0
+    while mask:
+        result |= tables[byte][mask & 0xff]
+        mask >>= 8
+        byte += 1
+    return result
+
+
+def transform_bit(k, t, n):
+    """
+    Return the bit index that symmetry t takes bit index k (a move) to.
+    """
+    i, j = transform_square(*divmod(k, n), t, n)
+    return i * n + j
+
+
+def symmetries(dark, light, n):
+    """
+    Return the symmetries other than the identity that leave a position
+    unchanged; usually there are none.
+    """
+    return [t for t in range(1, SYMMETRIES)
+            if transform(dark, t, n) == dark and transform(light, t, n) == light]
+
+
+def unique_moves(dark, light, moves, n):
+    """
+    Return the mask moves with only one move, the lowest, kept from every
+    set of moves that a symmetry of the position takes into each other.
+    Such moves lead to positions that are images of each other, so only
+    one of them needs searching.
+    """
+    stabilizer = symmetries(dark, light, n)
+    if not stabilizer:
+        return moves
+    unique = 0
+    for k in iter_bits(moves):
+        if not any(unique >> transform_bit(k, t, n) & 1 for t in stabilizer):
+            unique |= 1 << k
+    return unique
+
+
+def canonical(dark, light, n):
+    """
+    Return the canonical form of a position: the (dark, light) pair that is
+    smallest among its symmetric images, and the symmetry that produces it.
+    """
+    best = (dark, light, 0)
+    for t in range(1, SYMMETRIES):
+        image = (transform(dark, t, n), transform(light, t, n), t)
+        if image < best:
+            best = image
+    return best
+
+
+# Zobrist hashing.  Every (colour, square) pair gets a random 64-bit key and
+# a position hashes to the XOR of the keys of its stones, plus a key when
+# light is to move.  The keys are folded into one table per colour and byte
+# of the mask, so a hash costs one lookup per colour and byte of the board.
+# Boards over 8x8 get the tables of their further bytes on first use, from
+# seeds of their own, so the keys of the first 64 squares never change.
+
+def _zobrist_byte_tables(keys):
+    # Fold the keys of the squares of one byte of each colour into tables
+    # indexed by the value of that byte
+    tables = []
+    for colour in range(2):
+        table = [0] * 256
+        for value in range(1, 256):
+            low = value & -value
+            table[value] = table[value ^ low] ^ keys[colour][low.bit_length() - 1]
+        tables.append(table)
+    return tables
+
+
+def _zobrist_tables(seed=0x0704):
+    rng = np.random.RandomState(seed)
+    keys = [[int(k) for k in rng.randint(0, 2**63, size=64, dtype=np.int64)] for _ in range(2)]
+    tables = [[], []]  # Indexed by colour, then byte
+    for byte in range(8):
+        for colour, table in enumerate(_zobrist_byte_tables([k[byte * 8:byte * 8 + 8] for k in keys])):
+            tables[colour].append(table)
+    side = int(rng.randint(0, 2**63, dtype=np.int64))
+    return tables, side
+
+
+ZOBRIST_TABLES, ZOBRIST_SIDE = _zobrist_tables()
+
+
+def _extend_zobrist_tables(seed=0x0704):
+    byte = len(ZOBRIST_TABLES[0])
+    rng = np.random.RandomState([seed, byte])
+    keys = [[int(k) for k in rng.randint(0, 2**63, size=8, dtype=np.int64)] for _ in range(2)]
+    for colour, table in enumerate(_zobrist_byte_tables(keys)):
+        ZOBRIST_TABLES[colour].append(table)
+
+
+def zobrist_hash(dark, light, player):
+    """
+    Return the Zobrist hash of a position with player to move.
+    """
+    dark_tables, light_tables = ZOBRIST_TABLES
+    h = ZOBRIST_SIDE if player == 2 else 0
+    byte = 0
+    while dark or light:
+        if byte == len(dark_tables):
+            _extend_zobrist_tables()
+        h ^= dark_tables[byte][dark & 0xff] ^ light_tables[byte][light & 0xff]
+        dark >>= 8
+        light >>= 8
+        byte += 1
+    return h
+
+
+def canonical_hash(dark, light, player, n):
+    """
+    Return the Zobrist hash of the canonical form of a position, which all
+    its symmetric images share.
+    """
+    dark, light, _ = canonical(dark, light, n)
+    return zobrist_hash(dark, light, player)
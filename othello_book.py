@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*
+"""
+Precomputed game values for Othello.
+
+The builder solves positions exactly and writes their values to a table
+file; EndgameTable memory-maps such a file and answers probes with a binary
+search, so a table costs no time to load and only the pages that are
+touched are read.
+
+A table covers every position with at most max_empties empty squares that
+the builder reached.  On 4x4 boards the builder walks the whole game tree
+from the opening, so every reachable position is covered; on larger boards
+it solves the endgames of a number of random games.  Positions are stored
+once per symmetry class, under the Zobrist hash of their canonical form.
+
+File layout: a header (magic, version, dimension, max_empties, count)
+followed by count (key, value) entries sorted by key, where value is the
+final dark - light disk difference under perfect play.
+
+    python othello_book.py -b 4 -o book4.tbl
+    python othello_book.py -b 8 --empties 8 --games 500 -o book8.tbl
+"""
+
+import argparse
+import random
+import struct
+import sys
+import time
+import numpy as np
+from othello_bitboard import legal_moves, apply_move, iter_bits, popcount, canonical_hash, board_to_bitboards
+
+MAGIC = b"OTEB"
+VERSION = 1
+_HEADER = struct.Struct("<4sBBBxQ")
+ENTRY = np.dtype([("key", "<u8"), ("value", "i1")])
+
+
+def position_key(dark, light, player, n):
+    """
+    Return the table key of a position: the hash of its canonical form.
+    """
+    return canonical_hash(dark, light, player, n)
+
+
+class EndgameTable(object):
+    """
+    A memory-mapped table of exact position values.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            magic, version, self.n, self.max_empties, count = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("{} is not an endgame table".format(path))
+        self.entries = np.memmap(path, dtype=ENTRY, mode="r", offset=_HEADER.size, shape=(count,))
+        self.keys = self.entries["key"]
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def covers(self, dark, light):
+        return self.n * self.n - popcount(dark | light) <= self.max_empties
+
+    def probe(self, dark, light, player):
+        """
+        Return the final dark - light disk difference under perfect play, or
+        None if the position is not in the table.
+        """
+        if not self.covers(dark, light):
+            return None
+        key = position_key(dark, light, player, self.n)
+        pos = int(np.searchsorted(self.keys, key))
+        if pos < len(self.keys) and int(self.keys[pos]) == key:
+            self.hits += 1
+            return int(self.entries["value"][pos])
+        self.misses += 1
+        return None
+
+    def best_move(self, dark, light, player, deadline=None):
+        """
+        Return the best move (bit index) for player in the position if the
+        table has the values of all its successors, else None.  Lookups are
+        quick, so the deadline, which EndgameSolver.best_move takes, is
+        ignored.
+        """
+        own, opp = (dark, light) if player == 1 else (light, dark)
+        best = None
+        for move in iter_bits(legal_moves(own, opp, self.n)):
+            new_own, new_opp = apply_move(own, opp, 1 << move, self.n)
+            next_player = 3 - player
+            if not legal_moves(new_opp, new_own, self.n) and legal_moves(new_own, new_opp, self.n):
+                next_player = player
+            new_dark, new_light = (new_own, new_opp) if player == 1 else (new_opp, new_own)
+            value = self.probe(new_dark, new_light, next_player)
+            if value is None:
+                return None
+            if player == 2:
+                value = -value
+            if best is None or value > best[0]:
+                best = (value, move)
+        return best[1] if best is not None else None
+
+
+def solve(own, opp, n, values, player=1):
+    """
+    Return the final own - opp disk difference under perfect play with the
+    owner of own to move, recording the dark - light value of every
+    position of the game tree in values, keyed (dark, light, player).
+    """
+    dark, light = (own, opp) if player == 1 else (opp, own)
+    value = values.get((dark, light, player))
+    if value is not None:
+        return value if player == 1 else -value
+    moves = legal_moves(own, opp, n)
+    if not moves:
+        if not legal_moves(opp, own, n):
+            result = popcount(own) - popcount(opp)
+        else:
+            return -solve(opp, own, n, values, 3 - player)  # Pass
+    else:
+        result = -n * n
+        for move in iter_bits(moves):
+            new_own, new_opp = apply_move(own, opp, 1 << move, n)
+            result = max(result, -solve(new_opp, new_own, n, values, 3 - player))
+    values[dark, light, player] = result if player == 1 else -result
+    return result
+
+
+def build(n, max_empties, games=0, seed=0, log=None):
+    """
+    Solve positions of an n x n board and return their values as a sorted
+    array of (key, value) entries.  With games = 0 the whole game tree from
+    the opening is solved; otherwise every position with max_empties empty
+    squares on games random games is.
+    """
+    from othello_game import OthelloGameManager  # Kept out of the AI's startup
+    values = {}
+    dark, light = board_to_bitboards(OthelloGameManager(n).board)
+    if not games:
+        solve(dark, light, n, values)
+    else:
+        rng = random.Random(seed)
+        for game in range(games):
+            own, opp, player = dark, light, 1
+            while True:
+                if n * n - popcount(own | opp) <= max_empties:
+                    solve(own, opp, n, values, player)
+                    break
+                moves = legal_moves(own, opp, n)
+                if not moves:
+                    if not legal_moves(opp, own, n):
+                        break
+                else:
+                    own, opp = apply_move(own, opp, 1 << rng.choice(list(iter_bits(moves))), n)
+                own, opp, player = opp, own, 3 - player
+            if log is not None and (game + 1) % 50 == 0:
+                log("{} games, {} positions".format(game + 1, len(values)))
+    table = {}
+    for (d, l, player), value in values.items():
+        if n * n - popcount(d | l) <= max_empties:
+            table[position_key(d, l, player, n)] = value
+    entries = np.empty(len(table), dtype=ENTRY)
+    entries["key"] = list(table.keys())
+    entries["value"] = list(table.values())
+    entries.sort(order="key")
+    return entries
+
+
+def write_table(path, n, max_empties, entries):
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, n, max_empties, len(entries)))
+        f.write(entries.tobytes())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build an Othello endgame table")
+    parser.add_argument("-b", default=4, type=int, help="Board size (default 4x4)")
+    parser.add_argument("--empties", type=int,
+                        help="Largest number of empty squares to cover (default: all on 4x4, else 8)")
+    parser.add_argument("--games", type=int,
+                        help="Random games whose endgames are solved (default: the whole tree on 4x4, else 200)")
+    parser.add_argument("--seed", default=0, type=int, help="Random seed")
+    parser.add_argument("-o", "--output", required=True, help="Table file to write")
+    args = parser.parse_args()
+
+    small = args.b <= 4
+    empties = args.empties if args.empties is not None else (args.b * args.b - 4 if small else 8)
+    games = args.games if args.games is not None else (0 if small else 200)
+    log = lambda msg: print(msg, file=sys.stderr)
+    start = time.perf_counter()
+    entries = build(args.b, empties, games, args.seed, log)
+    write_table(args.output, args.b, empties, entries)
+    print("{} positions up to {} empties in {:.1f}s, {} bytes".format(
+        len(entries), empties, time.perf_counter() - start, len(entries) * ENTRY.itemsize), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*
+"""
+Exact endgame solver for Othello.
+
+Near the end of the game an exact search is both cheaper and better than
+random playouts.  EndgameSolver runs a negamax alpha-beta search on
+bitboards with fastest-first move ordering (moves that leave the opponent
+the fewest replies are tried first, corners breaking ties) and a
+transposition table of value bounds.  Values are final disk differences,
+scored like compute_utility.
+
+A solver has the same probe()/best_move() interface as
+othello_book.EndgameTable, so mcts() can use either for its root and its
+leaves.  best_move() solves positions with at most max_empties empty
+squares; probe(), which MCTS calls for every new leaf, only those with at
+most leaf_empties.  best_move() also takes a deadline: a solve that has not
+finished by then is abandoned, and the caller searches instead.
+"""
+
+import time
+from othello_bitboard import legal_moves, apply_move, iter_bits, popcount, geometry
+
+# Empties up to which a whole solve takes well under a second on 8x8
+DEFAULT_EMPTIES = 12
+
+# Empties up to which a solve is cheap enough for every MCTS leaf
+LEAF_EMPTIES = 6
+
+# Below this many empties, ordering moves costs more than it saves
+ORDER_EMPTIES = 5
+
+# Nodes searched between checks of the deadline
+CHECK_NODES = 1024
+
+
+class OutOfTime(Exception):
+    """
+    Raised inside a search that has run past its deadline.
+    """
+
+
+class EndgameSolver(object):
+
+    def __init__(self, n, max_empties=DEFAULT_EMPTIES, leaf_empties=LEAF_EMPTIES, tt_size=1000000):
+        self.n = n
+        self.max_empties = max_empties
+        self.leaf_empties = min(leaf_empties, max_empties)
+        self.tt_size = tt_size
+        self.tt = {}  # (own, opp) -> (lower, upper) bounds on own - opp
+        full = geometry(n).full
+        self.corners = 1 | 1 << (n - 1) | 1 << (n * (n - 1)) | 1 << (n * n - 1)
+        self.corners &= full
+        self.nodes = 0
+        self.seconds = 0.0
+        self.aborted = 0  # Solves abandoned at their deadline
+        self.deadline = None
+        self.next_check = 0
+
+    def covers(self, dark, light, empties=None):
+        limit = self.max_empties if empties is None else empties
+        return self.n * self.n - popcount(dark | light) <= limit
+
+    def probe(self, dark, light, player):
+        """
+        Return the final dark - light disk difference under perfect play, or
+        None if the position has more than leaf_empties empty squares.
+        """
+        if not self.covers(dark, light, self.leaf_empties):
+            return None
+        own, opp = (dark, light) if player == 1 else (light, dark)
+        value = self.solve(own, opp)
+        return value if player == 1 else -value
+
+    def best_move(self, dark, light, player, deadline=None):
+        """
+        Return the best move (bit index) for player, or None if the position
+        has more than max_empties empty squares, player cannot move, or the
+        solve is not done by deadline (a time.perf_counter() value).
+        """
+        if not self.covers(dark, light):
+            return None
+        own, opp = (dark, light) if player == 1 else (light, dark)
+        start = time.perf_counter()
+        best = None
+        alpha = -self.n * self.n - 1
+        self.deadline = deadline
+        self.next_check = self.nodes + CHECK_NODES
+        try:
+            for move, new_own, new_opp in self.ordered(own, opp, legal_moves(own, opp, self.n)):
+                value = -self.search(new_opp, new_own, -self.n * self.n - 1, -alpha)
+                if value > alpha:
+                    alpha = value
+                    best = move
+        except OutOfTime:
+            # Bounds are only stored for finished nodes, so the table stays
+            # valid for later solves
+            self.aborted += 1
+            best = None
+        finally:
+            self.deadline = None
+            self.seconds += time.perf_counter() - start
+        return best
+
+    def solve(self, own, opp):
+        """
+        Return the final own - opp disk difference under perfect play with
+        the owner of own to move.
+        """
+        start = time.perf_counter()
+        bound = self.n * self.n + 1
+        value = self.search(own, opp, -bound, bound)
+        self.seconds += time.perf_counter() - start
+        return value
+
+    def ordered(self, own, opp, moves):
+        """
+        Return (move, own, opp) for every move in the mask moves, best
+        first.
+        """
+        n = self.n
+        children = []
+        for move in iter_bits(moves):
+            new_own, new_opp = apply_move(own, opp, 1 << move, n)
+            children.append((move, new_own, new_opp))
+        if len(children) > 1 and n * n - popcount(own | opp) > ORDER_EMPTIES:
+            corners = self.corners
+            children.sort(key=lambda c: (popcount(legal_moves(c[2], c[1], n)), not (1 << c[0]) & corners))
+        return children
+
+    def search(self, own, opp, alpha, beta):
+        self.nodes += 1
+        if self.deadline is not None and self.nodes >= self.next_check:
+            self.next_check = self.nodes + CHECK_NODES
+            if time.perf_counter() >= self.deadline:
+                raise OutOfTime
+        n = self.n
+        moves = legal_moves(own, opp, n)
+        if not moves:
+            if not legal_moves(opp, own, n):
+                return popcount(own) - popcount(opp)
+            return -self.search(opp, own, -beta, -alpha)  # Pass
+        key = (own, opp)
+        bounds = self.tt.get(key)
+        if bounds is not None:
+            lower, upper = bounds
+            if lower >= beta:
+                return lower
+            if upper <= alpha or lower == upper:
+                return upper
+            alpha = max(alpha, lower)
+            beta = min(beta, upper)
+        original_alpha = alpha
+        best = -n * n - 1
+        for _, new_own, new_opp in self.ordered(own, opp, moves):
+            value = -self.search(new_opp, new_own, -beta, -alpha)
+            if value > best:
+                best = value
+                if best > alpha:
+                    alpha = best
+                    if alpha >= beta:
+                        break
+        if len(self.tt) >= self.tt_size:
+            self.tt.clear()
+        lower, upper = bounds if bounds is not None else (-n * n, n * n)
+        if best <= original_alpha:
+            upper = best
+        elif best >= beta:
+            lower = best
+        else:
+            lower = upper = best
+        self.tt[key] = (lower, upper)
+        return best
+
+    def stats(self):
+        return {"nodes": self.nodes, "seconds": self.seconds,
+                "nodes_per_second": self.nodes / self.seconds if self.seconds else 0.0,
+                "tt_entries": len(self.tt), "aborted": self.aborted}
@@ -7,10 +7,15 @@ players.
 Credit: Dr. Daniel Bauer
 """
 import sys
+import time
 import subprocess
 import numpy as np
-from threading import Timer
-from othello_shared import find_lines, get_possible_moves, play_move, get_score
+from threading import Thread
+from concurrent.futures import Future, InvalidStateError, wait, FIRST_COMPLETED
+from othello_shared import get_score, GameState
+from othello_bitboard import iter_bits, bit_square
+from othello_protocol import (PROTOCOL_TEXT, NEW_GAME, MOVE_TIMEOUT, parse_introduction, choose_protocol, write_frame,
+                              read_frame, encode_board, encode_final, decode, format_board)
 
 class InvalidMoveError(RuntimeError):
     pass
@@ -20,6 +25,60 @@ class AiTimeoutError(RuntimeError):
     pass
 
 
+class MoveFuture(Future):
+    """
+    The pending move of an AI player.  Besides the usual Future interface it
+    carries the time by which the AI has to answer; an AI that misses its
+    deadline is killed and the future fails with AiTimeoutError.
+    """
+
+    def __init__(self, player, deadline):
+        super().__init__()
+        self.player = player
+        self.deadline = deadline
+
+    def remaining(self):
+        return max(self.deadline - time.monotonic(), 0.0)
+
+    def resolve(self, move):
+        # The reader thread may lose the race against the deadline
+        try:
+            self.set_result(move)
+        except InvalidStateError:
+            pass
+
+    def fail(self, exception):
+        try:
+            self.set_exception(exception)
+        except InvalidStateError:
+            pass
+
+    def expire(self):
+        if not self.done():
+            self.player.timeout()
+            self.fail(AiTimeoutError())
+
+    def check_deadline(self):
+        """
+        Return True if the move is available, expiring the future first if
+        the deadline has passed.  Does not block.
+        """
+        if not self.done() and time.monotonic() >= self.deadline:
+            self.expire()
+        return self.done()
+
+    def wait(self):
+        """
+        Block until the move arrives or the deadline passes, then return the
+        move or raise AiTimeoutError.
+        """
+        if not self.done():
+            wait([self], timeout=self.remaining())
+            if not self.done():
+                self.expire()
+        return self.result()
+
+
 class Player(object):
     def __init__(self, color, name="Human"):
         self.name = name
@@ -31,17 +90,28 @@ class Player(object):
 
 class AiPlayerInterface(Player):
 
-    TIMEOUT = 10
+    TIMEOUT = MOVE_TIMEOUT
 
     def __init__(self, filename, color):
+        self.filename = filename
         self.color = color
+        self.timed_out = False
+        start = time.perf_counter()
         self.process = subprocess.Popen([sys.executable, '-u', filename], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
         self.process.stdin.flush()
-        name = self.process.stdout.readline().decode("ASCII").strip()
+        name, offered = parse_introduction(self.process.stdout.readline().decode("ASCII"))
         print("AI introduced itself as: {}".format(name))
         self.name = name
-        self.process.stdin.write((str(color)+"\n").encode("ASCII"))
+        # Accept the binary protocol if the AI offers it (see othello_protocol)
+        self.protocol = choose_protocol(offered)
+        # AIs offering NEW_GAME can be kept for further games (see othello_pool)
+        self.reusable = NEW_GAME in offered
+        if self.protocol == PROTOCOL_TEXT:
+            self.process.stdin.write((str(color)+"\n").encode("ASCII"))
+        else:
+            self.process.stdin.write("{} {}\n".format(color, self.protocol).encode("ASCII"))
         self.process.stdin.flush()
+        self.startup_seconds = time.perf_counter() - start
 
     def timeout(self): 
         sys.stderr.write("{} timed out.".format(self.name))
@@ -49,30 +119,83 @@ class AiPlayerInterface(Player):
         self.timed_out = True
 
     def get_move(self, manager):
+        return self.request_move(manager).wait()
+
+    def request_move(self, manager):
+        """
+        Send the board to the AI and return a MoveFuture for its answer,
+        which is read on a background thread.
+        """
         white_score, dark_score = get_score(manager.board)
-        self.process.stdin.write("SCORE {} {}\n".format(white_score, dark_score).encode("ASCII"))
-        self.process.stdin.flush()
-        self.process.stdin.write("{}\n".format(str(tuple(map(tuple, manager.board)))).encode("ASCII"))
-        self.process.stdin.flush()
+        if self.protocol == PROTOCOL_TEXT:
+            self.process.stdin.write("SCORE {} {}\n".format(white_score, dark_score).encode("ASCII"))
+            self.process.stdin.flush()
+            self.process.stdin.write("{}\n".format(format_board(manager.board)).encode("ASCII"))
+            self.process.stdin.flush()
+        else:
+            write_frame(self.process.stdin, encode_board(manager.board, white_score, dark_score))
 
-        timer = Timer(AiPlayerInterface.TIMEOUT, lambda: self.timeout())
         self.timed_out = False
-        timer.start()
+        future = MoveFuture(self, time.monotonic() + AiPlayerInterface.TIMEOUT)
+        Thread(target=self.read_move, args=(future,), daemon=True).start()
+        return future
 
+    def read_move(self, future):
         # Wait for the AI call
-        move_s = self.process.stdout.readline().decode("ASCII")
-
-        if self.timed_out:  
-            raise AiTimeoutError
-        timer.cancel()
-        i_s, j_s = move_s.strip().split()
-        i = int(i_s)
-        j = int(j_s)
-        return i, j
+        try:
+            if self.protocol == PROTOCOL_TEXT:
+                move_s = self.process.stdout.readline().decode("ASCII")
+                i_s, j_s = move_s.strip().split()
+                future.resolve((int(i_s), int(j_s)))
+            else:
+                payload = read_frame(self.process.stdout)
+                if payload is None:
+                    raise EOFError("{} closed its output".format(self.name))
+                future.resolve(decode(payload)[1])
+        except Exception as e:
+            future.fail(e)
     
+    def healthy(self):
+        return not self.timed_out and self.process.poll() is None
+
+    def finish(self, manager):
+        """
+        Tell the AI the game is over without stopping it, so that it can be
+        given a new game.  An AI that does not acknowledge this in time is
+        killed and AiTimeoutError raised.
+        """
+        white_score, dark_score = get_score(manager.board)
+        if self.protocol == PROTOCOL_TEXT:
+            self.process.stdin.write("FINAL {} {}\n".format(white_score, dark_score).encode("ASCII"))
+            self.process.stdin.flush()
+            future = MoveFuture(self, time.monotonic() + AiPlayerInterface.TIMEOUT)
+            Thread(target=self.read_acknowledgement, args=(future,), daemon=True).start()
+            future.wait()
+        else:
+            write_frame(self.process.stdin, encode_final(manager.dimension, white_score, dark_score))
+
+    def read_acknowledgement(self, future):
+        # The AI acknowledges FINAL with an empty line
+        try:
+            self.process.stdout.readline()
+            future.resolve(None)
+        except Exception as e:
+            future.fail(e)
+
+    def new_game(self, color):
+        self.color = color
+        self.process.stdin.write("NEW GAME {}\n".format(color).encode("ASCII"))
+        self.process.stdin.flush()
+
     def kill(self, manager):
         white_score, dark_score = get_score(manager.board)
-        self.process.stdin.write("FINAL {} {}\n".format(white_score, dark_score).encode("ASCII"))
+        try:
+            if self.protocol == PROTOCOL_TEXT:
+                self.process.stdin.write("FINAL {} {}\n".format(white_score, dark_score).encode("ASCII"))
+            else:
+                write_frame(self.process.stdin, encode_final(manager.dimension, white_score, dark_score))
+        except BrokenPipeError:
+            pass  # The AI has already exited, e.g. after timing out
         self.process.kill() 
 
 
@@ -81,8 +204,27 @@ class OthelloGameManager(object):
     def __init__(self, dimension=4):
 
         self.dimension = dimension
-        self.board = self.create_initial_board()
-        self.current_player = 1
+        self._board = self.create_initial_board()
+        # The position with its legal moves; see othello_shared.GameState
+        self.state = GameState.from_board(self._board, 1)
+        self.moves = []  # (column,row) of every move played, for game records
+
+    @property
+    def board(self):
+        return self._board
+
+    @board.setter
+    def board(self, board):
+        self._board = board
+        self.state = GameState.from_board(board, self.state.player)
+
+    @property
+    def current_player(self):
+        return self.state.player
+
+    @current_player.setter
+    def current_player(self, player):
+        self.state = GameState(self.state.dark, self.state.light, player, self.dimension)
             
     def create_initial_board(self):
         board = np.zeros((self.dimension, self.dimension))
@@ -94,41 +236,87 @@ class OthelloGameManager(object):
         return board
 
     def play(self, i, j):
+        """
+        Play column i and row j for the current player and return the list
+        of (column,row) tuples that changed, the placed stone first.  If the
+        opponent then has no legal move they pass, and the current player
+        stays the same; state.passed tells whether that happened.
+        """
         if self.board[j, i] != 0:
            raise InvalidMoveError("Occupied square.")
-        lines = find_lines(self.board, i, j, self.current_player)
-        if not lines:  
+        if not self.state.is_legal(i, j):  
            raise InvalidMoveError("Invalid Move.")
      
-        self.board = play_move(self.board, self.current_player, i, j) 
-        self.current_player = 1 if self.current_player == 2 else 2
+        old = self.state
+        self.state = old.play(i, j)
+        self.moves.append((i, j))
+        self._board = self.state.board()
+        flipped = (old.dark & self.state.light) | (old.light & self.state.dark)
+        return [(i, j)] + [bit_square(k, self.dimension) for k in iter_bits(flipped)]
 
     def get_possible_moves(self):
-        return get_possible_moves(self.board, self.current_player)
+        return self.state.moves()
+
+    def is_terminal(self):
+        return self.state.is_terminal()
+
+
+def play_game(game, player1, player2, recorder=None):
+    play_games([(game, player1, player2)], recorder=recorder)
+
 
+def play_games(matches, pool=None, recorder=None):
+    """
+    Play several games at once.  matches is a list of (game, player1,
+    player2) tuples; every AI thinks in its own process while this loop
+    waits for whichever move arrives first.  Players are killed at the end
+    of their game, or handed back to pool (an othello_pool.AiWorkerPool)
+    if one is given.  With a recorder (an othello_record.RecordWriter),
+    every game is appended to its file as it ends.
+    """
+    pending = {}  # match index -> MoveFuture of the player to move
+    active = list(range(len(matches)))
 
-def play_game(game, player1, player2):
+    def prefix(k):
+        return "Game {}: ".format(k + 1) if len(matches) > 1 else ""
 
-    players = [None, player1, player2]
+    def finish(k):
+        game, player1, player2 = matches[k]
+        p1score, p2score = get_score(game.board)
+        print("{}FINAL: {} (dark) {}:{} {} (light)".format(prefix(k), player1.name, p1score, p2score, player2.name))
+        if recorder is not None:
+            recorder.write_game(game)
+        for player in (player1, player2):
+            if pool is not None:
+                pool.release(player, game)
+            else:
+                player.kill(game)
+        active.remove(k)
 
-    while True: 
-        player_obj = players[game.current_player]
-        possible_moves = game.get_possible_moves() 
-        if not possible_moves: 
-            p1score, p2score = get_score(game.board)
-            print("FINAL: {} (dark) {}:{} {} (light)".format(player1.name, p1score, p2score, player2.name))
-            player1.kill(game)
-            player2.kill(game)
-            break 
-        else: 
+    while active: 
+        for k in list(active):
+            game, player1, player2 = matches[k]
+            if k not in pending:
+                if game.is_terminal():
+                    finish(k)
+                else:
+                    pending[k] = [None, player1, player2][game.current_player].request_move(game)
+                continue
+            future = pending[k]
+            if not future.check_deadline():
+                continue
+            del pending[k]
             color = "dark" if game.current_player == 1 else "light"
             try: 
-                i, j = player_obj.get_move(game)
-                print("{} ({}) plays {},{}".format(player_obj.name, color, i, j))
+                i, j = future.result()
+                print("{}{} ({}) plays {},{}".format(prefix(k), future.player.name, color, i, j))
                 game.play(i,j)
+                if game.state.passed:
+                    opponent = [None, player1, player2][3 - game.current_player]
+                    print("{}{} ({}) passes".format(prefix(k), opponent.name, "light" if color == "dark" else "dark"))
             except AiTimeoutError:
-                print("{} ({}) timed out!".format(player_obj.name, color))
-                print("FINAL: {} (dark) {}:{} {} (light)".format(player_obj.name, p1score, p2score, player2.name))
-                player1.kill(game)
-                player2.kill(game)
-                break
+                print("{}{} ({}) timed out!".format(prefix(k), future.player.name, color))
+                finish(k)
+        if pending:
+            futures = list(pending.values())
+            wait(futures, timeout=min(f.remaining() for f in futures), return_when=FIRST_COMPLETED)
@@ -10,14 +10,19 @@ from tkinter import *
 from tkinter import scrolledtext
 
 from othello_game import OthelloGameManager, AiPlayerInterface, Player, InvalidMoveError, AiTimeoutError
-from othello_shared import get_possible_moves, get_score
+from othello_shared import get_score
+from othello_record import RecordWriter
 
 class OthelloGui(object):
 
-    def __init__(self, game_manager, player1, player2):
+    POLL_MS = 50  # How often a thinking AI's move is checked for
+
+    def __init__(self, game_manager, player1, player2, recorder=None):
 
         self.game = game_manager
+        self.recorder = recorder  # Writes the game when it ends, if set
         self.players = [None, player1, player2]
+        self.pending = None  # MoveFuture of the AI that is thinking
         self.height = self.game.dimension
         self.width = self.game.dimension 
         
@@ -38,6 +43,9 @@ class OthelloGui(object):
         self.score_label.pack(side="top")
         self.canvas.pack()
         self.text.pack()
+        # One persistent square and disk per cell, recolored as stones change
+        self.disks = {}
+        self.draw_grid()
         self.draw_board()
 
     def get_position(self, x, y):
@@ -51,9 +59,10 @@ class OthelloGui(object):
         try:
             player = "Dark" if self.game.current_player == 1 else "Light"
             self.log("{}: {},{}".format(player, i, j))
-            self.game.play(i, j)
-            self.draw_board()
-            if not get_possible_moves(self.game.board, self.game.current_player):
+            changed = self.game.play(i, j)
+            self.draw_board(changed)
+            self.log_pass()
+            if self.game.is_terminal():
                 self.shutdown("Game Over")
             elif isinstance(self.players[self.game.current_player], AiPlayerInterface):
                 self.root.unbind("<Button-1>")
@@ -64,21 +73,40 @@ class OthelloGui(object):
     def shutdown(self, text):
         self.move_label["text"] = text 
         self.root.unbind("<Button-1>")
+        if self.recorder is not None:
+            self.recorder.write_game(self.game)
+            self.recorder.close()
+            self.recorder = None
         if isinstance(self.players[1], AiPlayerInterface): 
             self.players[1].kill(self.game)
         if isinstance(self.players[2], AiPlayerInterface): 
             self.players[2].kill(self.game)
  
     def ai_move(self):
-        player_obj = self.players[self.game.current_player]
+        # Ask for the move without waiting for it, so the window stays
+        # responsive while the AI thinks
+        self.pending = self.players[self.game.current_player].request_move(self.game)
+        self.root.after(self.POLL_MS, lambda: self.poll_ai_move())
+
+    def poll_ai_move(self):
+        future = self.pending
+        player_obj = future.player
+        if not future.check_deadline():
+            elapsed = AiPlayerInterface.TIMEOUT - future.remaining()
+            self.move_label["text"] = "{} thinking{} {:.1f}s".format(
+                player_obj.name, "." * (int(elapsed * 2) % 4), elapsed)
+            self.root.after(self.POLL_MS, lambda: self.poll_ai_move())
+            return
+        self.pending = None
         try:
-            i,j = player_obj.get_move(self.game)
+            i,j = future.result()
             player = "Dark" if self.game.current_player == 1 else "Light"
             player = "{} {}".format(player_obj.name, player)
             self.log("{}: {},{}".format(player, i, j))
-            self.game.play(i, j)
-            self.draw_board()
-            if not get_possible_moves(self.game.board, self.game.current_player):
+            changed = self.game.play(i, j)
+            self.draw_board(changed)
+            self.log_pass()
+            if self.game.is_terminal():
                 self.shutdown("Game Over")
             elif isinstance(self.players[self.game.current_player], AiPlayerInterface):
                 self.root.after(1, lambda: self.ai_move())
@@ -95,37 +123,51 @@ class OthelloGui(object):
         self.draw_board()
         self.canvas.mainloop()
 
-    def draw_board(self):
-        self.draw_grid()
-        self.draw_disks()
+    def draw_board(self, changed=None):
+        """
+        Redraw the (column,row) cells in changed, or every cell if changed
+        is None, and update the labels.
+        """
+        self.draw_disks(changed)
         player = "Dark" if self.game.current_player == 1 else "Light"
         self.move_label["text"] = player
         self.score_label["text"] = "Dark {} : {} Light".format(*get_score(self.game.board))
    
+    def log_pass(self):
+        if self.game.state.passed:
+            self.log("{} passes".format("Light" if self.game.current_player == 1 else "Dark"))
+
     def log(self, msg, newline=True):
         self.text.insert("end", "{}{}".format(msg, "\n" if newline else ""))
         self.text.see("end")
  
     def draw_grid(self):
+        # Creates the canvas items, once; later draws only reconfigure them
+        padding = 2
         for i in range(self.height):
             for j in range(self.width):
-                self.canvas.create_rectangle(i*self.cell_size + self.offset, j*self.cell_size + self.offset,
-                                             (i+1)*self.cell_size + self.offset, (j+1)*self.cell_size + self.offset,
-                                             fill="dark green")
+                x = i * self.cell_size + self.offset
+                y = j * self.cell_size + self.offset
+                self.canvas.create_rectangle(x, y, x + self.cell_size, y + self.cell_size, fill="dark green")
+                self.disks[i, j] = self.canvas.create_oval(x+padding, y+padding, x+self.cell_size-padding,
+                                                           y+self.cell_size-padding, state="hidden")
        
     def draw_disk(self, i, j, color):
-        x = i * self.cell_size + self.offset
-        y = j * self.cell_size + self.offset
-        padding = 2
-        self.canvas.create_oval(x+padding, y+padding, x+self.cell_size-padding, y+self.cell_size-padding, fill=color)
+        if color is None:
+            self.canvas.itemconfigure(self.disks[i, j], state="hidden")
+        else:
+            self.canvas.itemconfigure(self.disks[i, j], fill=color, state="normal")
         
-    def draw_disks(self):
-        for i in range(self.height): 
-            for j in range(self.width):
-                if self.game.board[i, j] == 1:
-                    self.draw_disk(j, i, "black")
-                elif self.game.board[i, j] == 2:
-                    self.draw_disk(j, i, "white")
+    def draw_disks(self, cells=None):
+        if cells is None:
+            cells = [(i, j) for i in range(self.width) for j in range(self.height)]
+        for i, j in cells:
+            if self.game.board[j, i] == 1:
+                self.draw_disk(i, j, "black")
+            elif self.game.board[j, i] == 2:
+                self.draw_disk(i, j, "white")
+            else:
+                self.draw_disk(i, j, None)
 
 
 def main():
@@ -142,6 +184,9 @@ def main():
     parser.add_argument(
         "-b", default=4, type=int, help="Board size (default 4x4)"
     )
+    parser.add_argument(
+        "--record", metavar="FILE", help="Append the game to this record file (see othello_record)"
+    )
     args = parser.parse_args()
 
     if args.p1 is None:
@@ -154,7 +199,8 @@ def main():
         p2 = AiPlayerInterface(args.p2, 2)
 
     game = OthelloGameManager(dimension=args.b)
-    gui = OthelloGui(game, p1, p2)
+    recorder = RecordWriter(args.record) if args.record is not None else None
+    gui = OthelloGui(game, p1, p2, recorder)
     gui.run()
 
 if __name__ == "__main__":
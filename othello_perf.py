@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*
+"""
+Performance regression suite for the Othello engine and the MCTS player.
+
+Measures perft leaf counts and speed from the opening, through the board
+API of othello_shared (get_possible_moves and play_move) and directly on
+bitboards, along with simulate() rollouts per second, mcts() iterations per
+second and peak memory per 10k tree nodes, on each board size.  Node counts
+are checked against each other and against the published 8x8 counts; a
+mismatch fails the run.
+
+Results are written as JSON: every metric has a value and the direction in
+which it is better ("higher", "lower", or "equal" for node counts).  With
+--compare, the results are checked against a stored baseline and the run
+fails if any metric is worse by more than --threshold (a fraction), or if
+any node count differs at all.
+
+    python othello_perf.py -o baseline.json
+    python othello_perf.py -o current.json --compare baseline.json --threshold 0.15
+"""
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+import numpy as np
+from othello_game import OthelloGameManager
+from othello_shared import get_possible_moves, play_move
+from othello_bitboard import board_to_bitboards, legal_moves, apply_move, iter_bits
+import mcts_ai
+
+# Perft depth searched on each board size
+PERFT_DEPTHS = {4: 8, 6: 6, 8: 6}
+
+# Leaf counts of 8x8 perft by depth, passes counted as plies
+PERFT_8X8 = (1, 4, 12, 56, 244, 1396, 8200, 55092, 390216, 3005288)
+
+# Nodes per memory measurement unit
+MEMORY_NODES = 10000
+
+
+def perft(board, player, depth):
+    """
+    Return the number of positions (leaves) depth plies from (board,
+    player), using the board API.  A pass is a ply; games that end sooner count nothing.
+    """
+    if depth == 0:
+        return 1
+    moves = get_possible_moves(board, player)
+    if not moves:
+        if not get_possible_moves(board, 3 - player):
+            return 0
+        return perft(board, 3 - player, depth - 1)
+    return sum(perft(play_move(board, player, i, j), 3 - player, depth - 1) for i, j in moves)
+
+
+def bitboard_perft(own, opp, n, depth):
+    """
+    The same count on bitboards, own to move.
+    """
+    if depth == 0:
+        return 1
+    moves = legal_moves(own, opp, n)
+    if not moves:
+        if not legal_moves(opp, own, n):
+            return 0
+        return bitboard_perft(opp, own, n, depth - 1)
+    total = 0
+    for move in iter_bits(moves):
+        new_own, new_opp = apply_move(own, opp, 1 << move, n)
+        total += bitboard_perft(new_opp, new_own, n, depth - 1)
+    return total
+
+
+def best_time(func, repeat):
+    """
+    Return the result of func() and the shortest of repeat timings of it.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def measure(n, args):
+    """
+    Return the metrics of board size n as {name: (value, better)}, and a
+    list of correctness failures.
+    """
+    board = OthelloGameManager(n).board
+    dark, light = board_to_bitboards(board)
+    depth = PERFT_DEPTHS.get(n, 4) if args.depth is None else args.depth
+    prefix = "{0}x{0}.".format(n)
+    metrics = {}
+    failures = []
+
+    nodes, seconds = best_time(lambda: perft(board, 1, depth), args.repeat)
+    bit_nodes, bit_seconds = best_time(lambda: bitboard_perft(dark, light, n, depth), args.repeat)
+    metrics[prefix + "perft_depth"] = (depth, "equal")
+    metrics[prefix + "perft_nodes"] = (nodes, "equal")
+    metrics[prefix + "perft_board_nodes_per_second"] = (nodes / seconds, "higher")
+    metrics[prefix + "perft_bitboard_nodes_per_second"] = (nodes / bit_seconds, "higher")
+    if bit_nodes != nodes:
+        failures.append("{}: board API perft {} != bitboard perft {}".format(prefix + "perft_nodes", nodes, bit_nodes))
+    if n == 8 and depth < len(PERFT_8X8) and nodes != PERFT_8X8[depth]:
+        failures.append("{}: {} != published count {}".format(prefix + "perft_nodes", nodes, PERFT_8X8[depth]))
+
+    # Rollouts from the opening, which are the longest
+    root = mcts_ai.Node(board, 1, None, [], 0, 1)
+    random.seed(args.seed)
+    _, seconds = best_time(lambda: [root.store.simulate(root.index) for _ in range(args.rollouts)], args.repeat)
+    metrics[prefix + "simulate_rollouts_per_second"] = (args.rollouts / seconds, "higher")
+
+    def search():
+        random.seed(args.seed)
+        root = mcts_ai.Node(board, 1, None, [], 0, 1)
+        root.store.reseed(args.seed)
+        return mcts_ai.search(root, args.rollouts, 5, early_stop=False)
+    _, seconds = best_time(search, args.repeat)
+    metrics[prefix + "mcts_iterations_per_second"] = (args.rollouts / seconds, "higher")
+
+    # Peak memory of a search of MEMORY_NODES iterations, which adds up to
+    # that many nodes (fewer once it reaches the ends of small games), per
+    # MEMORY_NODES nodes
+    random.seed(args.seed)
+    tracemalloc.start()
+    root = mcts_ai.Node(board, 1, None, [], 0, 1)
+    mcts_ai.search(root, MEMORY_NODES, 5, early_stop=False)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    metrics[prefix + "peak_bytes_per_10k_nodes"] = (peak * MEMORY_NODES / len(root.store), "lower")
+    return metrics, failures
+
+
+def compare(metrics, baseline, threshold):
+    """
+    Return a description of every metric that is worse than in baseline by
+    more than threshold, or differs from it for "equal" metrics.
+    """
+    regressions = []
+    for name, entry in sorted(baseline.items()):
+        if name not in metrics:
+            continue
+        old, new, better = entry["value"], metrics[name]["value"], entry["better"]
+        if better == "equal":
+            worse = new != old
+        elif better == "higher":
+            worse = new < old * (1 - threshold)
+        else:
+            worse = new > old * (1 + threshold)
+        if worse:
+            change = (new - old) / old if old else float("inf")
+            regressions.append("{}: {:g} -> {:g} ({:+.1%}, {} is better)".format(name, old, new, change, better))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Othello performance regression suite")
+    parser.add_argument("-b", "--boards", default=[4, 6, 8], type=int, nargs="+",
+                        help="Board sizes to measure (default 4 6 8)")
+    parser.add_argument("--depth", type=int, help="Perft depth on every board (default {})".format(
+        ", ".join("{0}x{0}: {1}".format(n, d) for n, d in sorted(PERFT_DEPTHS.items()))))
+    parser.add_argument("--rollouts", default=400, type=int, help="Rollouts per measurement (default 400)")
+    parser.add_argument("--repeat", default=3, type=int, help="Timings per measurement, best kept (default 3)")
+    parser.add_argument("--seed", default=0, type=int, help="Random seed")
+    parser.add_argument("-o", "--output", help="JSON file to write the results to")
+    parser.add_argument("--compare", metavar="BASELINE", help="Fail on regressions against this results file")
+    parser.add_argument("--threshold", default=0.1, type=float,
+                        help="Fraction by which a metric may be worse than the baseline (default 0.1)")
+    args = parser.parse_args()
+
+    metrics = {}
+    failures = []
+    for n in args.boards:
+        board_metrics, board_failures = measure(n, args)
+        failures.extend(board_failures)
+        for name, (value, better) in board_metrics.items():
+            metrics[name] = {"value": round(value, 1) if isinstance(value, float) else value, "better": better}
+            print("{}: {}".format(name, metrics[name]["value"]))
+
+    if args.output is not None:
+        results = {"python": platform.python_version(), "numpy": np.__version__, "machine": platform.machine(),
+                   "date": time.strftime("%Y-%m-%dT%H:%M:%S"), "metrics": metrics}
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+    if args.compare is not None:
+        with open(args.compare) as f:
+            failures.extend(compare(metrics, json.load(f)["metrics"], args.threshold))
+    for failure in failures:
+        print("FAIL " + failure, file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*
+"""
+A pool of warm AI processes for the game manager.
+
+Starting an AI means starting a Python interpreter and importing NumPy,
+which on small boards takes longer than the game itself.  AIs that offer the
+"newgame" feature (see othello_protocol) are therefore kept alive after their
+game and started on the next one with "NEW GAME <color>".  Before a worker is
+reused it is checked: workers that crashed or timed out are replaced by a
+fresh process, as are those that do not acknowledge the end of their game
+within the move timeout.
+
+    with AiWorkerPool() as pool:
+        for _ in range(100):
+            game = OthelloGameManager(4)
+            play_games([(game, pool.acquire("mcts_ai.py", 1), pool.acquire("randy_ai.py", 2))], pool)
+"""
+
+import time
+from othello_game import AiPlayerInterface, AiTimeoutError
+
+
+class AiWorkerPool(object):
+
+    def __init__(self):
+        self.idle = {}  # filename -> list of finished AiPlayerInterfaces
+        self.started = 0
+        self.reused = 0
+        self.restarted = 0
+        self.startup_seconds = []  # Time to get each acquired player ready
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def acquire(self, filename, color):
+        """
+        Return a player running filename with the given color, reusing an
+        idle worker if a healthy one is available.
+        """
+        idle = self.idle.get(filename, [])
+        while idle:
+            player = idle.pop()
+            if player.healthy():
+                start = time.perf_counter()
+                try:
+                    player.new_game(color)
+                except BrokenPipeError:
+                    pass
+                else:
+                    self.reused += 1
+                    self.startup_seconds.append(time.perf_counter() - start)
+                    return player
+            player.process.kill()
+            self.restarted += 1
+        player = AiPlayerInterface(filename, color)
+        self.started += 1
+        self.startup_seconds.append(player.startup_seconds)
+        return player
+
+    def release(self, player, manager):
+        """
+        End the game for player and keep it for a later game, or stop it if
+        it cannot be reused.
+        """
+        if player.reusable and player.healthy():
+            try:
+                player.finish(manager)
+            except BrokenPipeError:
+                pass
+            except AiTimeoutError:
+                self.restarted += 1  # Killed by finish(); replaced on the next acquire
+            else:
+                self.idle.setdefault(player.filename, []).append(player)
+                return
+        player.kill(manager)
+
+    def close(self):
+        for players in self.idle.values():
+            for player in players:
+                player.process.kill()
+                player.process.wait()
+        self.idle.clear()
+
+    def stats(self):
+        acquired = len(self.startup_seconds)
+        return {"started": self.started, "reused": self.reused, "restarted": self.restarted,
+                "mean_startup_seconds": sum(self.startup_seconds) / acquired if acquired else 0.0}
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*
+"""
+Wire protocol between the game manager and AI subprocesses.
+
+The original protocol is line based: the AI prints its name, reads its
+color, then every turn reads "SCORE d l" (or "FINAL d l") followed by the
+board as a Python tuple literal and answers "i j".
+
+AIs that support the binary protocol append a tab and the protocols they
+speak to their name line, e.g. "MCTS AI\tbinary1".  A manager that accepts
+one of them answers with the color followed by the chosen protocol
+("1 binary1"); otherwise it sends the plain color and both sides stay on the
+text protocol, so old AIs and old managers keep working.
+
+AIs that offer "newgame" can play several games in one process: after FINAL
+the manager may send the line "NEW GAME <color>" and the next game starts
+with the given color, in the protocol already chosen.
+
+In the binary protocol every message is a frame: a 2-byte big-endian length
+followed by the payload.  Payloads start with the protocol version and a
+message type:
+
+    board  version 'B' dimension dark_score light_score dark light
+    final  version 'F' dimension dark_score light_score
+    move   version 'M' i j
+
+The dark and light masks of a board are big-endian unsigned integers of
+mask_bytes(dimension) bytes each: 8 bytes (a u64) up to 8x8, enough bytes
+for all the squares on larger boards.
+"""
+
+import ast
+import struct
+import numpy as np
+from othello_bitboard import board_to_bitboards, bitboards_to_board
+
+PROTOCOL_TEXT = "text"
+PROTOCOL_BINARY = "binary1"
+SUPPORTED_PROTOCOLS = (PROTOCOL_BINARY,)
+NEW_GAME = "newgame"
+
+# Seconds an AI has to answer a board before the manager kills it
+MOVE_TIMEOUT = 10
+
+VERSION = 1
+BOARD = b"B"[0]
+FINAL = b"F"[0]
+MOVE = b"M"[0]
+
+_LENGTH = struct.Struct(">H")
+_BOARD = struct.Struct(">BBBBB")  # Followed by the two masks
+_FINAL = struct.Struct(">BBBBB")
+_MOVE = struct.Struct(">BBBB")
+
+
+class ProtocolError(RuntimeError):
+    pass
+
+
+def introduction(name, protocols=SUPPORTED_PROTOCOLS):
+    """
+    Return the first line an AI sends: its name and the protocols it offers.
+    """
+    if not protocols:
+        return name
+    return "{}\t{}".format(name, ",".join(protocols))
+
+
+def parse_introduction(line):
+    """
+    Split an AI's first line into its name and the protocols it offers.
+    """
+    name, _, offered = line.partition("\t")
+    return name.strip(), [p for p in offered.strip().split(",") if p]
+
+
+def choose_protocol(offered):
+    for protocol in SUPPORTED_PROTOCOLS:
+        if protocol in offered:
+            return protocol
+    return PROTOCOL_TEXT
+
+
+def write_frame(stream, payload):
+    stream.write(_LENGTH.pack(len(payload)) + payload)
+    stream.flush()
+
+
+def _read_exactly(stream, size):
+    data = b""
+    while len(data) < size:
+        chunk = stream.read(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+def read_frame(stream):
+    """
+    Read one frame and return its payload, or None if the stream ended.
+    """
+    header = _read_exactly(stream, _LENGTH.size)
+    if header is None:
+        return None
+    return _read_exactly(stream, _LENGTH.unpack(header)[0])
+
+
+def mask_bytes(n):
+    return max(8, (n * n + 7) // 8)
+
+
+def encode_board(board, dark_score, light_score):
+    n = board.shape[0]
+    dark, light = board_to_bitboards(board)
+    size = mask_bytes(n)
+    return (_BOARD.pack(VERSION, BOARD, n, dark_score, light_score)
+            + dark.to_bytes(size, "big") + light.to_bytes(size, "big"))
+
+
+def encode_final(dimension, dark_score, light_score):
+    return _FINAL.pack(VERSION, FINAL, dimension, dark_score, light_score)
+
+
+def encode_move(i, j):
+    return _MOVE.pack(VERSION, MOVE, i, j)
+
+
+def decode(payload):
+    """
+    Decode a payload into (kind, fields): ("SCORE", (dark_score,
+    light_score, board)), ("FINAL", (dark_score, light_score)) or ("MOVE",
+    (i, j)).
+    """
+    if len(payload) < 2 or payload[0] != VERSION:
+        raise ProtocolError("Unsupported message: {!r}".format(payload))
+    kind = payload[1]
+    if kind == BOARD and len(payload) > _BOARD.size:
+        _, _, n, dark_score, light_score = _BOARD.unpack_from(payload)
+        size = mask_bytes(n)
+        if len(payload) == _BOARD.size + 2 * size:
+            dark = int.from_bytes(payload[_BOARD.size:_BOARD.size + size], "big")
+            light = int.from_bytes(payload[_BOARD.size + size:], "big")
+            return "SCORE", (dark_score, light_score, bitboards_to_board(dark, light, n))
+    if kind == FINAL and len(payload) == _FINAL.size:
+        _, _, _, dark_score, light_score = _FINAL.unpack(payload)
+        return "FINAL", (dark_score, light_score)
+    if kind == MOVE and len(payload) == _MOVE.size:
+        return "MOVE", _MOVE.unpack(payload)[2:]
+    raise ProtocolError("Malformed message: {!r}".format(payload))
+
+
+def format_board(board):
+    # tolist() gives plain Python numbers, whose repr is a literal under
+    # every NumPy version
+    return str(tuple(map(tuple, board.tolist())))
+
+
+def parse_board(line):
+    # Text protocol boards are tuple literals; literal_eval accepts nothing
+    # but literals, unlike eval
+    return np.array(ast.literal_eval(line))
+
+
+class ManagerConnection(object):
+    """
+    The AI side of the protocol, talking to the game manager over binary
+    stdin/stdout streams.
+    """
+
+    def __init__(self, name, stdin, stdout, protocols=SUPPORTED_PROTOCOLS, features=(NEW_GAME,)):
+        self.name = name
+        self.stdin = stdin
+        self.stdout = stdout
+        self.protocols = protocols
+        self.features = features
+        self.protocol = PROTOCOL_TEXT
+
+    def _write_line(self, line):
+        self.stdout.write((line + "\n").encode("ASCII"))
+        self.stdout.flush()
+
+    def _read_line(self):
+        line = self.stdin.readline()
+        if not line:
+            raise EOFError
+        return line.decode("ASCII")
+
+    def handshake(self):
+        """
+        Introduce the AI and return its color (1 for dark, 2 for light).
+        """
+        self._write_line(introduction(self.name, tuple(self.protocols) + tuple(self.features)))
+        fields = self._read_line().split()
+        if len(fields) > 1 and fields[1] in self.protocols:
+            self.protocol = fields[1]
+        return int(fields[0])
+
+    def read_turn(self):
+        """
+        Wait for the next message and return (status, dark_score,
+        light_score, board), where status is "SCORE" or "FINAL" and board is
+        None once the game is over.
+        """
+        if self.protocol == PROTOCOL_TEXT:
+            status, dark_score_s, light_score_s = self._read_line().strip().split()
+            if status == "FINAL":
+                self._write_line("")
+                return status, int(dark_score_s), int(light_score_s), None
+            return status, int(dark_score_s), int(light_score_s), parse_board(self._read_line())
+        payload = read_frame(self.stdin)
+        if payload is None:
+            raise EOFError
+        status, fields = decode(payload)
+        if status == "FINAL":
+            return (status,) + fields + (None,)
+        return (status,) + fields
+
+    def next_game(self):
+        """
+        After FINAL, wait for the manager to start another game and return
+        the new color, or None if the manager is done with this AI.
+        """
+        line = self.stdin.readline()
+        if not line:
+            return None
+        fields = line.decode("ASCII").split()
+        if fields[:2] != ["NEW", "GAME"] or len(fields) != 3:
+            raise ProtocolError("Expected NEW GAME, got {!r}".format(line))
+        return int(fields[2])
+
+    def send_move(self, i, j):
+        if self.protocol == PROTOCOL_TEXT:
+            self._write_line("{} {}".format(i, j))
+        else:
+            write_frame(self.stdout, encode_move(i, j))
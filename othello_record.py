@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*
+"""
+Compact binary game records for Othello.
+
+A record file holds games one after another, each stored as a small
+header (board dimension, number of moves, final dark - light disk
+difference, flags) followed by one byte per move, the bit index of its
+square.  Passes are not stored: replaying the moves with GameState, which
+folds passes, finds them again.  Games are only ever appended, so a file
+can be written by a tournament while it is read; a game cut short by a
+crash is ignored by the reader.
+
+RecordReader memory-maps a file and yields its games lazily, and a
+GameRecord replays its game one position at a time.  An index file maps
+the key of every position played (see othello_book.position_key, which
+symmetric positions share) to the offsets of the games that reached it.
+It is built bucket by bucket on disk, so neither building nor probing it
+loads the records into memory.
+
+File layouts: records are a header (magic, version) followed by games;
+an index is a header (magic, version, count) followed by count (key,
+offset) entries sorted by key.
+
+    python othello_tournament.py randy mcts -b 8 --record games.ogr
+    python othello_record.py index games.ogr -o games.idx
+    python othello_record.py dump games.ogr --limit 10
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import numpy as np
+from othello_bitboard import bit_square
+from othello_shared import GameState
+from othello_game import OthelloGameManager
+from othello_book import position_key
+
+MAGIC = b"OTGR"
+VERSION = 1
+_HEADER = struct.Struct("<4sBxxx")
+_GAME = struct.Struct("<BBbB")  # dimension, moves, dark - light, flags
+
+# Flag of games that were played to the end rather than cut short (by a
+# timeout, say)
+FINISHED = 1
+
+INDEX_MAGIC = b"OTGI"
+_INDEX_HEADER = struct.Struct("<4sBxxxQ")
+INDEX_ENTRY = np.dtype([("key", "<u8"), ("offset", "<u8")])
+
+# Index entries buffered in memory before they are spilled to bucket files
+SPILL_ENTRIES = 1 << 20
+
+
+def encode_game(moves, n, result, finished=True):
+    """
+    Return the bytes of a game of (column, row) moves on an n x n board
+    that ended with the dark - light disk difference result.
+    """
+    return (_GAME.pack(n, len(moves), result, FINISHED if finished else 0)
+            + bytes(i * n + j for i, j in moves))
+
+
+def game_bytes(game):
+    """
+    Return the bytes of the game of an OthelloGameManager so far.
+    """
+    dark, light = game.state.score()
+    return encode_game(game.moves, game.dimension, dark - light, game.is_terminal())
+
+
+class GameRecord(object):
+    """
+    One game of a record file, at byte offset offset.
+    """
+
+    __slots__ = ("offset", "n", "result", "flags", "squares")
+
+    def __init__(self, offset, n, result, flags, squares):
+        self.offset = offset
+        self.n = n
+        self.result = result  # Final dark - light disk difference
+        self.flags = flags
+        self.squares = squares  # Bit index of every move, as bytes
+
+    def __len__(self):
+        return len(self.squares)
+
+    @property
+    def finished(self):
+        return bool(self.flags & FINISHED)
+
+    def moves(self):
+        return [bit_square(k, self.n) for k in self.squares]
+
+    def states(self):
+        """
+        Yield the GameState before every move and the final one.
+        """
+        state = GameState.from_board(OthelloGameManager(self.n).board, 1)
+        yield state
+        for k in self.squares:
+            state = state.play(*bit_square(k, self.n))
+            yield state
+
+    def replay(self):
+        """
+        Yield (board, player, move) for every move of the game, with the
+        board and the player to move before it.
+        """
+        for state, k in zip(self.states(), self.squares):
+            yield state.board(), state.player, bit_square(k, self.n)
+
+
+class RecordWriter(object):
+    """
+    Appends games to a record file, creating it if need be.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, "ab")
+        if self.file.tell() == 0:
+            self.file.write(_HEADER.pack(MAGIC, VERSION))
+            self.file.flush()
+
+    def write(self, data):
+        """
+        Append the bytes of a game (see encode_game) and return its offset.
+        """
+        offset = self.file.tell()
+        self.file.write(data)
+        self.file.flush()
+        return offset
+
+    def write_game(self, game):
+        return self.write(game_bytes(game))
+
+    def close(self):
+        self.file.close()
+
+
+class RecordReader(object):
+    """
+    A memory-mapped record file.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            magic, version = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError("{} is not a game record file".format(path))
+            size = os.fstat(f.fileno()).st_size
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size > _HEADER.size else b""
+
+    def read(self, offset):
+        """
+        Return the game at offset, or None if it is incomplete.
+        """
+        end = offset + _GAME.size
+        if end > len(self.data):
+            return None
+        n, count, result, flags = _GAME.unpack_from(self.data, offset)
+        if end + count > len(self.data):
+            return None
+        return GameRecord(offset, n, result, flags, self.data[end:end + count])
+
+    def __iter__(self):
+        offset = _HEADER.size
+        while True:
+            record = self.read(offset)
+            if record is None:
+                return
+            yield record
+            offset += _GAME.size + len(record)
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+
+def build_index(record_path, index_path, buckets=64, log=None):
+    """
+    Write an index of the positions of every game of record_path to
+    index_path and return the number of entries.  Entries are spilled to
+    one temporary file per range of keys (buckets of them, a power of two),
+    which is then sorted on its own.
+    """
+    shift = np.uint64(64 - (buckets - 1).bit_length())
+    reader = RecordReader(record_path)
+    count = 0
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(index_path))) as tmp:
+        paths = [os.path.join(tmp, "{}.bin".format(b)) for b in range(buckets)]
+        keys = []
+        offsets = []
+
+        def spill():
+            entries = np.empty(len(keys), dtype=INDEX_ENTRY)
+            entries["key"] = keys
+            entries["offset"] = offsets
+            bucket = entries["key"] >> shift
+            for b in np.unique(bucket).tolist():
+                with open(paths[b], "ab") as f:
+                    entries[bucket == b].tofile(f)
+            del keys[:], offsets[:]
+
+        for games, record in enumerate(reader, 1):
+            for state in record.states():
+                keys.append(position_key(state.dark, state.light, state.player, record.n))
+                offsets.append(record.offset)
+            if len(keys) >= SPILL_ENTRIES:
+                spill()
+            if log is not None and games % 10000 == 0:
+                log("{} games indexed".format(games))
+        spill()
+        with open(index_path, "wb") as out:
+            out.write(_INDEX_HEADER.pack(INDEX_MAGIC, VERSION, 0))
+            for path in paths:
+                if os.path.exists(path):
+                    entries = np.fromfile(path, dtype=INDEX_ENTRY)
+                    entries.sort(order=("key", "offset"))
+                    entries.tofile(out)
+                    count += len(entries)
+            out.seek(0)
+            out.write(_INDEX_HEADER.pack(INDEX_MAGIC, VERSION, count))
+    reader.close()
+    return count
+
+
+class GameIndex(object):
+    """
+    A memory-mapped index from position keys to game offsets.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            magic, version, count = _INDEX_HEADER.unpack(f.read(_INDEX_HEADER.size))
+        if magic != INDEX_MAGIC or version != VERSION:
+            raise ValueError("{} is not a game index".format(path))
+        self.entries = np.memmap(path, dtype=INDEX_ENTRY, mode="r", offset=_INDEX_HEADER.size,
+                                 shape=(count,)) if count else np.zeros(0, dtype=INDEX_ENTRY)
+        self.keys = self.entries["key"]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def offsets(self, dark, light, player, n):
+        """
+        Return the offsets of the games that reached the position or one of
+        its symmetric images, in file order.
+        """
+        key = np.uint64(position_key(dark, light, player, n))
+        start = int(np.searchsorted(self.keys, key, "left"))
+        end = int(np.searchsorted(self.keys, key, "right"))
+        return [int(offset) for offset in self.entries["offset"][start:end]]
+
+    def games(self, reader, state):
+        """
+        Yield the games of reader that reached the GameState state.
+        """
+        for offset in self.offsets(state.dark, state.light, state.player, state.n):
+            yield reader.read(offset)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Othello game records")
+    commands = parser.add_subparsers(dest="command", required=True)
+    index = commands.add_parser("index", help="Index the positions of a record file")
+    index.add_argument("records", help="Record file")
+    index.add_argument("-o", "--output", required=True, help="Index file to write")
+    dump = commands.add_parser("dump", help="Print the games of a record file")
+    dump.add_argument("records", help="Record file")
+    dump.add_argument("--limit", type=int, help="Print at most this many games")
+    args = parser.parse_args()
+
+    log = lambda msg: print(msg, file=sys.stderr)
+    if args.command == "index":
+        count = build_index(args.records, args.output, log=log)
+        log("Indexed {} positions".format(count))
+    else:
+        reader = RecordReader(args.records)
+        for number, record in enumerate(reader):
+            if args.limit is not None and number >= args.limit:
+                break
+            print("{} {}x{} {:+d}{} {}".format(record.offset, record.n, record.n, record.result,
+                                               "" if record.finished else " unfinished",
+                                               " ".join("{},{}".format(i, j) for i, j in record.moves())))
+        reader.close()
+
+
+if __name__ == "__main__":
+    main()
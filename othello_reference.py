@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*
+"""
+The original array-walking move generator of othello_shared, kept as the
+reference the bitboard implementation is tested against, and random test
+positions.
+"""
+
+import random
+from functools import lru_cache
+import numpy as np
+from othello_shared import GameState
+from othello_bitboard import popcount
+
+
+def reference_find_lines(board, i, j, player):
+    lines = []
+    for xdir, ydir in [[0, 1], [1, 1], [1, 0], [1, -1], [0, -1], [-1, -1],
+                       [-1, 0], [-1, 1]]:
+        u = i + xdir
+        v = j + ydir
+        line = []
+        found = False
+        while 0 <= u < board.shape[0] and 0 <= v < board.shape[0]:
+            if board[v, u] == 0:
+                break
+            elif board[v, u] == player:
+                found = True
+                break
+            else:
+                line.append((u, v))
+            u += xdir
+            v += ydir
+        if found and line:
+            lines.append(line)
+    return lines
+
+
+def reference_get_possible_moves(board, player):
+    result = []
+    for i in range(board.shape[0]):
+        for j in range(board.shape[0]):
+            if board[j, i] == 0 and reference_find_lines(board, i, j, player):
+                result.append((i, j))
+    return result
+
+
+def reference_play_move(board, player, i, j):
+    new_board = np.copy(board)
+    new_board[j, i] = player
+    for line in reference_find_lines(board, i, j, player):
+        for u, v in line:
+            new_board[v, u] = player
+    return new_board
+
+
+def initial_board(n):
+    board = np.zeros((n, n))
+    i = n // 2 - 1
+    board[i, i] = 2
+    board[i+1, i+1] = 2
+    board[i+1, i] = 1
+    board[i, i+1] = 1
+    return board
+
+
+def random_positions(n, count, rng):
+    """
+    Yield positions reached by random play, plus arbitrary random fills that
+    exercise edge wrap-around in ways real games rarely do.
+    """
+    for _ in range(count):
+        board = initial_board(n)
+        player = 1
+        for _ in range(rng.randrange(n * n)):
+            moves = reference_get_possible_moves(board, player)
+            if not moves:
+                break
+            i, j = rng.choice(moves)
+            board = reference_play_move(board, player, i, j)
+            player = 3 - player
+        yield board
+        yield np.array([[rng.choice((0, 0, 1, 2)) for _ in range(n)] for _ in range(n)])
+
+
+@lru_cache(maxsize=None)
+def positions(n, count=50):
+    """
+    Return a fixed tuple of 2 * count random positions on an n x n board,
+    shared by the tests; callers must not modify them.
+    """
+    return tuple(random_positions(n, count, random.Random(4701 + n)))
+
+
+def midgame(n, empties, seed):
+    """
+    Return the GameState that random play from the opening reaches with
+    the given number of empty squares.
+    """
+    rng = random.Random(seed)
+    state = GameState.from_board(initial_board(n), 1)
+    while n * n - popcount(state.dark | state.light) > empties:
+        state = state.play(*rng.choice(state.moves()))
+    return state
@@ -2,38 +2,34 @@
 # -*- coding: utf-8 -*
 """
 This module contains functions that are accessed by the game manager
-and by the each AI player.
+and by the each AI player.  Move generation runs on the bitboards in
+othello_bitboard; boards are converted on the way in and out.  GameState
+keeps a position on bitboards with its legal moves, and handles passes.
 
 Credit: Dr. Daniel Bauer
 """
 import numpy as np
+from othello_bitboard import (geometry, shift, iter_bits, popcount,
+                              bit_square, board_to_bitboards, bitboards_to_board,
+                              player_bitboards, mask_to_array,
+                              legal_moves, flips, apply_move)
 
 def find_lines(board, i, j, player):
     """
     Find all the uninterrupted lines of stones that would be captured if player
     plays column i and row j. 
     """
+    n = board.shape[0]
+    own, opp = player_bitboards(board, player)
+    move = 1 << (i * n + j)
     lines = []
-    for xdir, ydir in [[0, 1], [1, 1], [1, 0], [1, -1], [0, -1], [-1, -1], 
-                       [-1, 0], [-1, 1]]:
-        u = i
-        v = j
+    for s, mask in geometry(n).directions:
         line = []
-
-        u += xdir
-        v += ydir
-        found = False
-        while 0 <= u < board.shape[0] and 0 <= v < board.shape[0]:
-            if board[v, u] == 0:
-                break
-            elif board[v, u] == player:
-                found = True
-                break
-            else: 
-                line.append((u, v))
-            u += xdir
-            v += ydir
-        if found and line: 
+        x = shift(move, s) & mask
+        while x & opp:
+            line.append(bit_square(x.bit_length() - 1, n))
+            x = shift(x, s) & mask
+        if x & own and line:
             lines.append(line)
     return lines
    
@@ -43,38 +39,108 @@ def get_possible_moves(board, player):
     Return a list of all possible (column,row) tuples that player can play on
     the current board. 
     """
-    result = []
-    for i in range(board.shape[0]):
-        for j in range(board.shape[0]):
-            if board[j, i] == 0:
-                lines = find_lines(board, i, j, player)
-                if lines: 
-                    result.append((i, j))
-    return result
+    n = board.shape[0]
+    own, opp = player_bitboards(board, player)
+    return [bit_square(k, n) for k in iter_bits(legal_moves(own, opp, n))]
 
 
 def play_move(board, player, i, j):
+    return play_move_changes(board, player, i, j)[0]
+
+
+def play_move_changes(board, player, i, j):
+    """
+    Play column i and row j and return the new board along with the list of
+    (column,row) tuples that changed: the placed stone first, then the
+    flipped stones.
+    """
+    n = board.shape[0]
+    own, opp = player_bitboards(board, player)
+    move = 1 << (i * n + j)
+    flipped = flips(own, opp, move, n)
     new_board = np.copy(board)
-    lines = find_lines(board, i, j, player)
-    new_board[j, i] = player
-    for line in lines: 
-        for u, v in line:
-            new_board[v, u] = player
-    return new_board
+    new_board[mask_to_array(flipped | move, n)] = player
+    return new_board, [(i, j)] + [bit_square(k, n) for k in iter_bits(flipped)]
 
 
 def get_score(board):
-    p1_count = 0
-    p2_count = 0
-    for i in range(board.shape[0]):
-        for j in range(board.shape[0]):
-            if board[i, j] == 1:
-                p1_count += 1
-            elif board[i, j] == 2:
-                p2_count += 1
-    return p1_count, p2_count
+    return int(np.count_nonzero(board == 1)), int(np.count_nonzero(board == 2))
 
 
 def compute_utility(board):
     p1, p2 = get_score(board)
     return p1 - p2
+
+
+class GameState(object):
+    """
+    A position and the player to move, on bitboards.  A player without a
+    legal move passes: the state then has the opponent to move, so the
+    player to move has no legal move exactly when the game is over.  Legal
+    moves are generated at most once per player and state.
+    """
+
+    __slots__ = ("dark", "light", "player", "n", "passed", "_legal", "_moves")
+
+    def __init__(self, dark, light, player, n):
+        self.dark = dark
+        self.light = light
+        self.n = n
+        self._legal = [None, None, None]
+        self._moves = None
+        self.player = player
+        if not self.legal(player) and self.legal(3 - player):
+            self.player = 3 - player
+        self.passed = self.player != player  # Whether player had to pass
+
+    @classmethod
+    def from_board(cls, board, player):
+        dark, light = board_to_bitboards(board)
+        return cls(dark, light, player, board.shape[0])
+
+    def legal(self, player=None):
+        """
+        Return the mask of legal moves of player, by default the player to
+        move.
+        """
+        if player is None:
+            player = self.player
+        mask = self._legal[player]
+        if mask is None:
+            own, opp = (self.dark, self.light) if player == 1 else (self.light, self.dark)
+            mask = self._legal[player] = legal_moves(own, opp, self.n)
+        return mask
+
+    def moves(self):
+        """
+        Return the (column,row) tuples the player to move can play, in the
+        order of get_possible_moves.
+        """
+        if self._moves is None:
+            self._moves = [bit_square(k, self.n) for k in iter_bits(self.legal())]
+        return self._moves
+
+    def is_terminal(self):
+        return not self.legal()
+
+    def is_legal(self, i, j):
+        return 0 <= i < self.n and 0 <= j < self.n and bool(self.legal() >> (i * self.n + j) & 1)
+
+    def play(self, i, j):
+        """
+        Return the state after the player to move plays column i and row j,
+        which must be a legal move.
+        """
+        own, opp = (self.dark, self.light) if self.player == 1 else (self.light, self.dark)
+        own, opp = apply_move(own, opp, 1 << (i * self.n + j), self.n)
+        dark, light = (own, opp) if self.player == 1 else (opp, own)
+        return GameState(dark, light, 3 - self.player, self.n)
+
+    def board(self, dtype=float):
+        return bitboards_to_board(self.dark, self.light, self.n, dtype)
+
+    def score(self):
+        return popcount(self.dark), popcount(self.light)
+
+    def utility(self):
+        return popcount(self.dark) - popcount(self.light)
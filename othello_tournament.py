@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*
+"""
+Headless tournament runner for Othello agents.
+
+Games are played in-process, or on a process pool with -j, without any
+subprocess round-trips or per-move output.  Each finished game is streamed
+to a JSONL or CSV file, and a summary with win rates, Elo differences and
+95% confidence intervals is printed at the end.  With --record, the moves
+of every game are also appended to a game record file (see othello_record).
+
+Agents are given as specs such as "randy", "mcts" or
+"mcts:rollouts=400,alpha=3"; every pair of agents plays the requested number
+of games, alternating colors.
+
+    python othello_tournament.py randy mcts mcts:rollouts=400 -g 200 -b 6 -j 8 -o results.jsonl
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import math
+import multiprocessing
+import random
+import sys
+import time
+import numpy as np
+from othello_game import OthelloGameManager
+from othello_shared import get_possible_moves, get_score
+import mcts_ai
+from mcts_policy import POLICIES, RAVE_SCHEDULES
+from mcts_rollout import ROLLOUTS
+from mcts_value import ValueModel
+from othello_book import EndgameTable
+from othello_endgame import EndgameSolver
+from othello_record import RecordWriter, game_bytes
+
+RESULT_FIELDS = ("game", "dark", "light", "dimension", "dark_score", "light_score", "winner",
+                 "moves", "dark_seconds", "light_seconds")
+
+
+def randy(board, color):
+    # randy_ai.select_move without its pause for human viewers
+    return random.choice(get_possible_moves(board, color))
+
+
+def make_mcts(rollouts=100, alpha=5, batch_size=1, time=None, policy="uct", book=None, solve=0,
+              symmetry=1, rollout="uniform", value=None, rave=0, rave_schedule="equivalence"):
+    rollouts = int(rollouts)
+    alpha = float(alpha)
+    batch_size = int(batch_size)
+    time_limit = float(time) if time is not None else None
+    policy = POLICIES[policy]
+    book = EndgameTable(book) if book is not None else None
+    solve = int(solve)
+    symmetry = bool(int(symmetry))
+    rollout = ROLLOUTS[rollout]
+    evaluator = ValueModel.load(value) if value is not None else None
+    rave = float(rave)
+    rave_schedule = RAVE_SCHEDULES[rave_schedule]
+    # Board size -> EndgameSolver, kept across moves and, as make_agent()
+    # is called once per spec in every process (see _agent), across games
+    solvers = {}
+
+    def select_move(board, color):
+        n = board.shape[0]
+        if solve and n not in solvers:
+            solvers[n] = EndgameSolver(n, solve)
+        return mcts_ai.mcts(board, color, None if time_limit else rollouts, alpha, batch_size, time_limit,
+                            policy=policy, book=book, solver=solvers.get(n), symmetry=symmetry,
+                            rollout=rollout, evaluator=evaluator, rave=rave, rave_schedule=rave_schedule)
+    return select_move
+
+
+# Agent name -> factory taking the spec's parameters as strings
+AGENTS = {
+    "randy": lambda: randy,
+    "mcts": make_mcts,
+}
+
+
+def make_agent(spec):
+    """
+    Build the move function for an agent spec "name" or
+    "name:key=value,key=value".
+    """
+    name, _, params = spec.partition(":")
+    if name not in AGENTS:
+        raise ValueError("Unknown agent {!r}; choose from {}".format(name, ", ".join(sorted(AGENTS))))
+    kwargs = dict(p.split("=", 1) for p in params.split(",") if p)
+    return AGENTS[name](**kwargs)
+
+
+_agents = {}  # Agent spec -> move function, built once per process
+
+
+def _agent(spec):
+    if spec not in _agents:
+        _agents[spec] = make_agent(spec)
+    return _agents[spec]
+
+
+def play_headless(dark, light, dimension):
+    """
+    Play one game between two move functions and return (dark_score,
+    light_score, moves, seconds used by each side, the game's record bytes).
+    """
+    game = OthelloGameManager(dimension)
+    players = [None, dark, light]
+    seconds = [None, 0.0, 0.0]
+    moves = 0
+    while game.get_possible_moves():
+        start = time.perf_counter()
+        i, j = players[game.current_player](game.board, game.current_player)
+        seconds[game.current_player] += time.perf_counter() - start
+        game.play(i, j)
+        moves += 1
+    dark_score, light_score = get_score(game.board)
+    return dark_score, light_score, moves, seconds[1], seconds[2], game_bytes(game)
+
+
+def _play_job(job):
+    number, dark, light, dimension, seed = job
+    random.seed(seed)
+    np.random.seed(seed % 2**32)
+    dark_score, light_score, moves, dark_seconds, light_seconds, record = play_headless(
+        _agent(dark), _agent(light), dimension)
+    winner = dark if dark_score > light_score else light if light_score > dark_score else None
+    return {"game": number, "dark": dark, "light": light, "dimension": dimension,
+            "dark_score": dark_score, "light_score": light_score, "winner": winner, "moves": moves,
+            "dark_seconds": round(dark_seconds, 4), "light_seconds": round(light_seconds, 4), "record": record}
+
+
+def schedule(agents, games, dimension, seed=0):
+    """
+    Return the jobs of a round robin in which every pair of agents plays
+    games games, alternating colors.
+    """
+    rng = random.Random(seed)
+    jobs = []
+    for a, b in itertools.combinations(agents, 2):
+        for g in range(games):
+            dark, light = (a, b) if g % 2 == 0 else (b, a)
+            jobs.append((len(jobs), dark, light, dimension, rng.getrandbits(32)))
+    return jobs
+
+
+def run_tournament(jobs, workers=1):
+    """
+    Yield the result of every job as it finishes.
+    """
+    if workers <= 1:
+        for job in jobs:
+            yield _play_job(job)
+        return
+    with multiprocessing.Pool(workers) as pool:
+        for result in pool.imap_unordered(_play_job, jobs):
+            yield result
+
+
+def elo_difference(score):
+    """
+    Elo difference implied by an expected score in [0, 1], infinite at
+    either end.
+    """
+    if score <= 0:
+        return -math.inf
+    if score >= 1:
+        return math.inf
+    return -400 * math.log10(1 / score - 1)
+
+
+def wilson_interval(score, n, z=1.96):
+    """
+    Wilson score interval of a mean score over n games, which unlike the
+    normal approximation does not collapse to a point at 0 or 1.
+    """
+    center = (score + z * z / (2 * n)) / (1 + z * z / n)
+    margin = z * math.sqrt(score * (1 - score) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+    # The ends are 0 and 1 exactly at those scores, short of rounding
+    low = center - margin if score > 0 else 0.0
+    high = center + margin if score < 1 else 1.0
+    return max(low, 0.0), min(high, 1.0)
+
+
+def summarize(results, agent, opponent):
+    """
+    Score of agent against opponent (wins count 1, draws 1/2) with its 95%
+    Wilson interval, and the Elo difference for the score and both interval
+    ends.
+    """
+    points = []
+    seconds = []
+    for r in results:
+        if {r["dark"], r["light"]} != {agent, opponent}:
+            continue
+        points.append(1.0 if r["winner"] == agent else 0.5 if r["winner"] is None else 0.0)
+        seconds.append(r["dark_seconds"] if r["dark"] == agent else r["light_seconds"])
+    n = len(points)
+    if not n:
+        return None
+    score = sum(points) / n
+    low, high = wilson_interval(score, n)
+    return {"agent": agent, "opponent": opponent, "games": n,
+            "wins": points.count(1.0), "draws": points.count(0.5), "losses": points.count(0.0),
+            "score": score, "score_low": low, "score_high": high,
+            "elo": elo_difference(score), "elo_low": elo_difference(low), "elo_high": elo_difference(high),
+            "seconds_per_game": sum(seconds) / n}
+
+
+class ResultWriter(object):
+    """
+    Streams results to a JSONL or CSV file, chosen by its extension.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, "w", newline="") if path != "-" else sys.stdout
+        self.csv = None
+        if path.endswith(".csv"):
+            self.csv = csv.DictWriter(self.file, RESULT_FIELDS)
+            self.csv.writeheader()
+
+    def write(self, result):
+        if self.csv is not None:
+            self.csv.writerow(result)
+        else:
+            self.file.write(json.dumps(result) + "\n")
+        self.file.flush()
+
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless Othello tournament")
+    parser.add_argument("agents", nargs="+", help="Agent specs, e.g. randy or mcts:rollouts=400,alpha=3")
+    parser.add_argument("-g", "--games", default=100, type=int, help="Games per pair of agents (default 100)")
+    parser.add_argument("-b", default=4, type=int, help="Board size (default 4x4)")
+    parser.add_argument("-j", "--workers", default=1, type=int, help="Worker processes (default 1)")
+    parser.add_argument("-o", "--output", default="results.jsonl",
+                        help="Results file, .jsonl or .csv (default results.jsonl, - for stdout)")
+    parser.add_argument("--record", metavar="FILE",
+                        help="Append every game to this record file (see othello_record)")
+    parser.add_argument("--seed", default=0, type=int, help="Random seed")
+    args = parser.parse_args()
+
+    if len(set(args.agents)) < 2:
+        parser.error("need at least two different agents")
+    for spec in args.agents:
+        try:
+            make_agent(spec)
+        except (ValueError, TypeError, KeyError, OSError) as e:
+            parser.error("bad agent {!r}: {}".format(spec, e))
+
+    jobs = schedule(args.agents, args.games, args.b, args.seed)
+    writer = ResultWriter(args.output)
+    recorder = RecordWriter(args.record) if args.record is not None else None
+    results = []
+    start = time.perf_counter()
+    try:
+        for result in run_tournament(jobs, args.workers):
+            record = result.pop("record")
+            if recorder is not None:
+                recorder.write(record)
+            writer.write(result)
+            results.append(result)
+    finally:
+        writer.close()
+        if recorder is not None:
+            recorder.close()
+    elapsed = time.perf_counter() - start
+
+    print("{} games in {:.1f}s ({:.1f} games/s)".format(len(results), elapsed, len(results) / elapsed),
+          file=sys.stderr)
+    for agent, opponent in itertools.permutations(args.agents, 2):
+        s = summarize(results, agent, opponent)
+        print("{agent} vs {opponent}: {wins}-{draws}-{losses}, score {score:.3f} "
+              "[{score_low:.3f}, {score_high:.3f}], Elo {elo:+.0f} [{elo_low:+.0f}, {elo_high:+.0f}], "
+              "{seconds_per_game:.3f}s/game".format(**s), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,11 +8,11 @@ against your AI to test its performance.
 Credit: Dr. Daniel Bauer
 """
 
+import sys
 import random
 import time
-import numpy as np
-from six.moves import input
 from othello_shared import get_possible_moves
+from othello_protocol import ManagerConnection
 
 
 def select_move(board, color):
@@ -33,22 +33,25 @@ def run_ai():
     It first introduces itself and receives its color. 
     Then it repeatedly receives the current score and current board state
     until the game is over. 
+    Once a game is over the manager may start another one in the same
+    process with "NEW GAME <color>".
     """
-    print("Randy")          # First line is the name of this AI
-    color = int(input())    # 1 for dark (first), 2 for light (second)
+    # First line is the name of this AI, with the protocols it speaks
+    conn = ManagerConnection("Randy", sys.stdin.buffer, sys.stdout.buffer)
+    color = conn.handshake()    # 1 for dark (first), 2 for light (second)
 
     while True:
-        # Read in the current game status, for example:
-        # "SCORE 2 2" or "FINAL 33 31" if the game is over.
-        next_input = input()
-        status, dark_score_s, light_score_s = next_input.strip().split()
+        # Read in the current game status and board; the status is
+        # "SCORE" or "FINAL" if the game is over.
+        status, dark_score, light_score, board = conn.read_turn()
 
         if status == "FINAL":
-            print 
+            color = conn.next_game()
+            if color is None:
+                return
         else:
-            board = np.array(eval(input()))
             movei, movej = select_move(board, color)
-            print("{} {}".format(movei, movej)) 
+            conn.send_move(movei, movej)
 
 
 if __name__ == "__main__":
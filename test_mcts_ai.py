@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*
+"""
+Tests for the MCTS search loop of mcts_ai.
+"""
+
+import time
+from othello_shared import get_possible_moves, play_move
+from othello_endgame import EndgameSolver
+from mcts_tree import Node
+from mcts_ai import mcts, search, visit_lead, reuse_root, CHECK_INTERVAL
+from othello_reference import initial_board, midgame
+
+
+def test_root_solve_keeps_time_limit():
+    # The solver would take far longer than the time limit on twenty
+    # empties, so mcts() gives up on it and searches instead
+    state = midgame(8, 20, 1)
+    board = state.board()
+    solver = EndgameSolver(8, 30)
+    info = {}
+    start = time.perf_counter()
+    move = mcts(board, state.player, None, time_limit=0.5, solver=solver, info=info)
+    assert time.perf_counter() - start < 0.5 + 0.3
+    assert move in get_possible_moves(board, state.player)
+    assert not info["solved"] and info["iterations"] > 0
+    assert solver.stats()["aborted"] == 1
+
+
+def test_visit_lead():
+    board = initial_board(4)  # Four legal moves
+    root = Node(board, 1, None, [], 0, 10)
+    store = root.store
+    for visits in (3, 5):
+        root.children.append(Node(board, 2, root, [], 0, visits))
+    # The moves without a child yet count as zero visits
+    assert visit_lead(store, root.index, 4) == 2
+    assert visit_lead(store, root.index, 2) == 2
+    lone = Node(board, 1, None, [], 0, 10)
+    lone.children.append(Node(board, 2, lone, [], 0, 4))
+    assert visit_lead(lone.store, lone.index, 1) == float("inf")
+    assert visit_lead(lone.store, lone.index, 3) == 4
+
+
+def test_early_stop():
+    # With a single move there is nothing to search once it has a child
+    state = midgame(6, 14, 31)
+    assert len(state.moves()) == 1
+    info = {}
+    assert mcts(state.board(), state.player, 400, info=info) == state.moves()[0]
+    assert info["stopped_early"] and info["iterations"] == CHECK_INTERVAL
+    # A lead that the iterations left cannot make up ends the search; one of
+    # the two moves here is clearly better
+    state = midgame(6, 10, 3)
+    for early_stop in (True, False):
+        root = Node(state.board(), state.player, None, [], 0, 1)
+        root.store.reseed(1)
+        root.store.symmetry = False
+        stats = search(root, 2000, 0.5, early_stop=early_stop)
+        assert stats["stopped_early"] == early_stop
+        assert (stats["iterations"] < 2000) == early_stop
+        if early_stop:
+            assert visit_lead(root.store, root.index, 2) > 2000 - stats["iterations"]
+
+
+def test_reuse_root():
+    state = midgame(6, 20, 7)
+    board, player = state.board(), state.player
+    root = Node(board, player, None, [], 0, 1)
+    i, j = mcts(board, player, 800, root=root, seed=1, symmetry=False)
+    node = root.get_child(play_move(board, player, i, j))
+    # The opponent answers with the reply searched most
+    reply = max(node.children, key=lambda child: child.N)
+    new_root = reuse_root(node, reply.state, reply.player)
+    assert new_root.index == 0 and new_root.parent is None
+    assert (new_root.state == reply.state).all() and new_root.N == reply.N
+    assert len(new_root.store) < len(root.store)
+    assert sorted(c.N for c in new_root.children) == sorted(c.N for c in reply.children)
+    info = {}
+    move = mcts(reply.state, reply.player, 200, root=new_root, symmetry=False, info=info)
+    assert move in get_possible_moves(reply.state, reply.player)
+    assert info["inherited_visits"] == sum(c.N for c in reply.children) > 0
+    # Boards the tree does not know start a new search
+    assert reuse_root(node, board, player) is None
+    assert reuse_root(None, reply.state, reply.player) is None
+    # After the opponent passes, the node itself is the new root
+    kept = reuse_root(node, node.state, node.player)
+    assert kept.N == node.N and len(kept.store) < len(root.store)
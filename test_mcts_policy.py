@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*
+"""
+Tests for the selection policies.
+"""
+
+import numpy as np
+from othello_reference import initial_board
+from mcts_tree import Node
+from mcts_policy import uct
+
+
+def test_uct_keeps_original_rule():
+    # value / N + alpha * sqrt(ln N_parent / N), as the original select()
+    # scored children
+    board = initial_board(4)
+    root = Node(board, 1, None, [], 0, 20)
+    for value, visits in ((-1, 1), (1.5, 17), (1, 2)):
+        root.children.append(Node(board, 2, root, [], value, visits))
+    store = root.store
+    ids = store.children(root.index)
+    expected = [value / visits + 2 * np.sqrt(np.log(20) / visits) for value, visits in ((-1, 1), (1.5, 17), (1, 2))]
+    assert np.allclose(uct(store, root.index, ids, 2, 1), expected)
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*
+"""
+Tests for the rollout policies.
+"""
+
+import random
+import numpy as np
+import pytest
+from othello_bitboard import board_to_bitboards, legal_moves, popcount
+from mcts_rollout import ROLLOUTS
+from othello_reference import positions
+
+
+@pytest.mark.parametrize("n", (4, 6, 8))
+@pytest.mark.parametrize("name", sorted(ROLLOUTS))
+def test_rollout_picks_legal_moves(n, name):
+    # In scalar and batched form; batches give a zero move where there is
+    # none
+    policy = ROLLOUTS[name]
+    rng = random.Random(n)
+    own, opp = zip(*(board_to_bitboards(board) for board in positions(n)))
+    moves = [legal_moves(o, p, n) for o, p in zip(own, opp)]
+    for o, p, m in zip(own, opp, moves):
+        if m:
+            assert m >> policy.choose(o, p, m, n, rng) & 1
+    picked = policy.batch_choose(np.array(own, dtype=np.uint64), np.array(opp, dtype=np.uint64),
+                                 np.array(moves, dtype=np.uint64), n)
+    for m, move in zip(moves, picked.tolist()):
+        assert move & m == move
+        assert popcount(move) == 1 if m else move == 0
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*
+"""
+Tests for the array-backed MCTS tree.
+"""
+
+import numpy as np
+import pytest
+from othello_shared import get_possible_moves
+from othello_bitboard import board_to_bitboards, popcount
+from mcts_tree import TreeStore, Node
+from mcts_ai import mcts
+from othello_reference import positions, midgame
+
+
+@pytest.mark.parametrize("n", (4, 6, 8))
+def test_playout_moves(n):
+    # The squares a playout reports as played, scalar and batched, are its
+    # new stones, split between the players
+    store = TreeStore(n)
+    ids = np.array([store.add(*board_to_bitboards(board), 1 + k % 2) for k, board in enumerate(positions(n))])
+    values, dark_moves, light_moves = store.simulate_batch(ids, with_moves=True)
+    played = [(int(v), int(d), int(l)) for v, d, l in zip(values, dark_moves, light_moves)]
+    played += [store.simulate(k, with_moves=True) for k in ids.tolist()]
+    for k, (value, dark, light) in zip(ids.tolist() * 2, played):
+        stones = int(store.dark[k] | store.light[k])
+        assert not dark & light and not (dark | light) & stones
+        assert popcount(dark | light) <= n * n - popcount(stones) and abs(value) <= n * n
+
+
+@pytest.mark.parametrize("n", (4, 6, 8))
+def test_rave_statistics(n):
+    # After a search with RAVE on, the AMAF count of every root move is at
+    # least the visits of its child, and copying the child's subtree keeps
+    # the child's AMAF statistics
+    board = next(b for b in positions(n) if len(get_possible_moves(b, 1)) > 2)
+    root = Node(board, 1, None, [], 0, 1)
+    mcts(board, 1, 200, root=root, seed=n, rave=20, symmetry=False)
+    store, row = root.store, root.store.amaf_row[root.index]
+    assert row >= 0
+    for c in store.children(root.index).tolist():
+        assert store.amaf_visits[row, store.move[c]] >= store.visits[c]
+        copy = store.subtree(c)
+        if store.amaf_row[c] >= 0:
+            assert (copy.amaf_visits[copy.amaf_row[0]] == store.amaf_visits[store.amaf_row[c]]).all()
+
+
+@pytest.mark.parametrize("n, batch_size", [(10, 1), (10, 4), (12, 2)])
+def test_large_boards(n, batch_size):
+    # Boards over 8x8 keep their positions as Python ints and play out leaves
+    # one at a time, batched search and AMAF statistics included
+    state = midgame(n, n * n - 12, n)
+    board = state.board()
+    root = Node(board, state.player, None, [], 0, 1)
+    move = mcts(board, state.player, 60, batch_size=batch_size, root=root, seed=n, rave=10, symmetry=False)
+    assert move in get_possible_moves(board, state.player)
+    store = root.store
+    assert store.visits[root.index] > 1 and store.amaf_row[root.index] >= 0
+    child = max(store.children(root.index).tolist(), key=lambda c: store.visits[c])
+    copy = store.subtree(child)
+    assert copy.bitboards(0) == store.bitboards(child) and copy.visits[0] == store.visits[child]
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*
+"""
+Tests for the transposition table.
+"""
+
+from othello_reference import positions, midgame
+from mcts_tree import Node
+from mcts_tt import TranspositionTable, position_hash
+from mcts_ai import search
+
+
+def test_eviction():
+    tt = TranspositionTable(3)
+    a, b, c, d = (tt.entry(key) for key in "abcd")
+    # "a" was the least recently used entry when "d" came in
+    assert len(tt) == 3 and list(tt.entries) == ["b", "c", "d"]
+    assert tt.entry("b") is b
+    tt.entry("e")
+    assert list(tt.entries) == ["d", "b", "e"]
+    # An evicted entry comes back empty
+    a[:] = [3, 0.5]
+    assert tt.entry("a") == [0, 0.0] and tt.entry("a") is not a
+    assert (tt.hits, tt.misses, tt.evictions) == (2, 6, 3)
+
+
+def test_stats():
+    tt = TranspositionTable(10)
+    assert tt.hit_rate() == 0.0
+    empty = tt.memory_bytes()
+    for key in (1, 2, 1, 1):
+        tt.entry(key)
+    stats = tt.stats()
+    assert (stats["entries"], stats["capacity"], stats["evictions"]) == (2, 10, 0)
+    assert stats["hit_rate"] == 0.5
+    assert stats["memory_bytes"] > empty
+
+
+def test_position_hash():
+    board = positions(6, 1)[0]
+    assert position_hash(board, 1) == position_hash(board.copy(), 1)
+    assert position_hash(board, 1) != position_hash(board, 2)
+
+
+def test_search_shares_entries():
+    # Transpositions come up within a few hundred iterations; a table too
+    # small for the tree still serves the search, whose nodes keep their
+    # evicted entries. The seed covers the playouts, and the search runs
+    # all its iterations.
+    state = midgame(6, 16, 3)
+    for capacity in (100000, 100):
+        tt = TranspositionTable(capacity)
+        root = Node(state.board(), state.player, None, [], 0, 1)
+        root.store.reseed(1)
+        stats = search(root, 600, 5, early_stop=False, tt=tt)
+        assert stats["iterations"] == 600 and tt.hit_rate() > 0
+        assert len(tt) <= capacity
+        assert (tt.evictions > 0) == (capacity == 100)
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*
+"""
+Tests for the value model that scores MCTS leaves.
+"""
+
+import os
+import tempfile
+import numpy as np
+import pytest
+from othello_bitboard import board_to_bitboards, legal_moves, popcount
+from mcts_tree import TreeStore
+from mcts_value import ValueModel
+from othello_reference import positions
+
+
+@pytest.mark.parametrize("n", (4, 6, 8))
+def test_value_model(n):
+    # Finished games get their final scores and the rest values within the
+    # range of scores, alone and in batches, and a saved model evaluates the
+    # same after loading
+    store = TreeStore(n, evaluator=ValueModel(n, 8, seed=n))
+    ids = np.array([store.add(*board_to_bitboards(board), 1 + k % 2) for k, board in enumerate(positions(n))])
+    values = store.simulate_batch(ids)
+    for k, value in zip(ids.tolist(), values.tolist()):
+        dark, light = store.bitboards(k)
+        if not (legal_moves(dark, light, n) or legal_moves(light, dark, n)):
+            assert value == popcount(dark) - popcount(light)
+        else:
+            assert abs(value) <= n * n
+        assert abs(store.simulate(k) - value) <= 1e-3
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "value.npz")
+        store.evaluator.save(path)
+        store.evaluator = ValueModel.load(path)
+    assert np.allclose(store.simulate_batch(ids), values)
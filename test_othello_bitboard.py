@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*
+"""
+Tests for the symmetries and batched operations of othello_bitboard.
+"""
+
+import numpy as np
+import pytest
+from othello_bitboard import (board_to_bitboards, iter_bits, legal_moves, flips, apply_move,
+                              batch_legal_moves, batch_flips, batch_playout, popcount,
+                              SYMMETRIES, INVERSE, transform, transform_bit, canonical, canonical_hash,
+                              unique_moves)
+from othello_reference import positions
+
+
+@pytest.mark.parametrize("n", (4, 6, 8))
+def test_symmetry(n):
+    # Every symmetry commutes with move generation, all images of a position
+    # share its canonical form, and unique_moves keeps one move of every set
+    # of moves leading to symmetric positions
+    for board in positions(n):
+        dark, light = board_to_bitboards(board)
+        form = canonical(dark, light, n)
+        moves = legal_moves(dark, light, n)
+        for t in range(SYMMETRIES):
+            d, l = transform(dark, t, n), transform(light, t, n)
+            assert legal_moves(d, l, n) == transform(moves, t, n)
+            assert canonical(d, l, n)[:2] == form[:2]
+            assert canonical_hash(d, l, 1, n) == canonical_hash(dark, light, 1, n)
+            assert (transform(d, INVERSE[t], n), transform(l, INVERSE[t], n)) == (dark, light)
+            assert all(transform(1 << k, t, n) == 1 << transform_bit(k, t, n) for k in range(n * n))
+        children = {}
+        for k in iter_bits(moves):
+            child = canonical(*apply_move(dark, light, 1 << k, n), n)[:2]
+            children.setdefault(child, []).append(k)
+        unique = unique_moves(dark, light, moves, n)
+        assert not unique & ~moves
+        assert all(any(unique >> k & 1 for k in ks) for ks in children.values())
+        assert (transform(dark, form[2], n), transform(light, form[2], n)) == form[:2]
+
+
+@pytest.mark.parametrize("n", (4, 6, 8))
+def test_batch(n):
+    # The batched generators agree with the scalar ones on every legal move
+    # of every position, for both players
+    for player in (1, 2):
+        own, opp, move, expected = [], [], [], []
+        for board in positions(n):
+            dark, light = board_to_bitboards(board)
+            o, p = (dark, light) if player == 1 else (light, dark)
+            moves = legal_moves(o, p, n)
+            assert int(batch_legal_moves(np.array([o], dtype=np.uint64), np.array([p], dtype=np.uint64), n)[0]) == moves
+            for k in iter_bits(moves):
+                own.append(o)
+                opp.append(p)
+                move.append(1 << k)
+                expected.append(flips(o, p, 1 << k, n))
+        result = batch_flips(np.array(own, dtype=np.uint64), np.array(opp, dtype=np.uint64),
+                             np.array(move, dtype=np.uint64), n)
+        assert [int(f) for f in result] == expected
+
+
+@pytest.mark.parametrize("n", (4, 6, 8))
+def test_playout_moves(n):
+    # The squares a batched playout reports as played are its new stones,
+    # split between the players
+    boards = positions(n)
+    dark, light = zip(*(board_to_bitboards(board) for board in boards))
+    players = [1 + k % 2 for k in range(len(boards))]
+    values, plies, dark_moves, light_moves = batch_playout(dark, light, players, n, with_plies=True,
+                                                           with_moves=True)
+    for d, l, value, count, dm, lm in zip(dark, light, values.tolist(), plies.tolist(),
+                                          dark_moves.tolist(), light_moves.tolist()):
+        assert not dm & lm and not (dm | lm) & (d | l)
+        assert popcount(dm | lm) == count and abs(value) <= n * n
+
+
+def test_batch_rejects_large_boards():
+    with pytest.raises(ValueError):
+        batch_legal_moves(np.zeros(1, dtype=np.uint64), np.zeros(1, dtype=np.uint64), 10)
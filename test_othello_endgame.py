@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*
+"""
+Tests for the alpha-beta endgame solver against a full minimax search.
+"""
+
+import time
+import pytest
+from othello_bitboard import board_to_bitboards, legal_moves, apply_move
+from othello_book import solve
+from othello_endgame import EndgameSolver
+from othello_reference import positions, midgame
+
+
+@pytest.mark.parametrize("n", (4, 6, 8))
+def test_solver_matches_minimax(n):
+    # On the positions it covers, for both players; its best move must
+    # reach the value
+    solver = EndgameSolver(n, 7, 7)
+    for board in positions(n):
+        dark, light = board_to_bitboards(board)
+        if not solver.covers(dark, light):
+            continue
+        for player in (1, 2):
+            own, opp = (dark, light) if player == 1 else (light, dark)
+            value = solve(own, opp, n, {}, player)
+            assert solver.probe(dark, light, player) == (value if player == 1 else -value)
+            move = solver.best_move(dark, light, player)
+            if move is None:
+                assert not legal_moves(own, opp, n)
+                continue
+            new_own, new_opp = apply_move(own, opp, 1 << move, n)
+            assert -solve(new_opp, new_own, n, {}, 3 - player) == value
+
+
+def test_solve_gives_up_at_deadline():
+    # Twenty empties take far longer than the limit to solve
+    state = midgame(8, 20, 1)
+    solver = EndgameSolver(8, 30)
+    start = time.perf_counter()
+    assert solver.best_move(state.dark, state.light, state.player, start + 0.2) is None
+    assert time.perf_counter() - start < 0.5
+    assert solver.stats()["aborted"] == 1
+    # The table keeps only finished bounds, so later solves stay exact
+    late = midgame(8, 6, 2)
+    own, opp = (late.dark, late.light) if late.player == 1 else (late.light, late.dark)
+    value = solve(own, opp, 8, {}, late.player)
+    assert solver.probe(late.dark, late.light, late.player) == (value if late.player == 1 else -value)
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*
+"""
+Tests for the pool of warm AI processes.
+"""
+
+import time
+import pytest
+from othello_game import OthelloGameManager, AiPlayerInterface
+from othello_pool import AiWorkerPool
+
+# A text-protocol AI that offers new games and, after FINAL, either
+# acknowledges it with an empty line or hangs
+AI = """
+import sys, time
+print("Scripted AI\\tnewgame", flush=True)
+sys.stdin.readline()
+sys.stdin.readline()
+if {acknowledge}:
+    print("", flush=True)
+time.sleep(60)
+"""
+
+
+def scripted_ai(tmp_path, acknowledge):
+    path = tmp_path / "ai_{}.py".format(acknowledge)
+    path.write_text(AI.format(acknowledge=acknowledge))
+    return str(path)
+
+
+@pytest.mark.parametrize("acknowledge", [True, False])
+def test_release(tmp_path, monkeypatch, acknowledge):
+    # A worker that does not acknowledge the end of its game is stopped
+    # within the timeout instead of blocking the manager
+    monkeypatch.setattr(AiPlayerInterface, "TIMEOUT", 0.5)
+    filename = scripted_ai(tmp_path, acknowledge)
+    with AiWorkerPool() as pool:
+        player = pool.acquire(filename, 1)
+        start = time.monotonic()
+        pool.release(player, OthelloGameManager(4))
+        assert time.monotonic() - start < 0.5 + 0.5
+        assert (pool.idle.get(filename) == [player]) == acknowledge
+        assert player.healthy() == acknowledge
+        assert pool.stats()["restarted"] == (0 if acknowledge else 1)
+        if not acknowledge:
+            player.process.wait(timeout=1)
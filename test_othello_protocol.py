@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*
+"""
+Tests for the wire protocol: frames, messages and the AI side of a game.
+"""
+
+import io
+import numpy as np
+import pytest
+from othello_reference import positions
+from othello_protocol import (PROTOCOL_TEXT, PROTOCOL_BINARY, NEW_GAME, ProtocolError, ManagerConnection,
+                              introduction, parse_introduction, choose_protocol, write_frame, read_frame,
+                              encode_board, encode_final, encode_move, decode, format_board, mask_bytes)
+
+SIZES = (4, 6, 8, 10)
+
+
+@pytest.mark.parametrize("n", SIZES)
+def test_board_round_trip(n):
+    for board in positions(n, 10):
+        payload = encode_board(board, 3, 4)
+        assert len(payload) == 5 + 2 * mask_bytes(n)
+        status, (dark_score, light_score, decoded) = decode(payload)
+        assert (status, dark_score, light_score) == ("SCORE", 3, 4)
+        assert np.array_equal(decoded, board)
+
+
+def test_mask_bytes():
+    # Boards up to 8x8 keep the original u64 masks
+    assert [mask_bytes(n) for n in (4, 6, 8, 10, 12)] == [8, 8, 8, 13, 18]
+
+
+def test_messages():
+    assert decode(encode_final(10, 60, 40)) == ("FINAL", (60, 40))
+    assert decode(encode_move(9, 2)) == ("MOVE", (9, 2))
+    payload = encode_board(positions(10, 1)[0], 1, 2)
+    for bad in (b"", b"\x02M\x00\x00", encode_move(1, 2)[:-1], payload[:-1], payload + b"\x00"):
+        with pytest.raises(ProtocolError):
+            decode(bad)
+
+
+def test_frames():
+    stream = io.BytesIO()
+    payloads = [encode_move(1, 2), encode_board(positions(10, 1)[0], 1, 2), b""]
+    for payload in payloads:
+        write_frame(stream, payload)
+    stream.seek(0)
+    assert [read_frame(stream) for _ in payloads] == payloads
+    assert read_frame(stream) is None
+    # A frame cut short reads as the end of the stream
+    frame = stream.getvalue()[:2 + len(payloads[0])]
+    assert read_frame(io.BytesIO(frame[:-1])) is None
+    assert read_frame(io.BytesIO(frame[:1])) is None
+
+
+def test_introduction():
+    line = introduction("MCTS AI", (PROTOCOL_BINARY, NEW_GAME))
+    assert parse_introduction(line + "\n") == ("MCTS AI", [PROTOCOL_BINARY, NEW_GAME])
+    assert parse_introduction("Randy\n") == ("Randy", [])
+    assert choose_protocol([NEW_GAME, PROTOCOL_BINARY]) == PROTOCOL_BINARY
+    assert choose_protocol([NEW_GAME]) == PROTOCOL_TEXT
+
+
+def play_connection(manager_input, protocols):
+    # Run the AI side of a game against scripted manager input and return
+    # the connection, what it read and what it wrote
+    stdout = io.BytesIO()
+    connection = ManagerConnection("Test AI", io.BytesIO(manager_input), stdout, protocols)
+    color = connection.handshake()
+    turns = []
+    while True:
+        turn = connection.read_turn()
+        turns.append(turn)
+        if turn[0] == "FINAL":
+            break
+        connection.send_move(0, 1)
+    return connection, color, turns, connection.next_game(), stdout.getvalue()
+
+
+@pytest.mark.parametrize("n", (8, 10))
+def test_binary_game(n):
+    board = positions(n, 1)[0]
+    manager = io.BytesIO()
+    manager.write("2 {}\n".format(PROTOCOL_BINARY).encode("ASCII"))
+    write_frame(manager, encode_board(board, 5, 6))
+    write_frame(manager, encode_final(n, 7, 8))
+    manager.write(b"NEW GAME 1\n")
+    connection, color, turns, next_color, output = play_connection(manager.getvalue(), (PROTOCOL_BINARY,))
+    assert (connection.protocol, color, next_color) == (PROTOCOL_BINARY, 2, 1)
+    assert turns[0][:3] == ("SCORE", 5, 6) and np.array_equal(turns[0][3], board)
+    assert turns[1] == ("FINAL", 7, 8, None)
+    ai = io.BytesIO(output)
+    assert parse_introduction(ai.readline().decode("ASCII")) == ("Test AI", [PROTOCOL_BINARY, NEW_GAME])
+    assert decode(read_frame(ai)) == ("MOVE", (0, 1))
+
+
+def test_text_game():
+    # A manager that does not answer with a protocol keeps the AI on text
+    board = positions(10, 1)[0]
+    manager = "1\nSCORE 2 2\n{}\nFINAL 3 1\n".format(format_board(board)).encode("ASCII")
+    connection, color, turns, next_color, output = play_connection(manager, (PROTOCOL_BINARY,))
+    assert (connection.protocol, color, next_color) == (PROTOCOL_TEXT, 1, None)
+    assert turns[0][:3] == ("SCORE", 2, 2) and np.array_equal(turns[0][3], board)
+    assert turns[1] == ("FINAL", 3, 1, None)
+    # The AI acknowledges FINAL with an empty line
+    assert output.decode("ASCII").split("\n")[1:] == ["0 1", "", ""]
+
+
+def test_bad_new_game():
+    connection = ManagerConnection("Test AI", io.BytesIO(b"SCORE 1 1\n"), io.BytesIO())
+    with pytest.raises(ProtocolError):
+        connection.next_game()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*
+"""
+Tests for the binary game record format and its position index.
+"""
+
+import os
+import random
+import tempfile
+import pytest
+from othello_game import OthelloGameManager
+from othello_record import RecordWriter, RecordReader, GameIndex, build_index
+
+
+@pytest.mark.parametrize("n", (4, 6, 8, 10))
+def test_records(n):
+    # Random games read back with the same moves and results, their replays
+    # reach the same positions, and the index finds every game through each
+    # of its positions; boards over 8x8 hash with more than 64 squares
+    rng = random.Random(n)
+    games = []
+    with tempfile.TemporaryDirectory() as tmp:
+        records = os.path.join(tmp, "games.ogr")
+        writer = RecordWriter(records)
+        for _ in range(5):
+            game = OthelloGameManager(n)
+            states = [game.state]
+            while game.get_possible_moves():
+                game.play(*rng.choice(game.get_possible_moves()))
+                states.append(game.state)
+            games.append((writer.write_game(game), game.moves, states))
+        writer.close()
+        build_index(records, os.path.join(tmp, "games.idx"), buckets=4)
+        reader = RecordReader(records)
+        index = GameIndex(os.path.join(tmp, "games.idx"))
+        read = list(reader)
+        assert len(read) == len(games)
+        assert len(index) == sum(len(states) for _, _, states in games)
+        for record, (offset, moves, states) in zip(read, games):
+            replayed = list(record.states())
+            assert record.offset == offset and record.moves() == moves and record.finished
+            assert record.result == states[-1].utility() and len(replayed) == len(states)
+            for state, expected in zip(replayed, states):
+                assert (state.dark, state.light, state.player) == (expected.dark, expected.light, expected.player)
+                assert offset in index.offsets(state.dark, state.light, state.player, n)
+        reader.close()
+        del index
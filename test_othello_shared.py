@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*
+"""
+Equivalence tests for othello_shared, which runs on bitboards, against the
+original array-walking implementation (see othello_reference).
+"""
+
+import numpy as np
+import pytest
+from othello_shared import find_lines, get_possible_moves, play_move, play_move_changes, get_score, GameState
+from othello_bitboard import board_to_bitboards, bitboards_to_board
+from othello_reference import (reference_find_lines, reference_get_possible_moves, reference_play_move,
+                               positions)
+
+# 10x10 boards do not fit in a uint64, so they check the Python-int path
+SIZES = (4, 6, 8, 10)
+
+
+def boards(n):
+    # Fewer of the slow-to-check 10x10 positions
+    return positions(n) if n <= 8 else positions(n, 20)
+
+
+@pytest.mark.parametrize("n", SIZES)
+def test_equivalence(n):
+    for board in boards(n):
+        dark, light = board_to_bitboards(board)
+        assert (bitboards_to_board(dark, light, n) == board).all()
+        assert get_score(board) == (np.sum(board == 1), np.sum(board == 2))
+        for player in (1, 2):
+            moves = get_possible_moves(board, player)
+            assert moves == reference_get_possible_moves(board, player)
+            for i in range(n):
+                for j in range(n):
+                    if board[j, i] == 0:
+                        assert find_lines(board, i, j, player) == reference_find_lines(board, i, j, player)
+            for i, j in moves:
+                new_board = play_move(board, player, i, j)
+                assert new_board.dtype == board.dtype
+                assert (new_board == reference_play_move(board, player, i, j)).all()
+                _, changed = play_move_changes(board, player, i, j)
+                columns, rows = np.nonzero((new_board != board).T)
+                assert changed[0] == (i, j)
+                assert sorted(changed) == sorted(zip(columns.tolist(), rows.tolist()))
+
+
+@pytest.mark.parametrize("n", SIZES)
+def test_game_state(n):
+    # A player who cannot move passes to the opponent
+    for board in boards(n):
+        for player in (1, 2):
+            state = GameState.from_board(board, player)
+            mine = reference_get_possible_moves(board, player)
+            theirs = reference_get_possible_moves(board, 3 - player)
+            to_move = player if mine or not theirs else 3 - player
+            assert state.player == to_move and state.passed == (to_move != player)
+            assert state.is_terminal() == (not mine and not theirs)
+            expected = mine if to_move == player else theirs
+            assert state.moves() == expected and (state.board() == board).all()
+            for i, j in expected:
+                assert state.is_legal(i, j)
+                assert (state.play(i, j).board() == reference_play_move(board, to_move, i, j)).all()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*
+"""
+Tests for the tournament summary.
+"""
+
+import math
+import pytest
+from othello_tournament import summarize, elo_difference
+
+
+def results(wins, draws, losses):
+    # Games of "a" against "b", alternating colors
+    rows = []
+    for winner in ["a"] * wins + [None] * draws + ["b"] * losses:
+        dark, light = ("a", "b") if len(rows) % 2 == 0 else ("b", "a")
+        rows.append({"dark": dark, "light": light, "winner": winner,
+                     "dark_seconds": 1.0, "light_seconds": 2.0})
+    return rows
+
+
+def test_summary():
+    s = summarize(results(6, 2, 2), "a", "b")
+    assert (s["games"], s["wins"], s["draws"], s["losses"]) == (10, 6, 2, 2)
+    assert s["score"] == pytest.approx(0.7)
+    # Wilson interval for 7 points out of 10
+    assert s["score_low"] == pytest.approx(0.3968, abs=1e-4)
+    assert s["score_high"] == pytest.approx(0.8922, abs=1e-4)
+    assert s["elo"] == pytest.approx(147.2, abs=0.1)
+    assert s["elo_low"] == pytest.approx(elo_difference(s["score_low"]))
+    assert s["elo_high"] == pytest.approx(elo_difference(s["score_high"]))
+    assert s["seconds_per_game"] == pytest.approx(1.5)
+    assert summarize(results(6, 2, 2), "a", "c") is None
+
+
+@pytest.mark.parametrize("wins, losses", [(0, 20), (20, 0)])
+def test_summary_at_extremes(wins, losses):
+    # The interval must not collapse to the score when every game goes one way
+    s = summarize(results(wins, 0, losses), "a", "b")
+    sign = 1 if wins else -1
+    assert s["score"] == (1.0 if wins else 0.0)
+    assert s["elo"] == sign * math.inf
+    assert 0 < s["score_high"] - s["score_low"] < 0.2
+    assert (s["elo_high"] if wins else s["elo_low"]) == sign * math.inf
+    inner = s["elo_low"] if wins else s["elo_high"]
+    assert math.isfinite(inner) and sign * inner > 0
+    assert summarize(results(wins, 0, losses), "b", "a")["elo"] == -sign * math.inf